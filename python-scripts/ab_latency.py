@@ -0,0 +1,275 @@
+"""
+Azure AI Foundry - A/B Latency Comparison Between Targets
+
+Compares two or more targets (resources, deployments, regions) on latency
+with statistics instead of single-shot numbers:
+
+• interleaved, randomised rounds: every round sends one request to each
+  target in a fresh random order, so drift and bursts hit all targets alike
+• a warm-up request per target (connection setup) is discarded
+• per target: median/p95 with bootstrap confidence intervals
+• each target vs the baseline (first target): median difference with a
+  bootstrap CI, Mann-Whitney U p-value (Holm-corrected), Cliff's delta
+• minimum-sample planner: a pilot run estimates the spread of log latency
+  and sizes the run to detect a given relative difference
+
+USAGE:
+======
+    python ab_latency.py                              # /openai/models on each resource
+    python ab_latency.py --chat --min-effect 0.05     # chat deployment on each resource
+    python ab_latency.py --mock                       # two simulated deployments
+"""
+
+import argparse
+import collections
+import math
+import os
+import random
+import statistics
+import time
+
+import requests
+
+api_version = "2024-06-01"
+chat_deployment = "gpt-4o-mini-deployment"
+
+# Fewer samples make the normal approximations (U test, bootstrap) meaningless
+MIN_SAMPLES = 20
+
+_normal = statistics.NormalDist()
+
+# --- statistics -------------------------------------------------------
+
+def _ranks(values):
+    """Average ranks (1-based), ties share their mean rank"""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test (normal approximation, tie-corrected) -> (U, p)"""
+    n1, n2 = len(a), len(b)
+    combined = list(a) + list(b)
+    ranks = _ranks(combined)
+    u1 = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    tie_term = sum(t ** 3 - t for t in collections.Counter(combined).values())
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return u1, 1.0
+    z = (abs(u1 - n1 * n2 / 2) - 0.5) / sigma
+    return u1, min(1.0, 2 * (1 - _normal.cdf(z)))
+
+def cliffs_delta(a, b):
+    """P(b > a) - P(b < a), from the U statistic; +1 means b is always slower"""
+    u1, _ = mann_whitney_u(a, b)
+    return 1 - 2 * u1 / (len(a) * len(b))
+
+def bootstrap_ci(samples, stat=statistics.median, iterations=2000, confidence=0.95, rng=None):
+    rng = rng or random.Random(0)
+    estimates = sorted(stat(rng.choices(samples, k=len(samples))) for _ in range(iterations))
+    tail = (1 - confidence) / 2
+    return estimates[int(tail * iterations)], estimates[int((1 - tail) * iterations) - 1]
+
+def bootstrap_diff_ci(a, b, stat=statistics.median, iterations=2000, confidence=0.95, rng=None):
+    """CI of stat(b) - stat(a)"""
+    rng = rng or random.Random(0)
+    estimates = sorted(stat(rng.choices(b, k=len(b))) - stat(rng.choices(a, k=len(a)))
+                       for _ in range(iterations))
+    tail = (1 - confidence) / 2
+    return estimates[int(tail * iterations)], estimates[int((1 - tail) * iterations) - 1]
+
+def holm(p_values):
+    """Holm-Bonferroni adjusted p-values (same order as given)"""
+    order = sorted(range(len(p_values)), key=p_values.__getitem__)
+    adjusted = [0.0] * len(p_values)
+    running = 0.0
+    for rank, index in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+def required_samples(pilot, min_effect=0.1, alpha=0.05, power=0.8, comparisons=1):
+    """Samples per target to detect a `min_effect` relative latency change
+
+    Sized on log latency (latency is skewed) with a two-sample normal
+    approximation, inflated by 1/0.864 - the worst-case efficiency of
+    Mann-Whitney relative to a t-test. Never fewer than MIN_SAMPLES.
+    """
+    spreads = [statistics.stdev([math.log(x) for x in samples]) for samples in pilot.values() if len(samples) > 1]
+    if not spreads:
+        return None
+    sigma = math.sqrt(sum(s * s for s in spreads) / len(spreads))
+    delta = math.log(1 + min_effect)
+    z = _normal.inv_cdf(1 - alpha / (2 * comparisons)) + _normal.inv_cdf(power)
+    return max(MIN_SAMPLES, math.ceil(2 * (z * sigma / delta) ** 2 / 0.864))
+
+# --- running ----------------------------------------------------------
+
+def measure_once(target, session):
+    """Latency in ms of one successful request, or None"""
+    start = time.perf_counter()
+    try:
+        # No circuit breaker: fast-fails from a tripped breaker would skew one side of the comparison
+        response = session.request(target.get("method", "GET"), target["url"], headers=target["headers"],
+                                   json=target.get("payload"), timeout=60)
+        response.content
+    except requests.exceptions.RequestException:
+        return None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms if response.status_code < 400 else None
+
+def run_interleaved(targets, rounds, samples=None, failures=None, seed=None, sessions=None):
+    """Each round hits every target once, in a random order; returns samples per target"""
+    rng = random.Random(seed)
+    samples = samples if samples is not None else {name: [] for name in targets}
+    failures = failures if failures is not None else {name: 0 for name in targets}
+    sessions = sessions or {}
+    for name, target in targets.items():
+        if name not in sessions:
+            sessions[name] = requests.Session()
+            measure_once(target, sessions[name])  # warm-up: connection setup is not what we compare
+    names = list(targets)
+    for _ in range(rounds):
+        rng.shuffle(names)
+        for name in names:
+            latency = measure_once(targets[name], sessions[name])
+            if latency is None:
+                failures[name] += 1
+            else:
+                samples[name].append(latency)
+    return samples, failures
+
+def plan_and_run(targets, min_effect=0.1, pilot_rounds=20, max_rounds=1000, alpha=0.05, power=0.8, seed=None):
+    """Pilot run, size the experiment, then run the remaining rounds"""
+    sessions = {}
+    samples, failures = run_interleaved(targets, pilot_rounds, seed=seed, sessions=sessions)
+    needed = required_samples(samples, min_effect, alpha, power, comparisons=max(len(targets) - 1, 1))
+    if needed is None:
+        print("  ⚠️  Pilot produced too few successful samples to plan the run")
+        return samples, failures, None
+    remaining = min(max(needed - pilot_rounds, 0), max_rounds - pilot_rounds)
+    print(f"  📏 Pilot: {pilot_rounds} rounds -> {needed} samples per target needed to detect "
+          f"{min_effect * 100:.0f}% at alpha={alpha}, power={power}"
+          f"{' (capped by --max-rounds)' if needed > max_rounds else ''}")
+    run_interleaved(targets, remaining, samples, failures, seed=None if seed is None else seed + 1,
+                    sessions=sessions)
+    return samples, failures, needed
+
+def compare(samples, alpha=0.05):
+    """Per-target summaries and baseline comparisons (first target is the baseline)"""
+    names = [name for name, values in samples.items() if len(values) >= 2]
+    summary = {}
+    for name in names:
+        values = samples[name]
+        summary[name] = {
+            "n": len(values),
+            "median_ms": statistics.median(values),
+            "median_ci": bootstrap_ci(values),
+            "p95_ms": sorted(values)[max(int(len(values) * 0.95) - 1, 0)],
+            "p95_ci": bootstrap_ci(values, stat=lambda s: sorted(s)[max(int(len(s) * 0.95) - 1, 0)]),
+        }
+    comparisons = []
+    if len(names) >= 2:
+        baseline = names[0]
+        for name in names[1:]:
+            _, p = mann_whitney_u(samples[baseline], samples[name])
+            comparisons.append({
+                "baseline": baseline,
+                "target": name,
+                "median_diff_ms": summary[name]["median_ms"] - summary[baseline]["median_ms"],
+                "median_diff_ci": bootstrap_diff_ci(samples[baseline], samples[name]),
+                "p_value": p,
+                "cliffs_delta": cliffs_delta(samples[baseline], samples[name]),
+            })
+        for comparison, adjusted in zip(comparisons, holm([c["p_value"] for c in comparisons])):
+            comparison["p_adjusted"] = adjusted
+            comparison["significant"] = adjusted < alpha
+    return summary, comparisons
+
+def print_report(summary, comparisons, failures):
+    print(f"\n🅰️🅱️  LATENCY A/B")
+    print("-" * 80)
+    for name, s in summary.items():
+        print(f"  {name:15} | n={s['n']:4} | median {s['median_ms']:7.1f}ms "
+              f"[{s['median_ci'][0]:.1f}, {s['median_ci'][1]:.1f}] | p95 {s['p95_ms']:7.1f}ms "
+              f"[{s['p95_ci'][0]:.1f}, {s['p95_ci'][1]:.1f}] | failed {failures.get(name, 0)}")
+    for c in comparisons:
+        verdict = ("✅ significant" if c["significant"] else "➖ not significant")
+        faster = "slower" if c["median_diff_ms"] > 0 else "faster"
+        print(f"\n  {c['target']} vs {c['baseline']}: median {abs(c['median_diff_ms']):.1f}ms {faster} "
+              f"(95% CI {c['median_diff_ci'][0]:+.1f} .. {c['median_diff_ci'][1]:+.1f}ms)")
+        print(f"    Mann-Whitney p={c['p_value']:.4f} (Holm {c['p_adjusted']:.4f}) | "
+              f"Cliff's delta {c['cliffs_delta']:+.2f} | {verdict}")
+
+def targets_from_resources(resource_map, chat=False):
+    """One target per resource: /openai/models, or a small chat completion"""
+    targets = {}
+    for name, config in resource_map.items():
+        if chat:
+            targets[name] = {
+                "method": "POST",
+                "url": f"{config['openai_url']}/openai/deployments/{chat_deployment}"
+                       f"/chat/completions?api-version={api_version}",
+                "headers": {"Content-Type": "application/json", "api-key": config["api_key"]},
+                "payload": {"messages": [{"role": "user", "content": "Say OK."}], "max_tokens": 1},
+            }
+        else:
+            targets[name] = {
+                "method": "GET",
+                "url": f"{config['openai_url']}/openai/models?api-version={api_version}",
+                "headers": {"api-key": config["api_key"]},
+            }
+    return targets
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statistically sound latency A/B between targets")
+    parser.add_argument("--chat", action="store_true", help="compare a chat deployment instead of /openai/models")
+    parser.add_argument("--min-effect", type=float, default=0.1, help="smallest relative difference to detect")
+    parser.add_argument("--pilot", type=int, default=20)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--power", type=float, default=0.8)
+    parser.add_argument("--mock", action="store_true", help="compare two local simulated deployments")
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Latency A/B Comparison")
+    print("=" * 80)
+
+    def run(targets):
+        for name, target in targets.items():
+            print(f"🎯 {name:15} | {target.get('method', 'GET')} {target['url']}")
+        samples, failures, _ = plan_and_run(targets, options.min_effect, options.pilot, options.max_rounds,
+                                            options.alpha, options.power)
+        print_report(*compare(samples, options.alpha), failures)
+        if os.getenv("PROBE_RESULTS"):
+            from probe_results import ProbeResultStore, sample_rows
+
+            rows = [row for name, target in targets.items()
+                    for row in sample_rows(name, target["url"], samples[name], "ab_latency",
+                                           target.get("method", "GET"), failures[name])]
+            print(f"\n🗄️  Samples stored: {ProbeResultStore().append(rows)}")
+
+    if options.mock:
+        from mock_deployment import MockDeploymentServer
+
+        with MockDeploymentServer(base_ms=20) as a, MockDeploymentServer(base_ms=23) as b:
+            payload = {"messages": [{"role": "user", "content": "Say OK."}], "max_tokens": 2}
+            run({
+                name: {"method": "POST", "payload": payload, "headers": {"api-key": "mock-key"},
+                       "url": f"{mock.url}/openai/deployments/{chat_deployment}/chat/completions"}
+                for name, mock in (("A (20ms)", a), ("B (23ms)", b))
+            })
+    else:
+        from compare_foundry_resources import resources
+
+        run(targets_from_resources(resources, chat=options.chat))
+    print("=" * 80)
@@ -0,0 +1,196 @@
+"""
+Azure AI Foundry - API-Version Capability Matrix
+
+Remembers which api-version works for which (host, path family), so runs
+stop re-probing versions that 404 every time. The matrix is persisted to
+a JSON file (API_CAPABILITIES, default .api_capabilities.json) and updated
+incrementally from normal traffic via observe().
+
+(host, path family, api-version) -> supported / unsupported / last seen
+
+Path families collapse deployment names:
+/openai/deployments/gpt-4o/chat/completions -> /openai/deployments/*/chat/completions
+
+Choosing a version (plan()):
+• newest known-good version, if nothing newer is untested -> use it, no probing
+• an untested (or stale) newer version exists -> race it against the last
+  known-good version and keep whichever succeeds first
+• nothing known yet -> try candidates newest first, skipping known-unsupported
+"""
+
+import atexit
+import concurrent.futures
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+SUPPORTED = "supported"
+UNSUPPORTED = "unsupported"
+
+def path_family(path):
+    """Collapse deployment names so one entry covers every deployment"""
+    segments = path.split("?", 1)[0].rstrip("/").split("/")
+    for i in range(len(segments) - 1):
+        if segments[i] == "deployments" and i + 1 < len(segments) and segments[i + 1]:
+            segments[i + 1] = "*"
+    return "/".join(segments) or "/"
+
+def version_sort_key(version):
+    """Newest first ordering helper: date, then GA above preview"""
+    return (version[:10], "preview" not in version, version)
+
+def _split(url):
+    parts = urlsplit(url)
+    version = parse_qs(parts.query).get("api-version", [None])[0]
+    return parts.netloc, path_family(parts.path), version
+
+def _mentions_version(body_text):
+    text = (body_text or "").lower()
+    return "api version" in text or "api-version" in text
+
+class CapabilityMatrix:
+    """Persisted (host, path family, api-version) -> support status"""
+
+    def __init__(self, path=None, stale_after_seconds=7 * 24 * 3600):
+        self.path = path or os.getenv("API_CAPABILITIES", ".api_capabilities.json")
+        self.stale_after_seconds = stale_after_seconds
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        atexit.register(self.save)
+
+    @staticmethod
+    def _key(host, family, version):
+        return f"{host}|{family}|{version}"
+
+    def status(self, host, family, version):
+        entry = self.entries.get(self._key(host, family, version))
+        return entry["status"] if entry else None
+
+    def observe(self, url, status_code, body_text=""):
+        """Learn from any response to a URL that carries an api-version"""
+        host, family, version = _split(url)
+        if not version or not isinstance(status_code, int):
+            return None
+        if 200 <= status_code < 300:
+            status = SUPPORTED
+        elif status_code == 404 and "deploymentnotfound" in (body_text or "").lower():
+            return None  # the deployment is missing, not the version
+        elif status_code == 404 or (status_code == 400 and _mentions_version(body_text)):
+            status = UNSUPPORTED
+        else:
+            return None  # 401/403/429/5xx say nothing about the version
+
+        with self._lock:
+            self.entries[self._key(host, family, version)] = {
+                "status": status,
+                "status_code": status_code,
+                "last_seen": time.time(),
+            }
+            self._dirty = True
+        return status
+
+    def _fresh_status(self, host, family, version):
+        """Status if observed recently enough to trust, else None"""
+        entry = self.entries.get(self._key(host, family, version))
+        if entry and time.time() - entry["last_seen"] < self.stale_after_seconds:
+            return entry["status"]
+        return None
+
+    def plan(self, url_without_version, candidates):
+        """Decide which version(s) to send for a URL (see module docstring)"""
+        parts = urlsplit(url_without_version)
+        host, family = parts.netloc, path_family(parts.path)
+        ordered = sorted(candidates, key=version_sort_key, reverse=True)
+        statuses = {v: self._fresh_status(host, family, v) for v in ordered}
+
+        untested_newer = None
+        for version in ordered:
+            if statuses[version] == SUPPORTED:
+                if untested_newer:
+                    return {"use": None, "race": [untested_newer, version], "try": []}
+                return {"use": version, "race": None, "try": []}
+            if statuses[version] is None and untested_newer is None:
+                untested_newer = version
+
+        return {"use": None, "race": None, "try": [v for v in ordered if statuses[v] != UNSUPPORTED]}
+
+    def _read_disk(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self):
+        """Write the matrix if it changed, merged with the file by last_seen (atomic replace)
+
+        Other processes may have saved since this one loaded; for every key
+        the most recently seen entry wins, so their observations survive.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            for key, entry in self._read_disk().items():
+                mine = self.entries.get(key)
+                if isinstance(entry, dict) and (mine is None or entry.get("last_seen", 0) > mine["last_seen"]):
+                    self.entries[key] = entry
+            data = dict(self.entries)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+def with_version(url, version):
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}api-version={version}"
+
+def race_versions(matrix, send, url_without_version, versions):
+    """Send the same request with each version concurrently; first 2xx wins
+
+    `send(url)` must return a requests.Response. Every response is observed,
+    so the loser still updates the matrix. Returns (version, response) or
+    (None, last response) if none succeeded.
+    """
+    def attempt(version):
+        url = with_version(url_without_version, version)
+        response = send(url)
+        matrix.observe(url, response.status_code, response.text)
+        return version, response
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(versions))
+    futures = [executor.submit(attempt, v) for v in versions]
+    last = (None, None)
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                version, response = future.result()
+            except Exception:
+                continue
+            last = (None, response)
+            if 200 <= response.status_code < 300:
+                return version, response
+        return last
+    finally:
+        executor.shutdown(wait=False)  # the loser finishes (and is observed) in the background
+
+def print_matrix(matrix):
+    print(f"\n🧭 API-VERSION CAPABILITY MATRIX ({matrix.path})")
+    print("-" * 80)
+    for key in sorted(matrix.entries):
+        host, family, version = key.split("|")
+        entry = matrix.entries[key]
+        emoji = "✅" if entry["status"] == SUPPORTED else "❌"
+        seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_seen"]))
+        print(f"  {emoji} {host:40} {family:45} {version:20} {entry['status_code']} @ {seen}")
+
+if __name__ == "__main__":
+    print_matrix(CapabilityMatrix())
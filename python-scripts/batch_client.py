@@ -0,0 +1,376 @@
+"""
+Azure AI Foundry - Chat Completions through the Batch API
+
+For offline workloads: streams a (possibly huge) prompt set into JSONL
+batch input files, uploads them, submits batch jobs, polls with
+exponential backoff, then streams the result file back and joins each
+result to its input by custom_id. Inputs are never held in memory; only a
+custom_id -> byte offset index is kept so results can be joined by seeking.
+
+A local mock of the files/batches endpoints (MockBatchServer) makes the
+whole flow testable offline:
+
+    python batch_client.py --mock                 # end-to-end against the mock
+    python batch_client.py prompts.txt            # one prompt per line, real resource
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from circuit_breaker import parse_retry_after
+
+# Your Azure AI Foundry endpoint (Global Batch deployment required)
+openai_url = "https://f-codespace.openai.azure.com"
+api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+batch_deployment = "gpt-4o-mini-batch"
+api_version = "2024-10-21"
+
+# Service limits per input file
+MAX_REQUESTS_PER_FILE = 100_000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+
+TERMINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+
+def write_batch_inputs(prompts, out_dir, deployment, max_tokens=100, system_prompt=None,
+                       max_requests=MAX_REQUESTS_PER_FILE, max_bytes=MAX_BYTES_PER_FILE):
+    """Stream prompts into one or more JSONL batch input files
+
+    `prompts` is any iterable of strings, message lists, or (custom_id, prompt)
+    tuples. Returns [(path, {custom_id: byte_offset})] - one entry per file.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    parts = []
+    f = None
+    index = {}
+    written = 0
+
+    for n, item in enumerate(prompts):
+        if isinstance(item, tuple):
+            custom_id, prompt = item
+        else:
+            custom_id, prompt = f"task-{n}", item
+
+        if isinstance(prompt, str):
+            messages = [{"role": "user", "content": prompt}]
+            if system_prompt:
+                messages.insert(0, {"role": "system", "content": system_prompt})
+        else:
+            messages = prompt
+
+        line = json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": {"model": deployment, "messages": messages, "max_tokens": max_tokens},
+        }).encode("utf-8") + b"\n"
+
+        # Roll over to a new file before hitting the per-file limits
+        if f is None or len(index) >= max_requests or written + len(line) > max_bytes:
+            if f is not None:
+                f.close()
+            path = os.path.join(out_dir, f"batch-input-{len(parts):03d}.jsonl")
+            f = open(path, "wb")
+            index = {}
+            parts.append((path, index))
+            written = 0
+
+        index[custom_id] = written
+        f.write(line)
+        written += len(line)
+
+    if f is not None:
+        f.close()
+    return parts
+
+class BatchClient:
+    """Minimal client for the Azure OpenAI files + batches endpoints"""
+
+    def __init__(self, base_url, key, version=api_version, poll_initial=5.0, poll_max=300.0):
+        self.base_url = base_url.rstrip("/")
+        self.version = version
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.session = requests.Session()
+        self.session.headers.update({"api-key": key})
+
+    def _url(self, path):
+        return f"{self.base_url}/openai/{path}?api-version={self.version}"
+
+    def upload_file(self, path):
+        """Upload a batch input file and return its file ID"""
+        with open(path, "rb") as f:
+            response = self.session.post(
+                self._url("files"),
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(path), f, "application/jsonl")},
+                timeout=300,
+            )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def create_batch(self, input_file_id, endpoint="/chat/completions", completion_window="24h"):
+        response = self.session.post(
+            self._url("batches"),
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": endpoint,
+                "completion_window": completion_window,
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_batch(self, batch_id):
+        response = self.session.get(self._url(f"batches/{batch_id}"), timeout=30)
+        response.raise_for_status()
+        return response, response.json()
+
+    def wait_for_batch(self, batch_id, factor=1.6, timeout=None):
+        """Poll a batch with capped exponential backoff + jitter until it finishes"""
+        delay = self.poll_initial
+        started = time.monotonic()
+        last_status = None
+        while True:
+            response, batch = self.get_batch(batch_id)
+            status = batch["status"]
+            if status != last_status:
+                counts = batch.get("request_counts") or {}
+                print(f"  ⏳ {batch_id}: {status} "
+                      f"({counts.get('completed', 0)}/{counts.get('total', '?')} done)")
+                last_status = status
+                delay = self.poll_initial  # progress -> look again soon
+            if status in TERMINAL_STATUSES:
+                return batch
+            if timeout and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Batch {batch_id} still {status} after {timeout}s")
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            wait = retry_after if retry_after is not None else delay * random.uniform(0.8, 1.2)
+            time.sleep(wait)
+            delay = min(delay * factor, self.poll_max)
+
+    def iter_file_lines(self, file_id):
+        """Stream a result file line by line without buffering it"""
+        with self.session.get(self._url(f"files/{file_id}/content"), stream=True, timeout=300) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+def join_results(input_path, offsets, results):
+    """Yield (custom_id, request_body, result) by seeking to each input line"""
+    with open(input_path, "rb") as f:
+        for result in results:
+            custom_id = result.get("custom_id")
+            request_body = None
+            if custom_id in offsets:
+                f.seek(offsets[custom_id])
+                request_body = json.loads(f.readline())["body"]
+            yield custom_id, request_body, result
+
+def run_batch_job(client, prompts, work_dir, deployment, output_path, **input_options):
+    """Build inputs, submit every part, wait, and stream joined results to JSONL"""
+    parts = write_batch_inputs(prompts, work_dir, deployment, **input_options)
+    print(f"📦 {sum(len(o) for _, o in parts)} requests in {len(parts)} input file(s)")
+
+    submitted = []
+    for path, offsets in parts:
+        file_id = client.upload_file(path)
+        batch = client.create_batch(file_id)
+        print(f"  🚀 {os.path.basename(path)} -> {file_id} -> {batch['id']}")
+        submitted.append((path, offsets, batch["id"]))
+
+    summary = {"succeeded": 0, "failed": 0}
+    with open(output_path, "w", encoding="utf-8") as out:
+        for path, offsets, batch_id in submitted:
+            batch = client.wait_for_batch(batch_id)
+            file_ids = [batch.get("output_file_id"), batch.get("error_file_id")]
+            for file_id in [fid for fid in file_ids if fid]:
+                for custom_id, request_body, result in join_results(path, offsets, client.iter_file_lines(file_id)):
+                    response = result.get("response") or {}
+                    ok = response.get("status_code") == 200
+                    summary["succeeded" if ok else "failed"] += 1
+                    body = response.get("body") or {}
+                    out.write(json.dumps({
+                        "custom_id": custom_id,
+                        "prompt": request_body["messages"][-1]["content"] if request_body else None,
+                        "status_code": response.get("status_code"),
+                        "content": body["choices"][0]["message"]["content"] if ok else None,
+                        "usage": body.get("usage"),
+                        "error": result.get("error"),
+                    }) + "\n")
+
+    print(f"✅ {summary['succeeded']} succeeded | ❌ {summary['failed']} failed -> {output_path}")
+    return summary
+
+class MockBatchServer:
+    """Local stand-in for /openai/files and /openai/batches (offline testing)
+
+    Each status poll advances a batch one step through
+    validating -> in_progress -> finalizing -> completed. Output lines are
+    written in shuffled order, like the real service.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0):
+        self.files = {}
+        self.batches = {}
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        return False
+
+    def _complete(self, batch):
+        """Produce output/error files for a batch"""
+        lines = self.files[batch["input_file_id"]].decode("utf-8").splitlines()
+        random.shuffle(lines)
+        output, errors = io.StringIO(), io.StringIO()
+        for n, line in enumerate(lines, 1):
+            request = json.loads(line)
+            if self.fail_every and n % self.fail_every == 0:
+                errors.write(json.dumps({
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 400, "body": {"error": {"message": "mock failure"}}},
+                    "error": None,
+                }) + "\n")
+                continue
+            prompt = request["body"]["messages"][-1]["content"]
+            output.write(json.dumps({
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": f"echo: {prompt}"}}],
+                    "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 2,
+                              "total_tokens": len(prompt.split()) + 2},
+                }},
+                "error": None,
+            }) + "\n")
+        batch["output_file_id"] = self._store(output.getvalue().encode("utf-8"))
+        if errors.getvalue():
+            batch["error_file_id"] = self._store(errors.getvalue().encode("utf-8"))
+        batch["request_counts"] = {"total": len(lines), "completed": len(lines), "failed": 0}
+
+    def _store(self, content):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.files[file_id] = content
+        return file_id
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, data, status=200):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                if path == "/openai/files":
+                    # Pull the file part out of the multipart body
+                    boundary = self.headers["Content-Type"].split("boundary=")[1].encode("utf-8")
+                    content = None
+                    for part in self._read_body().split(b"--" + boundary):
+                        if b'name="file"' in part:
+                            content = part.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n", 1)[0]
+                    with mock.lock:
+                        file_id = mock._store(content)
+                    self._send_json({"id": file_id, "object": "file", "purpose": "batch", "status": "processed"})
+                elif path == "/openai/batches":
+                    request = json.loads(self._read_body())
+                    batch = {
+                        "id": f"batch_{uuid.uuid4().hex[:12]}",
+                        "object": "batch",
+                        "endpoint": request["endpoint"],
+                        "input_file_id": request["input_file_id"],
+                        "status": "validating",
+                        "output_file_id": None,
+                        "error_file_id": None,
+                        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                    }
+                    with mock.lock:
+                        mock.batches[batch["id"]] = batch
+                    self._send_json(batch)
+                else:
+                    self._send_json({"error": {"code": "404", "message": "Resource not found"}}, 404)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path.startswith("/openai/batches/"):
+                    with mock.lock:
+                        batch = mock.batches.get(path.rsplit("/", 1)[1])
+                        if batch and batch["status"] not in TERMINAL_STATUSES:
+                            steps = ["validating", "in_progress", "finalizing", "completed"]
+                            batch["status"] = steps[steps.index(batch["status"]) + 1]
+                            if batch["status"] == "completed":
+                                mock._complete(batch)
+                    if batch:
+                        self._send_json(batch)
+                    else:
+                        self._send_json({"error": {"code": "404", "message": "Batch not found"}}, 404)
+                elif path.startswith("/openai/files/") and path.endswith("/content"):
+                    content = mock.files.get(path.split("/")[3])
+                    if content is None:
+                        self._send_json({"error": {"code": "404", "message": "File not found"}}, 404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/jsonl")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self._send_json({"error": {"code": "404", "message": "Resource not found"}}, 404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def read_prompts(path):
+    """Lazily yield one prompt per non-empty line of a text file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+if __name__ == "__main__":
+    print("🚀 Azure AI Foundry Batch Chat Completions")
+    print("=" * 80)
+
+    if len(sys.argv) > 1 and sys.argv[1] != "--mock":
+        client = BatchClient(openai_url, api_key)
+        print(f"🎯 {openai_url} | deployment: {batch_deployment}")
+        run_batch_job(client, read_prompts(sys.argv[1]), "batch-work", batch_deployment, "batch_results.jsonl")
+    else:
+        print("🧪 Running against the local mock batch endpoint")
+        prompts = (f"Summarise ticket #{i} in one line." for i in range(2500))
+        with MockBatchServer(fail_every=500) as mock:
+            # The mock advances on every poll, so there is no need to back off for real
+            client = BatchClient(mock.url, "mock-key", poll_initial=0.01, poll_max=0.05)
+            run_batch_job(client, prompts, "batch-work", batch_deployment, "batch_results.jsonl",
+                          max_requests=1000)
+
+    print("=" * 80)
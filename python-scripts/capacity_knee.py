@@ -0,0 +1,230 @@
+"""
+Azure AI Foundry - Capacity Knee Finder for a Deployment
+
+Ramps load against /openai/deployments/{name}/chat/completions step by step
+(closed-loop concurrency 1, 2, 4, ... or open-loop RPS steps), measures
+throughput and latency at each step and finds the saturation knee: the
+point after which latency keeps climbing with no real throughput gain.
+
+The sustainable load is the highest step that still meets the SLO (p95
+latency and error rate). With --target-rps the report also recommends a
+--sku-capacity (1 capacity unit = 1,000 tokens/minute), which
+f_codespace_success_analysis.create_deployment_commands picks up.
+
+USAGE:
+======
+    python capacity_knee.py --slo-ms 3000 --target-rps 5
+    python capacity_knee.py --mode rps --steps 2,4,8,16,32
+    python capacity_knee.py --model gpt-4o --target-rps 2   # gpt-4o-deployment
+    python capacity_knee.py --mock                  # local simulated deployment (not saved)
+"""
+
+import argparse
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+import requests
+
+from latency_histogram import LatencyHistogram
+from trace_replay import TraceReplayer, synthetic_prompt
+
+# Target deployment
+openai_url = "https://f-codespace.openai.azure.com"
+api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+deployment = "gpt-4o-mini-deployment"
+model = "gpt-4o-mini"
+api_version = "2024-06-01"
+
+TOKENS_PER_MINUTE_PER_CAPACITY_UNIT = 1000
+
+def capacity_report_path():
+    return os.getenv("CAPACITY_REPORT", "capacity_report.json")
+
+def run_concurrency_step(url, key, concurrency, seconds, payload, timeout=120):
+    """Closed loop: `concurrency` workers send back-to-back requests for `seconds`"""
+    histogram = LatencyHistogram()
+    outcomes = collections.Counter()
+    tokens = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                # No circuit breaker: a tripped breaker would turn later steps into synthetic fast-fails
+                response = session.post(url, json=payload, timeout=timeout,
+                                        headers={"Content-Type": "application/json", "api-key": key})
+                outcome = response.status_code
+                used = response.json().get("usage", {}).get("total_tokens", 0) if outcome == 200 else 0
+            except requests.exceptions.RequestException as e:
+                outcome, used = type(e).__name__, 0
+            elapsed_ms = (time.monotonic() - start) * 1000
+            with lock:
+                outcomes[outcome] += 1
+                tokens[0] += used
+            if outcome == 200:
+                histogram.record_ms(elapsed_ms)
+            elif outcome == 429:
+                time.sleep(0.2)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _step_result("concurrency", concurrency, time.monotonic() - started, histogram, outcomes, tokens[0])
+
+def run_rps_step(base_url, key, deployment_name, rps, seconds, payload):
+    """Open loop: constant arrival rate, latency measured from the intended start"""
+    count = max(int(rps * seconds), 1)
+    trace = [{"offset": i / rps, "prompt_tokens": payload["prompt_tokens"], "max_tokens": payload["max_tokens"],
+              "stream": False} for i in range(count)]
+    replayer = TraceReplayer(base_url, key, deployment_name)
+    wall = replayer.run(trace)
+    return _step_result("rps", rps, wall, replayer.corrected, replayer.statuses, replayer.tokens)
+
+def _step_result(mode, level, wall_seconds, histogram, outcomes, tokens):
+    total = sum(outcomes.values()) or 1
+    ok = outcomes.get(200, 0)
+    return {
+        "mode": mode,
+        "level": level,
+        "seconds": round(wall_seconds, 2),
+        "requests": total,
+        "throughput_rps": ok / wall_seconds,
+        "tpm": tokens / wall_seconds * 60,
+        "tokens_per_request": tokens / ok if ok else 0,
+        "error_rate": 1 - ok / total,
+        "p50_ms": histogram.percentile(50) if ok else None,
+        "p95_ms": histogram.percentile(95) if ok else None,
+        "p99_ms": histogram.percentile(99) if ok else None,
+        "outcomes": {str(k): v for k, v in outcomes.items()},
+    }
+
+def find_knee(steps, min_gain=0.10, latency_growth=0.25):
+    """Last step before throughput stops growing while p95 latency keeps rising"""
+    for previous, current in zip(steps, steps[1:]):
+        if not previous["p95_ms"] or not current["p95_ms"] or not previous["throughput_rps"]:
+            continue
+        gain = current["throughput_rps"] / previous["throughput_rps"] - 1
+        growth = current["p95_ms"] / previous["p95_ms"] - 1
+        if gain < min_gain and growth > latency_growth:
+            return previous
+    return None
+
+def sustainable_step(steps, slo_ms, max_error_rate=0.01):
+    """Highest-throughput step meeting the p95 SLO and error budget"""
+    meeting = [s for s in steps if s["p95_ms"] is not None and s["p95_ms"] <= slo_ms
+               and s["error_rate"] <= max_error_rate]
+    return max(meeting, key=lambda s: s["throughput_rps"]) if meeting else None
+
+def recommended_capacity(tokens_per_request, target_rps, headroom=1.2):
+    """Capacity units (1,000 TPM each) for a target request rate"""
+    return math.ceil(target_rps * tokens_per_request * 60 * headroom / TOKENS_PER_MINUTE_PER_CAPACITY_UNIT)
+
+def ramp(step_fn, levels, stop_after_knee=1, **knee_options):
+    """Run steps in order; stop a little after the knee or when errors dominate"""
+    steps = []
+    for level in levels:
+        step = step_fn(level)
+        steps.append(step)
+        p95 = f"{step['p95_ms']:.0f}ms" if step["p95_ms"] else "-"
+        print(f"  {step['mode']} {level:>5} | {step['throughput_rps']:6.1f} req/s | {step['tpm']:>9,.0f} TPM | "
+              f"p95 {p95:>8} | errors {step['error_rate'] * 100:5.1f}%")
+        knee = find_knee(steps, **knee_options)
+        if knee and steps.index(knee) + 1 + stop_after_knee < len(steps):
+            break
+        if step["error_rate"] > 0.5:
+            break
+    return steps
+
+def save_report(report, path=None):
+    """Merge this deployment's report into the capacity report file"""
+    path = path or capacity_report_path()
+    reports = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            reports = json.load(f)
+    reports[report["model"]] = report
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(reports, f, indent=2)
+
+def load_reports(path=None):
+    path = path or capacity_report_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the capacity knee of a chat deployment")
+    parser.add_argument("--mode", choices=["concurrency", "rps"], default="concurrency")
+    parser.add_argument("--steps", default=None, help="comma-separated levels (default 1,2,4,...,128)")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--prompt-tokens", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p95 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--target-rps", type=float, default=None, help="peak load to size --sku-capacity for")
+    parser.add_argument("--model", default=model, help="model name the report is filed under")
+    parser.add_argument("--deployment", default=None, help="deployment to ramp (default <model>-deployment)")
+    parser.add_argument("--mock", action="store_true", help="ramp a local simulated deployment (report not saved)")
+    options = parser.parse_args()
+    target_deployment = options.deployment or (deployment if options.model == model
+                                               else f"{options.model}-deployment")
+
+    print("🚀 Azure AI Foundry Capacity Knee Finder")
+    print("=" * 80)
+
+    levels = [float(x) if options.mode == "rps" else int(x) for x in options.steps.split(",")] \
+        if options.steps else [1, 2, 4, 8, 16, 32, 64, 128]
+    payload = {"messages": [{"role": "user", "content": synthetic_prompt(options.prompt_tokens)}],
+               "max_tokens": options.max_tokens}
+    shape = {"prompt_tokens": options.prompt_tokens, "max_tokens": options.max_tokens}
+
+    def run(base_url, key):
+        url = f"{base_url}/openai/deployments/{target_deployment}/chat/completions?api-version={api_version}"
+        if options.mode == "concurrency":
+            return ramp(lambda n: run_concurrency_step(url, key, n, options.step_seconds, payload), levels)
+        return ramp(lambda r: run_rps_step(base_url, key, target_deployment, r, options.step_seconds, shape), levels)
+
+    if options.mock:
+        from mock_deployment import MockDeploymentServer
+
+        print("🧪 Ramping a local simulated deployment (8 concurrent slots)")
+        with MockDeploymentServer(concurrency=8, decode_ms_per_token=2.0) as mock:
+            steps = run(mock.url, "mock-key")
+    else:
+        print(f"🎯 {openai_url} | model: {options.model} | deployment: {target_deployment}")
+        steps = run(openai_url, api_key)
+
+    knee = find_knee(steps)
+    best = sustainable_step(steps, options.slo_ms, options.max_error_rate)
+    print(f"\n📍 Knee: {options.mode} {knee['level']} ({knee['throughput_rps']:.1f} req/s)" if knee
+          else "\n📍 No knee found - ramp further")
+    report = {"model": options.model, "deployment": target_deployment, "slo_p95_ms": options.slo_ms, "steps": steps,
+              "knee": knee, "sustainable_rps": None, "sustainable_tpm": None, "recommended_capacity": None}
+    if best:
+        report.update(sustainable_rps=round(best["throughput_rps"], 2), sustainable_tpm=round(best["tpm"]))
+        print(f"✅ Sustainable within p95 <= {options.slo_ms:.0f}ms: {best['throughput_rps']:.1f} req/s, "
+              f"{best['tpm']:,.0f} TPM")
+        if options.target_rps:
+            report["recommended_capacity"] = recommended_capacity(best["tokens_per_request"], options.target_rps)
+            print(f"📦 --sku-capacity for {options.target_rps} req/s: {report['recommended_capacity']}")
+    else:
+        print(f"❌ No step met p95 <= {options.slo_ms:.0f}ms")
+
+    if options.mock:
+        # A simulated deployment must never overwrite a real measurement
+        print("🧪 Mock run - report not saved")
+    else:
+        save_report(report)
+        print(f"💾 Saved to {capacity_report_path()}")
+    print("=" * 80)
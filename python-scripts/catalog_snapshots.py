@@ -0,0 +1,215 @@
+"""
+Azure AI Foundry - Model Catalog Snapshots and Drift Tracking
+
+Stores /openai/models snapshots per account and reports what changed
+between runs (added, removed, changed, lifecycle_status moves).
+
+LAYOUT (CATALOG_SNAPSHOTS, default .catalog_snapshots/):
+=========================================================
+objects/ab/ab12...json      -> one model entry, stored once by content hash
+                               (shared across snapshots and accounts)
+<account>/<snapshot>.json   -> index: model id -> [content hash, lifecycle_status]
+                               plus a digest over the whole index
+
+Diffs only read the two small indexes: equal digests mean "no drift"
+immediately, otherwise ids and hashes are compared. Full model documents
+are only loaded when you ask for them (load_model()).
+
+USAGE:
+======
+    python catalog_snapshots.py          # snapshot every resource, print drift
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from catalog_stream import iter_models
+
+def entry_hash(model):
+    """Content hash of one catalog entry (canonical JSON)"""
+    canonical = json.dumps(model, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def index_digest(models):
+    """Digest over id -> hash pairs; equal digests mean identical catalogs"""
+    digest = hashlib.sha256()
+    for model_id in sorted(models):
+        digest.update(f"{model_id}\0{models[model_id][0]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def _write_json(path, data):
+    # Unique temp name: accounts are snapshotted concurrently and may write the same object
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+class CatalogSnapshotStore:
+    """Content-addressed catalog entries + per-account snapshot indexes"""
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("CATALOG_SNAPSHOTS", ".catalog_snapshots")
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+
+    @staticmethod
+    def _account_dir_name(account):
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", account)
+
+    def _account_dir(self, account):
+        return os.path.join(self.root, self._account_dir_name(account))
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.root, "objects", content_hash[:2], content_hash + ".json")
+
+    def recorder(self, account):
+        """Snapshot built entry by entry while the caller streams the catalog"""
+        return SnapshotRecorder(self, account)
+
+    def record(self, account, models):
+        """Store an iterable of catalog entries as a new snapshot; returns it"""
+        recorder = self.recorder(account)
+        for model in models:
+            recorder.add(model)
+        return recorder.commit()
+
+    def _store_object(self, model):
+        content_hash = entry_hash(model)
+        path = self._object_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_json(path, model)
+        return content_hash
+
+    def _write_snapshot(self, account, index):
+        snapshot = {
+            "account": account,
+            "taken_at": time.time(),
+            "digest": index_digest(index),
+            "models": index,
+        }
+        account_dir = self._account_dir(account)
+        os.makedirs(account_dir, exist_ok=True)
+        base_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(snapshot["taken_at"]))
+        snapshot_id, suffix = base_id, 0
+        while os.path.exists(os.path.join(account_dir, f"{snapshot_id}.json")):
+            suffix += 1
+            snapshot_id = f"{base_id}-{suffix}"
+        snapshot["id"] = snapshot_id
+        _write_json(os.path.join(account_dir, f"{snapshot_id}.json"), snapshot)
+        return snapshot
+
+    def snapshots(self, account):
+        """Snapshot ids for an account, oldest first"""
+        account_dir = self._account_dir(account)
+        if not os.path.isdir(account_dir):
+            return []
+        return sorted(
+            (name[:-5] for name in os.listdir(account_dir) if name.endswith(".json")),
+            key=lambda s: (s.split("-")[0], int(s.split("-")[1]) if "-" in s else 0),
+        )
+
+    def load(self, account, snapshot_id):
+        with open(os.path.join(self._account_dir(account), f"{snapshot_id}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def latest(self, account, count=1):
+        """The newest `count` snapshots (newest last)"""
+        return [self.load(account, s) for s in self.snapshots(account)[-count:]]
+
+    def load_model(self, content_hash):
+        """Full catalog entry for a content hash"""
+        with open(self._object_path(content_hash), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def accounts(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name != "objects" and os.path.isdir(os.path.join(self.root, name))
+        )
+
+class SnapshotRecorder:
+    """Hashes and stores entries as they stream by; only the id -> hash index stays in memory"""
+
+    def __init__(self, store, account):
+        self.store = store
+        self.account = account
+        self.index = {}
+
+    def add(self, model):
+        self.index[model["id"]] = [self.store._store_object(model), model.get("lifecycle_status")]
+
+    def commit(self):
+        """Write the snapshot index (call only once the whole catalog was read)"""
+        return self.store._write_snapshot(self.account, self.index)
+
+def diff_snapshots(old, new):
+    """Added / removed / changed ids and lifecycle moves, from the indexes alone"""
+    result = {"added": [], "removed": [], "changed": [], "lifecycle": []}
+    if old is None:
+        result["added"] = sorted(new["models"])
+        return result
+    if old["digest"] == new["digest"]:
+        return result
+
+    old_models, new_models = old["models"], new["models"]
+    result["added"] = sorted(new_models.keys() - old_models.keys())
+    result["removed"] = sorted(old_models.keys() - new_models.keys())
+    for model_id in sorted(old_models.keys() & new_models.keys()):
+        old_hash, old_status = old_models[model_id]
+        new_hash, new_status = new_models[model_id]
+        if old_hash == new_hash:
+            continue
+        result["changed"].append(model_id)
+        if old_status != new_status:
+            result["lifecycle"].append((model_id, old_status, new_status))
+    return result
+
+def print_diff(account, diff):
+    if not any(diff.values()):
+        print(f"  ✅ {account:20} | no catalog drift")
+        return
+    print(f"  🔄 {account:20} | +{len(diff['added'])} -{len(diff['removed'])} "
+          f"~{len(diff['changed'])} (lifecycle {len(diff['lifecycle'])})")
+    for model_id in diff["added"][:10]:
+        print(f"       + {model_id}")
+    for model_id in diff["removed"][:10]:
+        print(f"       - {model_id}")
+    for model_id, old_status, new_status in diff["lifecycle"][:10]:
+        print(f"       ~ {model_id}: {old_status} -> {new_status}")
+
+def snapshot_account(store, account, openai_url, api_key, api_version="2024-06-01"):
+    """Fetch one account's catalog (streamed) and diff it against the previous snapshot"""
+    previous = store.latest(account)
+    current = store.record(
+        account,
+        iter_models(f"{openai_url}/openai/models?api-version={api_version}", {"api-key": api_key}),
+    )
+    return current, diff_snapshots(previous[0] if previous else None, current)
+
+if __name__ == "__main__":
+    from compare_foundry_resources import resources
+
+    print("🚀 Azure AI Foundry Model Catalog Drift")
+    print("=" * 80)
+
+    store = CatalogSnapshotStore()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(snapshot_account, store, name, config["openai_url"], config["api_key"]): name
+            for name, config in resources.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            try:
+                snapshot, diff = future.result()
+            except Exception as e:
+                print(f"  ❌ {name:20} | {e}")
+                continue
+            print(f"  📸 {name:20} | {len(snapshot['models'])} models -> snapshot {snapshot['id']}")
+            print_diff(name, diff)
+    print("=" * 80)
@@ -0,0 +1,148 @@
+"""
+Azure AI Foundry - Streaming Model Catalog Parser
+
+/openai/models returns {"data": [ {model}, {model}, ... ], "object": "list"}.
+The catalog keeps growing, so instead of response.json() on the whole body
+the entries are decoded one at a time straight from the socket and filtered
+as they arrive. Only the current, partially received entry is buffered, so
+peak memory stays bounded however large the catalog gets.
+
+FILTERS:
+========
+• capability      -> e.g. "chat_completion" (or a tuple: any of them)
+• lifecycle_status -> e.g. "generally-available" (or a tuple)
+• id_prefix       -> e.g. "gpt-4o"
+"""
+
+import codecs
+import json
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_START = "-0123456789"
+# What may follow a complete value (a number is only complete once one of these arrives)
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+class _NeedMore(Exception):
+    """The buffer ends before the next complete JSON value"""
+
+class _Buffer:
+    """Text buffer over an iterable of byte chunks, trimmed as values are consumed"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read one more chunk; False once the stream is exhausted"""
+        if self.eof:
+            return False
+        # Drop what has been consumed so the buffer only holds the current value
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.text += self.utf8.decode(chunk)
+                return True
+        self.text += self.utf8.decode(b"", final=True)
+        self.eof = True
+        return True
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+            self.pos += 1
+
+    def peek(self):
+        """Next non-whitespace character (reading more if needed), or None at EOF"""
+        while True:
+            self._skip_whitespace()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        while True:
+            self.peek()
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number may still be growing ("1" -> "12", "1." -> "1.5", "1e" -> "1e3")
+                # until a delimiter or EOF follows it
+                growing = self.text[self.pos] in _NUMBER_START and (
+                    end == len(self.text) or self.text[end] not in _DELIMITERS)
+                if not growing or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+def iter_array_items(chunks, key="data"):
+    """Yield the elements of the top-level object's `key` array one at a time
+
+    Other top-level members are decoded and discarded as they go by.
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    while buffer.peek() != "}":
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key:
+            buffer.expect("[")
+            while buffer.peek() != "]":
+                yield buffer.value()
+                if buffer.peek() == ",":
+                    buffer.pos += 1
+            buffer.pos += 1
+        else:
+            buffer.value()
+        if buffer.peek() == ",":
+            buffer.pos += 1
+
+def _as_tuple(value):
+    return (value,) if isinstance(value, str) else tuple(value)
+
+def model_filter(capability=None, lifecycle_status=None, id_prefix=None):
+    """Predicate for catalog entries; None means "don't filter on this" """
+    capabilities = _as_tuple(capability) if capability else None
+    statuses = _as_tuple(lifecycle_status) if lifecycle_status else None
+
+    def matches(model):
+        if id_prefix and not model.get("id", "").startswith(id_prefix):
+            return False
+        if statuses and model.get("lifecycle_status") not in statuses:
+            return False
+        if capabilities and not any(model.get("capabilities", {}).get(c, False) for c in capabilities):
+            return False
+        return True
+
+    return matches
+
+def iter_models(url, headers, capability=None, lifecycle_status=None, id_prefix=None,
+                session=None, timeout=10):
+    """Stream /openai/models and yield the matching entries as they arrive
+
+    Raises requests.HTTPError for a non-2xx response.
+    """
+    matches = model_filter(capability, lifecycle_status, id_prefix)
+    with (session or requests).get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        for model in iter_array_items(response.iter_content(chunk_size=CHUNK_SIZE)):
+            if matches(model):
+                yield model
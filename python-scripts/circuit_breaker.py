@@ -0,0 +1,174 @@
+"""
+Azure AI Foundry - Per-Host/Per-Deployment Circuit Breaker
+
+Shared by every probe and inference helper. One breaker per host (and per
+deployment for /openai/deployments/{name}/... URLs):
+
+CLOSED    -> requests flow; opens after `failure_threshold` consecutive
+             failures or a failure rate >= `failure_rate` over the last
+             `window` calls
+OPEN      -> requests fail fast with CircuitOpenError for `open_seconds`
+HALF-OPEN -> a single trial request is let through; success closes the
+             breaker, failure opens it again
+
+Failures are timeouts, connection errors, 5xx, and 403 "public access is
+disabled" responses. 404/401/429 are answers, not failures.
+"""
+
+import collections
+import email.utils
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from reachability_matrix import classify_response
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while a breaker is open"""
+
+class CircuitBreaker:
+    """Consecutive-failure / failure-rate breaker with a single half-open trial"""
+
+    def __init__(self, name, failure_threshold=5, failure_rate=0.5, window=20, min_calls=10, open_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.calls = collections.deque(maxlen=window)  # True = failure
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.fast_failed = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.fast_failed += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.calls.append(False)
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.calls.clear()
+                print(f"  🟢 Circuit closed: {self.name}")
+
+    def record_failure(self):
+        with self._lock:
+            self.calls.append(True)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            rate_tripped = len(self.calls) >= self.min_calls and \
+                sum(self.calls) / len(self.calls) >= self.failure_rate
+            if self.state == CLOSED and (self.consecutive_failures >= self.failure_threshold or rate_tripped):
+                self._open()
+
+    def release(self):
+        """Give back a half-open trial slot without judging the endpoint"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+        print(f"  🔴 Circuit open: {self.name} (failing fast for {self.open_seconds}s)")
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if unusable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+_breakers = {}
+_registry_lock = threading.Lock()
+
+def breaker_key(url):
+    """host, or host/deployment for deployment-scoped URLs"""
+    parts = urlsplit(url)
+    segments = parts.path.strip("/").split("/")
+    if len(segments) >= 3 and segments[0] == "openai" and segments[1] == "deployments":
+        return f"{parts.netloc}/{segments[2]}"
+    return parts.netloc
+
+def breaker_for(url, **options):
+    """Return the shared breaker for a URL (created on first use)"""
+    key = breaker_key(url)
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(key, **options)
+        return _breakers[key]
+
+def is_failure(response):
+    """Does this response count against the breaker?"""
+    if response.status_code >= 500:
+        return True
+    if response.status_code == 403:
+        return classify_response(403, response.text) == "private-only"
+    return False
+
+def guarded_request(method, url, session=None, **kwargs):
+    """requests.request() behind the URL's circuit breaker
+
+    Raises CircuitOpenError without touching the network while the breaker is open.
+    """
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {breaker.name} - failing fast")
+
+    try:
+        response = (session or requests).request(method, url, **kwargs)
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        breaker.record_failure()
+        raise
+    except Exception:
+        # Not the endpoint's fault (bad arguments etc.)
+        breaker.release()
+        raise
+
+    if is_failure(response):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+def print_breaker_states():
+    """Summary of every breaker used in this run"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    if not breakers:
+        return
+    print(f"\n🔌 CIRCUIT BREAKERS")
+    print("-" * 60)
+    for breaker in breakers:
+        emoji = {CLOSED: "🟢", OPEN: "🔴", HALF_OPEN: "🟡"}[breaker.state]
+        print(f"  {emoji} {breaker.name:50} | {breaker.state:9} | fast-failed {breaker.fast_failed}")
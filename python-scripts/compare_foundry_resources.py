@@ -1,8 +1,17 @@
 import requests
 import json
+import os
+import time
 from datetime import datetime
 import concurrent.futures
 
+from api_version_matrix import CapabilityMatrix
+from circuit_breaker import CircuitOpenError, guarded_request, print_breaker_states
+from latency_histogram import LatencyHistogram
+from probe_tracing import tracer_from_env
+from reachability_matrix import classify_response, build_reachability_matrix, print_reachability_matrix
+from sweep_checkpoint import journal_from_env
+
 # Your two Azure AI Foundry endpoints
 resources = {
     "Original": {
@@ -17,6 +26,15 @@ resources = {
     }
 }
 
+# Latency per resource across all test_single_endpoint() calls
+latency_by_resource = {name: LatencyHistogram() for name in resources}
+
+# api-version support learned from every response (persisted)
+capability_matrix = CapabilityMatrix()
+
+# One span per probe, exported in the background when PROBE_TRACES is set
+tracer = tracer_from_env()
+
 def test_single_endpoint(resource_name, resource_config, endpoint_path, headers, payload=None, method="GET", test_description=""):
     """Test a single endpoint for one resource"""
     url = f"{resource_config['base_url']}{endpoint_path}"
@@ -30,14 +48,26 @@ def test_single_endpoint(resource_name, resource_config, endpoint_path, headers,
         "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
     
+    span = tracer.start_probe_span(method, url, headers)
+    span.set("probe.resource", resource_name)
+    if tracer.enabled:
+        headers = {**headers, "traceparent": span.traceparent()}
+    
     try:
+        start = time.perf_counter()
         if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=15)
+            response = guarded_request("GET", url, headers=headers, timeout=15)
         else:
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
+            response = guarded_request("POST", url, headers=headers, json=payload, timeout=15)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        latency_by_resource.setdefault(resource_name, LatencyHistogram()).record_ms(elapsed_ms)
+        capability_matrix.observe(url, response.status_code, response.text)
+        span.phase("request", elapsed_ms)
+        span.record_response(response)
         
         result.update({
             "status_code": response.status_code,
+            "latency_ms": round(elapsed_ms, 2),
             "success": response.status_code in [200, 201, 202],
             "headers": dict(response.headers),
             "response_length": len(response.text)
@@ -45,21 +75,34 @@ def test_single_endpoint(resource_name, resource_config, endpoint_path, headers,
         
         # Parse response
         try:
+            decode_start = time.perf_counter()
             result["response"] = response.json()
+            span.phase("json_decode", (time.perf_counter() - decode_start) * 1000)
         except json.JSONDecodeError:
             result["response"] = response.text[:500]  # Truncate long text responses
             
-    except requests.exceptions.Timeout:
+    except CircuitOpenError as e:
+        span.record_error(e)
+        result.update({"error": "Circuit open (failing fast)", "status_code": "CIRCUIT_OPEN"})
+    except requests.exceptions.Timeout as e:
+        span.record_error(e)
         result.update({"error": "Timeout", "status_code": "TIMEOUT"})
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
+        span.record_error(e)
         result.update({"error": "Connection Error", "status_code": "CONNECTION_ERROR"})
     except Exception as e:
+        span.record_error(e)
         result.update({"error": str(e), "status_code": "ERROR"})
+    finally:
+        span.end()
     
     return result
 
-def compare_resources():
-    """Compare both resources across multiple endpoints"""
+def compare_resources(journal=None):
+    """Compare both resources across multiple endpoints
+
+    Pass a SweepJournal to checkpoint progress and resume interrupted runs.
+    """
     
     print("🔄 Azure AI Foundry Resources Comparison")
     print("=" * 80)
@@ -164,16 +207,23 @@ def compare_resources():
             else:
                 url = f"{base_url}{test_case['path']}"
             
-            # Run test
-            result = test_single_endpoint(
-                resource_name=resource_name,
-                resource_config={"base_url": base_url},
-                endpoint_path=test_case['path'],
-                headers=headers,
-                payload=test_case.get('payload'),
-                method=test_case['method'],
-                test_description=test_case['description']
-            )
+            # Run test (or reuse the result checkpointed by an earlier run)
+            probe_id = f"{resource_name} {test_case['method']} {url}"
+            if journal and journal.is_done(probe_id):
+                result = journal.result(probe_id)
+            else:
+                result = test_single_endpoint(
+                    resource_name=resource_name,
+                    resource_config={"base_url": base_url},
+                    endpoint_path=test_case['path'],
+                    headers=headers,
+                    payload=test_case.get('payload'),
+                    method=test_case['method'],
+                    test_description=test_case['description']
+                )
+                # Transport failures are retried on resume, not checkpointed
+                if journal and 'error' not in result:
+                    journal.record(probe_id, result)
             
             resource_results.append(result)
             all_results.append(result)
@@ -181,7 +231,8 @@ def compare_resources():
             # Print result
             status_emoji = "✅" if result.get('success') else "❌"
             status_code = result.get('status_code', 'N/A')
-            print(f"  {status_emoji} {resource_name:10} | Status: {status_code:>3} | {url}")
+            latency_text = f"{result['latency_ms']:.0f}ms" if 'latency_ms' in result else "-"
+            print(f"  {status_emoji} {resource_name:10} | Status: {status_code:>3} | {latency_text:>7} | {url}")
             
             # Print error details if any
             if 'error' in result:
@@ -200,6 +251,12 @@ def compare_resources():
     
     return all_results
 
+def is_private_endpoint_block(result):
+    """True when a result is a 403 caused by public access being disabled"""
+    if result.get('status_code') != 403:
+        return False
+    return classify_response(403, json.dumps(result.get('response', ''))) == "private-only"
+
 def analyze_differences(results):
     """Analyze the differences between the two resources"""
     
@@ -244,8 +301,8 @@ def analyze_differences(results):
     
     # Network access analysis
     print(f"\n🔒 NETWORK ACCESS ANALYSIS:")
-    orig_403_count = len([r for r in original_results if r.get('status_code') == 403])
-    new_403_count = len([r for r in new_results if r.get('status_code') == 403])
+    orig_403_count = len([r for r in original_results if is_private_endpoint_block(r)])
+    new_403_count = len([r for r in new_results if is_private_endpoint_block(r)])
     
     print(f"  Original 403 (Private endpoint) errors: {orig_403_count}")
     print(f"  New 403 (Private endpoint) errors:      {new_403_count}")
@@ -256,6 +313,14 @@ def analyze_differences(results):
         print("  ⚠️  New resource has more access restrictions")
     else:
         print("  📊 Both resources have similar access patterns")
+    
+    for resource_name, histogram in latency_by_resource.items():
+        histogram.print_summary(f"LATENCY - {resource_name}")
+    if len(latency_by_resource) > 1:
+        print("\n💡 One probe per endpoint can't tell which resource is faster - "
+              "run ab_latency.py for an interleaved A/B with confidence intervals")
+    
+    print_breaker_states()
 
 def get_new_api_key():
     """Help get the API key for the new resource"""
@@ -313,11 +378,39 @@ if __name__ == "__main__":
     print("=" * 80)
     
     # Run the comparison
-    results = compare_resources()
+    journal = journal_from_env()
+    try:
+        results = compare_resources(journal)
+    finally:
+        if journal:
+            journal.close()
     
     # Analyze differences  
     analyze_differences(results)
     
+    # Columnar history for later analysis (PROBE_RESULTS=<dir>)
+    if os.getenv("PROBE_RESULTS"):
+        from datetime import timedelta
+        from probe_results import ProbeResultStore, probe_row
+        from result_rollups import RollupStore, print_dashboard
+        
+        result_store = ProbeResultStore()
+        path = result_store.append([probe_row(r) for r in results])
+        print(f"\n🗄️  Results stored: {path}")
+        
+        # History from the hourly rollups: only this run is folded in, nothing is rescanned
+        rollups = RollupStore()
+        rollups.update(result_store)
+        print_dashboard(rollups.query(datetime.now() - timedelta(days=7), by=("resource",)),
+                        "LAST 7 DAYS (all stored runs)")
+    
+    # Per-path reachability (DNS / private link / service latency)
+    hosts = []
+    for config in resources.values():
+        for url in [config['base_url'], config['openai_url']]:
+            hosts.append(url.split("://", 1)[1].rstrip("/"))
+    print_reachability_matrix(build_reachability_matrix(hosts))
+    
     print(f"\n{'='*80}")
     print("🎉 COMPARISON COMPLETED!")
     print("=" * 80)
@@ -1,7 +1,15 @@
 import requests
 import json
+import time
 from datetime import datetime
 
+from api_version_matrix import CapabilityMatrix, race_versions
+from circuit_breaker import CircuitOpenError, guarded_request, print_breaker_states
+from latency_histogram import LatencyHistogram
+from moderation_cache import moderation_cache_from_env
+from probe_tracing import tracer_from_env
+from response_cache import as_response, cache_from_env, endpoint_from_url
+
 # Your Azure AI Foundry endpoints from the service configuration
 base_url = "https://foundry-codespace-demo.services.ai.azure.com"
 openai_url = "https://foundry-codespace-demo.openai.azure.com"
@@ -9,8 +17,26 @@ openai_url = "https://foundry-codespace-demo.openai.azure.com"
 # API Key (from your existing configuration)
 api_key = "F3Iqr1Xjic8fEGH0YanUQmMWesrAKloI2mJh56dkhAY1PhcP2OrDJQQJ99BKACYeBjFXJ3w3AAAAACOGwZEZ"  # Replace with your actual API key
 
-def test_endpoint(url, headers, payload=None, method="POST", test_name="Test"):
-    """Generic function to test endpoints"""
+# Latency of every test_endpoint() call (fixed memory, mergeable)
+latency = LatencyHistogram()
+
+# Chat completion cache (persisted across runs when CHAT_CACHE is set)
+chat_cache = cache_from_env()
+
+# Content safety results keyed by normalised text (persisted when MODERATION_CACHE is set)
+moderation_cache = moderation_cache_from_env()
+
+# api-version support learned from every response (persisted)
+capability_matrix = CapabilityMatrix()
+
+# One span per probe, exported in the background when PROBE_TRACES is set
+tracer = tracer_from_env()
+
+def test_endpoint(url, headers, payload=None, method="POST", test_name="Test", cache=None):
+    """Generic function to test endpoints
+
+    Pass a ChatResponseCache to serve repeated chat completions locally.
+    """
     print(f"\n{'='*60}")
     print(f"🧪 {test_name}")
     print(f"URL: {url}")
@@ -18,30 +44,62 @@ def test_endpoint(url, headers, payload=None, method="POST", test_name="Test"):
     print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}")
     
+    use_cache = cache is not None and method.upper() == "POST" and payload and "messages" in payload
+    if use_cache:
+        params = {k: v for k, v in payload.items() if k != "messages"}
+        cached = cache.get(payload["messages"], endpoint_from_url(url), params)
+        if cached is not None:
+            print("🗃️  Served from response cache")
+            print(f"📄 Response (JSON):\n{json.dumps(cached, indent=2)}")
+            return as_response(url, cached)
+    
+    span = tracer.start_probe_span(method, url, headers)
+    if tracer.enabled:
+        headers = {**headers, "traceparent": span.traceparent()}
+    
     try:
+        start = time.perf_counter()
         if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=30)
+            response = guarded_request("GET", url, headers=headers, timeout=30)
         else:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = guarded_request("POST", url, headers=headers, json=payload, timeout=30)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        latency.record_ms(elapsed_ms)
+        span.phase("request", elapsed_ms)
+        span.record_response(response)
+        capability_matrix.observe(url, response.status_code, response.text)
         
         print(f"✅ Status Code: {response.status_code}")
+        print(f"⏱️  Latency: {elapsed_ms:.0f}ms")
         print(f"📋 Response Headers: {dict(response.headers)}")
         
         # Parse response
         try:
+            decode_start = time.perf_counter()
             response_json = response.json()
+            span.phase("json_decode", (time.perf_counter() - decode_start) * 1000)
             print(f"📄 Response (JSON):\n{json.dumps(response_json, indent=2)}")
+            if use_cache and response.status_code == 200:
+                cache.put(payload["messages"], endpoint_from_url(url), params, response_json)
         except json.JSONDecodeError:
             print(f"📄 Response (Text): {response.text}")
         
         return response
         
-    except requests.exceptions.Timeout:
+    except CircuitOpenError as e:
+        span.record_error(e)
+        print(f"🔴 Skipped: {e}")
+    except requests.exceptions.Timeout as e:
+        span.record_error(e)
         print("⏰ Error: Request timed out")
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
+        span.record_error(e)
         print("🔌 Error: Connection failed")
     except Exception as e:
+        span.record_error(e)
         print(f"❌ Error: {e}")
+    finally:
+        span.end()
     
     return None
 
@@ -63,29 +121,51 @@ def test_ai_foundry_api():
         test_name="List Available Models"
     )
     
-    # Test 2: Chat completions (try different API versions)
+    # Test 2: Chat completions (api-version picked from the capability matrix)
     api_versions = ["2024-06-01", "2024-02-01", "2023-12-01-preview"]
     
-    for api_version in api_versions:
-        chat_payload = {
-            "model": "gpt-4",  # or whatever model is available
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "Hello, this is a test message from Azure AI Foundry API."
-                }
-            ],
-            "max_tokens": 50,
-            "temperature": 0.7
-        }
-        
+    chat_payload = {
+        "model": "gpt-4",  # or whatever model is available
+        "messages": [
+            {
+                "role": "user",
+                "content": "Hello, this is a test message from Azure AI Foundry API."
+            }
+        ],
+        "max_tokens": 50,
+        "temperature": 0.7
+    }
+    
+    chat_url = f"{base_url}/chat/completions"
+    plan = capability_matrix.plan(chat_url, api_versions)
+    
+    if plan["use"]:
+        print(f"\n🧭 Known working api-version: {plan['use']} (skipping the others)")
+        versions_to_try = [plan["use"]]
+    elif plan["race"]:
+        newest, known_good = plan["race"]
+        print(f"\n🏁 Racing api-version {newest} (untested) against {known_good} (last known good)")
+        winner, response = race_versions(
+            capability_matrix,
+            lambda url: guarded_request("POST", url, headers=headers, json=chat_payload, timeout=30),
+            chat_url,
+            plan["race"]
+        )
+        print(f"  Winner: {winner or 'none'} -> {response.status_code if response is not None else 'no response'}")
+        versions_to_try = []
+    else:
+        versions_to_try = plan["try"]
+    
+    for api_version in versions_to_try:
         # Try with API version parameter
-        test_endpoint(
-            f"{base_url}/chat/completions?api-version={api_version}",
+        response = test_endpoint(
+            f"{chat_url}?api-version={api_version}",
             headers,
             chat_payload,
             test_name=f"Chat Completions (API v{api_version})"
         )
+        if response is not None and response.status_code == 200:
+            break
 
 def test_openai_endpoints():
     """Test OpenAI-compatible endpoints"""
@@ -139,12 +219,24 @@ def test_content_safety():
         "text": "This is a test message for content safety analysis."
     }
     
-    test_endpoint(
-        f"{base_url}/contentsafety/text:analyze?api-version=2023-10-01",
+    safety_url = f"{base_url}/contentsafety/text:analyze?api-version=2023-10-01"
+    cached = moderation_cache.get(safety_payload["text"], safety_url)
+    if cached is not None:
+        print("\n🗃️  Content Safety - Text Analysis: served from moderation cache")
+        print(f"📄 Response (JSON):\n{json.dumps(cached, indent=2)}")
+        return
+    
+    response = test_endpoint(
+        safety_url,
         headers,
         safety_payload,
         test_name="Content Safety - Text Analysis"
     )
+    if response is not None and response.status_code == 200:
+        try:
+            moderation_cache.put(safety_payload["text"], safety_url, response.json())
+        except ValueError:
+            pass  # not JSON (proxy or gateway page): nothing worth caching
 
 def discover_deployment_names():
     """Try to discover available deployment names"""
@@ -204,7 +296,8 @@ def test_with_deployment_id():
             f"{openai_url}/openai/deployments/{deployment}/chat/completions?api-version=2024-06-01",
             headers,
             chat_payload,
-            test_name=f"Deployment Test: {deployment}"
+            test_name=f"Deployment Test: {deployment}",
+            cache=chat_cache
         )
 
 if __name__ == "__main__":
@@ -222,6 +315,13 @@ if __name__ == "__main__":
     discover_deployment_names()
     test_with_deployment_id()
     
+    latency.print_summary("LATENCY (all requests)")
+    print_breaker_states()
+    chat_cache.print_metrics()
+    if chat_cache.path:
+        chat_cache.save(chat_cache.path)
+    moderation_cache.print_metrics()
+    
     print(f"\n{'='*80}")
     print("🎉 Testing Suite Completed!")
     print("💡 Check the results above to identify working endpoints")
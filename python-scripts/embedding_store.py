@@ -0,0 +1,228 @@
+"""
+Azure AI Foundry - Persistent Embedding Store (memory-mapped vectors)
+
+Keeps every vector returned by a text-embedding-* deployment so it is
+never requested twice, and so search (vector_search.py) can use them.
+
+LAYOUT (EMBEDDING_STORE, default .embeddings/):
+===============================================
+<model>/vectors.bin   -> rows of `dim` float32 (or float16) values, raw
+<model>/keys.bin      -> 16-byte text hash per row, same order
+<model>/meta.json     -> dim, dtype, count
+
+Vectors are opened with numpy.memmap: millions of rows load without
+copying or parsing, and pages are only read when a row is touched.
+Appends are bulk (one write per batch) and meta.json is replaced last, so
+an interrupted append leaves the store at its previous count. Lookups go
+through a hash -> row dict built from keys.bin on first use.
+
+embed() only sends texts whose hash is not stored yet: re-embedding a
+corpus after small edits costs one request per changed text.
+
+USAGE:
+======
+    python embedding_store.py embed corpus.txt --model text-embedding-ada-002
+    python embedding_store.py embed corpus.txt --float16 --mock
+    python embedding_store.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import requests
+
+from circuit_breaker import guarded_request
+
+# Target resource and embedding deployment
+openai_url = "https://f-codespace.openai.azure.com"
+api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+deployment = "embedding-deployment"
+model = "text-embedding-ada-002"
+api_version = "2024-06-01"
+
+KEY_BYTES = 16
+
+def text_key(text):
+    """16-byte key of the exact text (embeddings change with any edit)"""
+    return hashlib.sha256(text.encode("utf-8")).digest()[:KEY_BYTES]
+
+def store_root():
+    return os.getenv("EMBEDDING_STORE", ".embeddings")
+
+class EmbeddingStore:
+    """Append-only vectors of one embedding model, memory-mapped for reads"""
+
+    def __init__(self, model, root=None, dtype="float32"):
+        self.model = model
+        self.directory = os.path.join(root or store_root(), re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.bin")
+        self._keys_path = os.path.join(self.directory, "keys.bin")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self.dim, self.dtype, self.count = None, np.dtype(dtype), 0
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.dtype, self.count = meta["dim"], np.dtype(meta["dtype"]), meta["count"]
+        self._discard_uncommitted()
+        self._index = None
+        self._vectors = None
+
+    def _discard_uncommitted(self):
+        """Cut rows written after the last meta.json (an interrupted append)"""
+        for path, row_bytes in ((self._vectors_path, (self.dim or 0) * self.dtype.itemsize),
+                                (self._keys_path, KEY_BYTES)):
+            if os.path.exists(path) and os.path.getsize(path) > self.count * row_bytes:
+                os.truncate(path, self.count * row_bytes)
+
+    def __len__(self):
+        return self.count
+
+    def _lookup(self):
+        if self._index is None:
+            # Raw bytes, not a numpy "S16" array: that would strip trailing NUL bytes from keys
+            data = b""
+            if self.count:
+                with open(self._keys_path, "rb") as f:
+                    data = f.read(self.count * KEY_BYTES)
+            self._index = {data[i:i + KEY_BYTES]: row for row, i in enumerate(range(0, len(data), KEY_BYTES))}
+        return self._index
+
+    @property
+    def vectors(self):
+        """(count, dim) read-only memmap over all stored vectors"""
+        if self._vectors is None:
+            if not self.count:
+                return np.empty((0, self.dim or 0), dtype=self.dtype)
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim))
+        return self._vectors
+
+    def rows(self, texts):
+        """Row of each text, -1 when not stored"""
+        index = self._lookup()
+        return np.array([index.get(text_key(text), -1) for text in texts], dtype=np.int64)
+
+    def get(self, text):
+        row = self._lookup().get(text_key(text))
+        return None if row is None else np.asarray(self.vectors[row], dtype=np.float32)
+
+    def __contains__(self, text):
+        return text_key(text) in self._lookup()
+
+    def add_many(self, texts, vectors):
+        """Append vectors for texts not stored yet (one write per file); returns how many were added"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("Expected one vector per text")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"{self.model} vectors have {self.dim} dimensions, got {vectors.shape[1]}")
+
+        index = self._lookup()
+        keys, keep = [], []
+        for i, text in enumerate(texts):
+            key = text_key(text)
+            if key not in index:
+                index[key] = self.count + len(keys)
+                keys.append(key)
+                keep.append(i)
+        if not keys:
+            return 0
+
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors[keep].astype(self.dtype).tobytes())
+        with open(self._keys_path, "ab") as f:
+            f.write(b"".join(keys))
+        self.count += len(keys)
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": self.dim, "dtype": self.dtype.name, "count": self.count}, f)
+        os.replace(tmp, self._meta_path)
+        self._vectors = None
+        return len(keys)
+
+    def embed(self, texts, embed_fn, batch_size=256):
+        """float32 matrix (len(texts), dim); only texts not stored yet go to embed_fn"""
+        rows = self.rows(texts)
+        missing = list(dict.fromkeys(text for text, row in zip(texts, rows) if row < 0))
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            self.add_many(batch, embed_fn(batch))
+        if missing:
+            rows = self.rows(texts)
+        return np.asarray(self.vectors[rows], dtype=np.float32), len(missing)
+
+def azure_embedder(base_url, key, deployment_name, session=None, timeout=60):
+    """embed_fn for EmbeddingStore.embed(): one request per batch of texts"""
+    url = f"{base_url.rstrip('/')}/openai/deployments/{deployment_name}/embeddings?api-version={api_version}"
+    session = session or requests.Session()
+
+    def embed(texts):
+        response = guarded_request("POST", url, session=session, json={"input": texts}, timeout=timeout,
+                                   headers={"Content-Type": "application/json", "api-key": key})
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    return embed
+
+def embedding_store_from_env(model, var="EMBEDDING_STORE", **options):
+    """Store under the directory in an environment variable, or None"""
+    root = os.getenv(var)
+    return EmbeddingStore(model, root, **options) if root else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent, memory-mapped embedding store")
+    parser.add_argument("--root", default=None, help="store directory (default EMBEDDING_STORE or .embeddings)")
+    parser.add_argument("--model", default=model)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    embed = subcommands.add_parser("embed", help="embed a corpus (one text per line), sending only new texts")
+    embed.add_argument("corpus")
+    embed.add_argument("--float16", action="store_true", help="store new collections as float16")
+    embed.add_argument("--batch-size", type=int, default=256)
+    embed.add_argument("--mock", action="store_true", help="use a local simulated embedding deployment")
+    subcommands.add_parser("stats", help="rows, dimensions and size of the store")
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Embedding Store")
+    print("=" * 80)
+
+    if options.command == "embed":
+        store = EmbeddingStore(options.model, options.root, "float16" if options.float16 else "float32")
+        with open(options.corpus, "r", encoding="utf-8") as f:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+
+        def run(embed_fn):
+            start = time.perf_counter()
+            matrix, sent = store.embed(texts, embed_fn, options.batch_size)
+            print(f"  {len(texts):,} texts | {sent:,} sent to the API | {len(texts) - sent:,} from the store | "
+                  f"{matrix.shape} | {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        if options.mock:
+            from mock_deployment import MockDeploymentServer
+
+            with MockDeploymentServer(embedding_dim=256) as mock:
+                print(f"🧪 Simulated embedding deployment (256 dimensions)")
+                run(azure_embedder(mock.url, "mock-key", deployment))
+        else:
+            print(f"🎯 {openai_url} | deployment: {deployment}")
+            run(azure_embedder(openai_url, api_key, deployment))
+
+    root = options.root or store_root()
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if not os.path.exists(os.path.join(root, name, "meta.json")):
+            continue
+        store = EmbeddingStore(name, root)
+        start = time.perf_counter()
+        vectors = store.vectors
+        opened_ms = (time.perf_counter() - start) * 1000
+        size = os.path.getsize(os.path.join(store.directory, "vectors.bin")) if store.count else 0
+        print(f"  📦 {name:28} | {store.count:>10,} vectors | {store.dim} x {store.dtype.name} | "
+              f"{size / 1e6:,.1f} MB | mapped in {opened_ms:.2f}ms")
+    print("=" * 80)
@@ -0,0 +1,283 @@
+"""
+Azure AI Foundry - Entra ID (AAD) Token Provider
+
+Sending the API key as `Authorization: Bearer <key>` never works; bearer
+auth needs a Microsoft Entra ID access token. This provider fetches one with
+the client-credentials flow (service principal) and:
+
+• caches tokens per scope in memory and, optionally, on disk (0600 JSON file)
+• refreshes them in the background `refresh_margin` seconds before expiry,
+  so requests never stall at expiry
+• shares one in-flight fetch between concurrent callers (single-flight)
+
+CONFIGURATION (environment):
+============================
+AZURE_TENANT_ID / AZURE_CLIENT_ID / AZURE_CLIENT_SECRET   service principal
+AZURE_TOKEN_CACHE                                         optional disk cache path
+
+USAGE:
+======
+    provider = provider_from_env()
+    headers = {"Content-Type": "application/json", **provider.auth_headers()}
+
+    python entra_auth.py          # demo against a local token-endpoint stand-in
+"""
+
+import concurrent.futures
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import requests
+
+AUTHORITY = "https://login.microsoftonline.com"
+COGNITIVE_SERVICES_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+class TokenError(requests.exceptions.RequestException):
+    """The token endpoint refused or failed to issue a token"""
+
+class EntraTokenProvider:
+    """Client-credentials tokens, cached per scope, refreshed ahead of expiry"""
+
+    def __init__(self, tenant_id, client_id, client_secret, authority=AUTHORITY, cache_path=None,
+                 refresh_margin=300, expiry_skew=5, timeout=10):
+        self.token_url = f"{authority.rstrip('/')}/{tenant_id}/oauth2/v2.0/token"
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.expiry_skew = expiry_skew  # treat tokens this close to expiry as expired
+        self.timeout = timeout
+        self.stats = {"fetches": 0, "background_refreshes": 0, "cache_hits": 0, "waited": 0}
+        self._tokens = {}     # scope -> {"access_token", "expires_on"}
+        self._inflight = {}   # scope -> Future of the fetch in progress
+        self._timers = {}     # scope -> refresh Timer
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._load_disk_cache()
+
+    # --- disk cache ---------------------------------------------------
+
+    def _cache_key(self, scope):
+        return f"{self.tenant_id}|{self.client_id}|{scope}"
+
+    def _load_disk_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        prefix = self._cache_key("")
+        now = time.time()
+        for key, token in stored.items():
+            if key.startswith(prefix) and token["expires_on"] > now:
+                scope = key[len(prefix):]
+                self._tokens[scope] = token
+                self._schedule_refresh(scope, token["expires_on"])
+
+    def _save_disk_cache(self):
+        if not self.cache_path:
+            return
+        stored = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        with self._lock:
+            stored.update({self._cache_key(scope): token for scope, token in self._tokens.items()})
+        now = time.time()
+        stored = {key: token for key, token in stored.items() if token["expires_on"] > now}
+        # Unique temp name (owner-only, 0600): several providers may save the same cache at once
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        os.replace(tmp, self.cache_path)
+
+    # --- fetching -----------------------------------------------------
+
+    def _request_token(self, scope):
+        """One call to the token endpoint"""
+        response = self._session.post(
+            self.token_url,
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": scope,
+            },
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise TokenError(f"Token request failed ({response.status_code}): {response.text[:200]}")
+        body = response.json()
+        return {"access_token": body["access_token"], "expires_on": time.time() + int(body["expires_in"])}
+
+    def _fetch(self, scope):
+        """Single-flight fetch: concurrent callers for a scope share one request"""
+        with self._lock:
+            future = self._inflight.get(scope)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[scope] = future
+            else:
+                self.stats["waited"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            token = self._request_token(scope)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[scope]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._tokens[scope] = token
+            self.stats["fetches"] += 1
+            del self._inflight[scope]
+        future.set_result(token)
+        self._schedule_refresh(scope, token["expires_on"])
+        self._save_disk_cache()
+        return token
+
+    def _schedule_refresh(self, scope, expires_on):
+        """Refresh in the background `refresh_margin` seconds before expiry"""
+        lifetime = expires_on - time.time()
+        # Short-lived tokens refresh at 80% of their lifetime
+        delay = max(lifetime - min(self.refresh_margin, lifetime * 0.2), 0)
+        timer = threading.Timer(delay, self._background_refresh, args=(scope,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.get(scope)
+            self._timers[scope] = timer
+        if previous:
+            previous.cancel()
+        timer.start()
+
+    def _background_refresh(self, scope):
+        try:
+            self._fetch(scope)
+            with self._lock:
+                self.stats["background_refreshes"] += 1
+        except requests.exceptions.RequestException as e:
+            print(f"  ⚠️  Background token refresh failed for {scope}: {e}")
+            with self._lock:
+                token = self._tokens.get(scope)
+            if token and token["expires_on"] > time.time() + 30:
+                # Still valid for a while: try again shortly
+                timer = threading.Timer(30, self._background_refresh, args=(scope,))
+                timer.daemon = True
+                with self._lock:
+                    self._timers[scope] = timer
+                timer.start()
+
+    # --- public API ---------------------------------------------------
+
+    def get_token(self, scope=COGNITIVE_SERVICES_SCOPE):
+        """Cached access token for a scope; only blocks if none is valid"""
+        with self._lock:
+            token = self._tokens.get(scope)
+            if token and token["expires_on"] > time.time() + self.expiry_skew:
+                self.stats["cache_hits"] += 1
+                return token["access_token"]
+        return self._fetch(scope)["access_token"]
+
+    def auth_headers(self, scope=COGNITIVE_SERVICES_SCOPE):
+        return {"Authorization": f"Bearer {self.get_token(scope)}"}
+
+    def close(self):
+        with self._lock:
+            timers = list(self._timers.values())
+        for timer in timers:
+            timer.cancel()
+
+def provider_from_env(**options):
+    """Provider for the service principal in AZURE_* variables, or None if unset"""
+    tenant_id = os.getenv("AZURE_TENANT_ID")
+    client_id = os.getenv("AZURE_CLIENT_ID")
+    client_secret = os.getenv("AZURE_CLIENT_SECRET")
+    if not (tenant_id and client_id and client_secret):
+        return None
+    options.setdefault("cache_path", os.getenv("AZURE_TOKEN_CACHE"))
+    return EntraTokenProvider(tenant_id, client_id, client_secret, **options)
+
+class MockTokenEndpoint:
+    """Local stand-in for the Entra ID v2.0 token endpoint (offline testing)"""
+
+    def __init__(self, host="127.0.0.1", port=0, expires_in=3600, delay=0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        return False
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+                with mock.lock:
+                    mock.requests += 1
+                time.sleep(mock.delay)
+                if form.get("grant_type") != ["client_credentials"] or not form.get("client_secret"):
+                    status, data = 400, {"error": "invalid_request"}
+                else:
+                    status, data = 200, {
+                        "token_type": "Bearer",
+                        "expires_in": mock.expires_in,
+                        "access_token": f"mock-{uuid.uuid4().hex}",
+                    }
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+if __name__ == "__main__":
+    print("🚀 Entra ID Token Provider (local token-endpoint stand-in)")
+    print("=" * 80)
+
+    with MockTokenEndpoint(expires_in=4, delay=0.2) as mock:
+        provider = EntraTokenProvider("tenant", "client", "secret", authority=mock.url,
+                                       refresh_margin=1, expiry_skew=0.5)
+
+        # 50 concurrent callers, one token request
+        with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
+            tokens = set(executor.map(lambda _: provider.get_token(), range(50)))
+        print(f"  50 concurrent callers -> {len(tokens)} token, {mock.requests} token request(s)")
+
+        # Keep calling across two expiries: the background refresh keeps every call fast
+        slowest_ms = 0.0
+        deadline = time.time() + 9
+        while time.time() < deadline:
+            start = time.perf_counter()
+            provider.get_token()
+            slowest_ms = max(slowest_ms, (time.perf_counter() - start) * 1000)
+            time.sleep(0.05)
+        print(f"  Slowest get_token() over 9s: {slowest_ms:.2f}ms | token requests: {mock.requests} | "
+              f"stats: {provider.stats}")
+        provider.close()
+
+    print("=" * 80)
@@ -1,6 +1,10 @@
 import requests
 import json
 
+from api_version_matrix import CapabilityMatrix
+from entra_auth import provider_from_env
+from sweep_checkpoint import journal_from_env
+
 # Your Azure AI Foundry endpoint
 base_url = "https://foundry-codespace-demo.services.ai.azure.com"
 headers = {
@@ -8,6 +12,9 @@ headers = {
     "Ocp-Apim-Subscription-Key": "YOUR_API_KEY_HERE"  # Replace with your actual API key
 }
 
+# api-version support learned from every response (persisted)
+capability_matrix = CapabilityMatrix()
+
 def explore_root_endpoint():
     """Explore what the root endpoint returns"""
     print("🔍 Exploring Root Endpoint")
@@ -66,8 +73,13 @@ def try_azure_openai_patterns():
         except Exception as e:
             print(f"  Error: {e}")
 
-def try_with_api_version():
-    """Try endpoints with API version parameter"""
+def try_with_api_version(journal=None):
+    """Try endpoints with API version parameter
+
+    Pass a SweepJournal to checkpoint progress and resume interrupted runs.
+    The capability matrix orders the versions (newest known-good first) and
+    skips versions it recently saw unsupported; stale entries are re-probed.
+    """
     print("\n🔢 Trying with API Version Parameters")
     print("=" * 50)
     
@@ -78,28 +90,55 @@ def try_with_api_version():
         "/openai/chat/completions"
     ]
     
-    for api_version in api_versions:
-        for path in base_paths:
-            url = f"{base_url}{path}?api-version={api_version}"
-            print(f"\nTrying GET {path}?api-version={api_version}...")
+    # Version order per path from the capability matrix: newest known-good first,
+    # stale entries re-probed, recently unsupported versions skipped
+    plans, known_good = {}, set()
+    for path in base_paths:
+        plan = capability_matrix.plan(f"{base_url}{path}", api_versions)
+        if plan["use"] or plan["race"]:
+            known_good.add(path)
+        plans[path] = [plan["use"]] if plan["use"] else (plan["race"] or plan["try"])
+        skipped = [v for v in api_versions if v not in plans[path]]
+        if skipped:
+            print(f"\n⏭️  GET {path} -> skipping {', '.join(skipped)} (capability matrix)")
+    
+    # Paths with a known-good version first
+    combos = [(v, p) for p in sorted(base_paths, key=lambda p: p not in known_good) for v in plans[p]]
+    
+    for api_version, path in combos:
+        url = f"{base_url}{path}?api-version={api_version}"
+        probe_id = f"GET {url}"
+        
+        # Skip combinations finished by an earlier (interrupted) run
+        if journal and journal.is_done(probe_id):
+            status_code = journal.result(probe_id)["status_code"]
+            print(f"\n⏭️  GET {path}?api-version={api_version} -> {status_code} (checkpointed)")
+            if status_code == 200:
+                return url
+            continue
+        
+        print(f"\nTrying GET {path}?api-version={api_version}...")
+        
+        try:
+            response = requests.get(url, headers=headers, timeout=5)
+            print(f"  Status: {response.status_code}")
+            capability_matrix.observe(url, response.status_code, response.text)
+            if journal:
+                journal.record(probe_id, {"status_code": response.status_code})
             
-            try:
-                response = requests.get(url, headers=headers, timeout=5)
-                print(f"  Status: {response.status_code}")
+            if response.status_code == 200:
+                try:
+                    content = response.json()
+                    print(f"  Success! Response: {json.dumps(content, indent=2)[:300]}...")
+                    return url  # Found a working endpoint
+                except:
+                    print(f"  Success! Response: {response.text[:300]}...")
+                    return url
+            elif response.status_code != 404:
+                print(f"  Interesting response: {response.text[:100]}...")
                 
-                if response.status_code == 200:
-                    try:
-                        content = response.json()
-                        print(f"  Success! Response: {json.dumps(content, indent=2)[:300]}...")
-                        return url  # Found a working endpoint
-                    except:
-                        print(f"  Success! Response: {response.text[:300]}...")
-                        return url
-                elif response.status_code != 404:
-                    print(f"  Interesting response: {response.text[:100]}...")
-                    
-            except Exception as e:
-                print(f"  Error: {e}")
+        except Exception as e:
+            print(f"  Error: {e}")
 
 def check_common_headers():
     """Check if different headers work"""
@@ -110,10 +149,19 @@ def check_common_headers():
     header_variants = [
         {"Ocp-Apim-Subscription-Key": "YOUR_API_KEY_HERE"},
         {"api-key": "YOUR_API_KEY_HERE"},
-        {"Authorization": "Bearer YOUR_API_KEY_HERE"},
         {"x-api-key": "YOUR_API_KEY_HERE"}
     ]
     
+    # Bearer auth needs an Entra ID token - the API key is not a bearer token
+    token_provider = provider_from_env()
+    if token_provider:
+        try:
+            header_variants.append(token_provider.auth_headers())
+        except requests.exceptions.RequestException as e:
+            print(f"Could not get an Entra ID token: {e}")
+    else:
+        print("⏭️  Skipping Bearer auth: set AZURE_TENANT_ID, AZURE_CLIENT_ID and AZURE_CLIENT_SECRET")
+    
     for i, header_variant in enumerate(header_variants):
         print(f"\nTrying header variant {i+1}: {list(header_variant.keys())[0]}")
         test_headers = {"Content-Type": "application/json", **header_variant}
@@ -139,7 +187,12 @@ if __name__ == "__main__":
     try_azure_openai_patterns()
     
     # Try with API version parameters
-    try_with_api_version()
+    journal = journal_from_env()
+    try:
+        try_with_api_version(journal)
+    finally:
+        if journal:
+            journal.close()
     
     # Try different authentication headers
     check_common_headers()
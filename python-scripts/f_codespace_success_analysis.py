@@ -16,6 +16,14 @@ NEXT STEPS TO GET CHAT COMPLETIONS WORKING:
 import requests
 import json
 
+from capacity_knee import capacity_report_path, load_reports
+from catalog_snapshots import CatalogSnapshotStore, diff_snapshots, print_diff
+from catalog_stream import iter_models, model_filter
+from moderation_cache import analyze_batch, moderation_cache_from_env
+
+# Content safety results keyed by normalised text (persisted when MODERATION_CACHE is set)
+moderation_cache = moderation_cache_from_env()
+
 def show_available_models():
     """Show the available models from your working F-Codespace resource"""
     
@@ -30,50 +38,65 @@ def show_available_models():
     print("🎯 RECOMMENDED MODELS TO DEPLOY:")
     print("=" * 50)
     
-    # Get models (we know this works)
+    # Get models (we know this works) - streamed entry by entry, never the whole catalog,
+    # and recorded as a snapshot so the next run can report catalog drift
     try:
-        response = requests.get(
-            "https://f-codespace.openai.azure.com/openai/models?api-version=2024-06-01",
-            headers=headers,
-            timeout=10
-        )
+        store = CatalogSnapshotStore()
+        previous = store.latest("F-Codespace")
+        recorder = store.recorder("F-Codespace")
+        chat_or_embeddings = model_filter(capability=("chat_completion", "embeddings"))
+        chat_count = 0
+        recommended_chat = ['gpt-4o', 'gpt-4o-mini', 'gpt-35-turbo', 'o3-mini', 'gpt-4']
+        recommended_found = {}
+        embedding_models = []  # only the first 3 are kept
+        embedding_count = 0
         
-        if response.status_code == 200:
-            models = response.json()
-            
-            # Filter for chat-capable models
-            chat_models = []
-            embedding_models = []
-            
-            for model in models['data']:
-                if model['capabilities'].get('chat_completion', False):
-                    chat_models.append(model)
-                elif model['capabilities'].get('embeddings', False):
+        for model in iter_models(
+            "https://f-codespace.openai.azure.com/openai/models?api-version=2024-06-01",
+            headers
+        ):
+            recorder.add(model)
+            if not chat_or_embeddings(model):
+                continue
+            if model['capabilities'].get('chat_completion', False):
+                chat_count += 1
+                if model['id'] in recommended_chat:
+                    recommended_found[model['id']] = model
+            else:
+                embedding_count += 1
+                if len(embedding_models) < 3:
                     embedding_models.append(model)
-            
-            print(f"\n🤖 CHAT MODELS AVAILABLE ({len(chat_models)}):")
-            print("-" * 40)
-            recommended_chat = ['gpt-4o', 'gpt-4o-mini', 'gpt-35-turbo', 'o3-mini', 'gpt-4']
-            
-            for model_name in recommended_chat:
-                found = next((m for m in chat_models if m['id'] == model_name), None)
-                if found:
-                    status = found.get('lifecycle_status', 'unknown')
-                    print(f"✅ {model_name:20} | Status: {status}")
-                else:
-                    print(f"❌ {model_name:20} | Not available")
-            
-            print(f"\n🔍 EMBEDDING MODELS AVAILABLE ({len(embedding_models)}):")
-            print("-" * 40)
-            for model in embedding_models[:3]:  # Show top 3
-                status = model.get('lifecycle_status', 'unknown')
-                print(f"✅ {model['id']:30} | Status: {status}")
+        
+        snapshot = recorder.commit()
+        print(f"\n📸 Catalog snapshot {snapshot['id']}: {len(snapshot['models'])} models")
+        if previous:
+            print_diff("F-Codespace", diff_snapshots(previous[0], snapshot))
+        
+        print(f"\n🤖 CHAT MODELS AVAILABLE ({chat_count}):")
+        print("-" * 40)
+        
+        for model_name in recommended_chat:
+            found = recommended_found.get(model_name)
+            if found:
+                status = found.get('lifecycle_status', 'unknown')
+                print(f"✅ {model_name:20} | Status: {status}")
+            else:
+                print(f"❌ {model_name:20} | Not available")
+        
+        print(f"\n🔍 EMBEDDING MODELS AVAILABLE ({embedding_count}):")
+        print("-" * 40)
+        for model in embedding_models:  # Show top 3
+            status = model.get('lifecycle_status', 'unknown')
+            print(f"✅ {model['id']:30} | Status: {status}")
                 
     except Exception as e:
         print(f"Error retrieving models: {e}")
 
-def create_deployment_commands():
-    """Show Azure CLI commands to create deployments"""
+def create_deployment_commands(default_capacity=10):
+    """Show Azure CLI commands to create deployments
+
+    --sku-capacity comes from capacity_knee.py measurements when available.
+    """
     
     print(f"\n{'='*60}")
     print("🚀 AZURE CLI COMMANDS TO CREATE DEPLOYMENTS")
@@ -99,8 +122,17 @@ def create_deployment_commands():
     
     print("\n💡 Run these commands to create deployments:\n")
     
+    capacity_reports = load_reports()
+    
     for deployment in deployments:
+        report = capacity_reports.get(deployment['model'], {})
+        capacity = report.get('recommended_capacity') or default_capacity
         print(f"# Create {deployment['description']}")
+        if report.get('recommended_capacity'):
+            print(f"# Capacity measured: {report['sustainable_rps']} req/s / {report['sustainable_tpm']:,} TPM "
+                  f"within p95 <= {report['slo_p95_ms']:.0f}ms")
+        else:
+            print(f"# Capacity not measured yet - run capacity_knee.py --target-rps N ({capacity_report_path()})")
         print(f"az cognitiveservices account deployment create \\")
         print(f"  --name 'F-codespace' \\")
         print(f"  --resource-group 'Foundry-Codespace' \\")
@@ -108,7 +140,7 @@ def create_deployment_commands():
         print(f"  --model-name '{deployment['model']}' \\")
         print(f"  --model-version 'latest' \\")
         print(f"  --model-format 'OpenAI' \\")
-        print(f"  --sku-capacity '10' \\")
+        print(f"  --sku-capacity '{capacity}' \\")
         print(f"  --sku-name 'Standard'")
         print()
 
@@ -121,48 +153,40 @@ def test_working_endpoints():
     
     api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
     
-    # Test 1: Content Safety (confirmed working)
+    # Test 1: Content Safety (confirmed working, repeated texts served from the moderation cache)
     print("\n🛡️  Testing Content Safety...")
-    try:
-        response = requests.post(
-            "https://f-codespace.services.ai.azure.com/contentsafety/text:analyze?api-version=2023-10-01",
-            headers={
-                "Content-Type": "application/json",
-                "Ocp-Apim-Subscription-Key": api_key
-            },
-            json={"text": "Hello world, this is a safety test!"},
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            print("✅ Content Safety WORKING!")
-            print(f"   Analysis: {len(result['categoriesAnalysis'])} categories checked")
-        else:
-            print(f"❌ Status: {response.status_code}")
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    outcome = analyze_batch(
+        ["Hello world, this is a safety test!"],
+        "https://f-codespace.services.ai.azure.com/contentsafety/text:analyze?api-version=2023-10-01",
+        {
+            "Content-Type": "application/json",
+            "Ocp-Apim-Subscription-Key": api_key
+        },
+        moderation_cache
+    )[0]
+    
+    if outcome["result"] is not None:
+        print(f"✅ Content Safety WORKING!{' (cached result)' if outcome['cached'] else ''}")
+        print(f"   Analysis: {len(outcome['result']['categoriesAnalysis'])} categories checked")
+    else:
+        print(f"❌ Status: {outcome['status']}")
     
     # Test 2: Model listing (confirmed working)
     print("\n🤖 Testing Model Listing...")
     try:
-        response = requests.get(
+        model_count = sum(1 for _ in iter_models(
             "https://f-codespace.openai.azure.com/openai/models?api-version=2024-06-01",
             headers={
                 "Content-Type": "application/json", 
                 "api-key": api_key
             },
             timeout=10
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ Model Listing WORKING!")
-            print(f"   Available models: {len(result['data'])}")
-        else:
-            print(f"❌ Status: {response.status_code}")
+        ))
+        print(f"✅ Model Listing WORKING!")
+        print(f"   Available models: {model_count}")
             
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Status: {e.response.status_code}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
@@ -16,6 +16,8 @@ import requests
 import json
 from datetime import datetime
 
+from reachability_matrix import dns_cache, classify_address, classify_response
+
 def create_working_example():
     """
     Create a working example once private endpoint is configured
@@ -83,6 +85,8 @@ def create_working_example():
     print(f"URL: {embedding_url}")
     print(f"Headers: {openai_headers}")
     print(f"Payload: {json.dumps(embedding_payload, indent=2)}")
+    print("Keep the vectors: EmbeddingStore(model).embed(texts, azure_embedder(openai_url, key, deployment))")
+    print("  stores them memory-mapped (embedding_store.py) and only sends texts it has not seen")
     
     # Example 3: Content Safety
     print("\n🛡️  Example 3: Content Safety")
@@ -97,6 +101,21 @@ def create_working_example():
     print(f"URL: {safety_url}")
     print(f"Headers: {foundry_headers}")
     print(f"Payload: {json.dumps(safety_payload, indent=2)}")
+    
+    # Example 4: Batch Chat Completions (offline workloads, see batch_client.py)
+    print("\n📦 Example 4: Batch Chat Completions")
+    print("-" * 40)
+    
+    batch_line = {
+        "custom_id": "task-0",
+        "method": "POST",
+        "url": "/chat/completions",
+        "body": {**chat_payload, "model": "{global-batch-deployment}"}
+    }
+    
+    print(f"Upload URL: {openai_url}/openai/files?api-version=2024-10-21  (purpose=batch)")
+    print(f"Batch URL:  {openai_url}/openai/batches?api-version=2024-10-21")
+    print(f"Input line: {json.dumps(batch_line)}")
 
 def show_next_steps():
     """Display the next steps to resolve the private endpoint issue"""
@@ -139,6 +158,12 @@ def test_public_access_status():
     print("🧪 Testing Current Public Access Status")
     print("=" * 60)
     
+    # Where does the OpenAI host resolve from this machine? (cached lookup)
+    resolved = dns_cache.resolve("foundry-codespace-demo.openai.azure.com")
+    if resolved["addresses"]:
+        address = resolved["addresses"][0]
+        print(f"🌐 DNS: {address} ({classify_address(address)} address, {resolved['dns_ms']:.0f}ms)")
+
     # Test the root endpoint which was working
     try:
         response = requests.get(
@@ -159,7 +184,8 @@ def test_public_access_status():
             timeout=10
         )
         
-        if response.status_code == 403 and "private endpoint" in response.text.lower():
+        verdict = classify_response(response.status_code, response.text)
+        if verdict == "private-only":
             print("🔒 Public access still disabled - private endpoint required")
             return False
         elif response.status_code == 200:
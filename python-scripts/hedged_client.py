@@ -0,0 +1,215 @@
+"""
+Azure AI Foundry - Hedged Chat Completions Across Resources
+
+Sends a chat completion to a primary resource/deployment. If it has not
+answered within the primary's learned latency percentile (p95 by default),
+a duplicate goes to the next resource; whichever answers first wins and
+the other attempt is cancelled. A hedge budget caps the extra load (by
+default at most 10% more requests than without hedging).
+
+Targets are built from the `resources` dict in compare_foundry_resources.py.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+import requests
+
+from circuit_breaker import guarded_request
+from compare_foundry_resources import resources
+from latency_histogram import LatencyHistogram
+
+deployment = "gpt-4o-mini-deployment"
+api_version = "2024-06-01"
+
+def targets_from_resources(resource_map, deployment_name):
+    """One hedge target per resource (same deployment name on each)"""
+    return [
+        {"name": name, "openai_url": config["openai_url"], "api_key": config["api_key"],
+         "deployment": deployment_name}
+        for name, config in resource_map.items()
+    ]
+
+class HedgeBudget:
+    """Token bucket: every request earns `ratio` tokens, every hedge spends one"""
+
+    def __init__(self, ratio=0.1, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class _Attempt:
+    """One in-flight request that can be told to give up"""
+
+    def __init__(self, target):
+        self.target = target
+        self.cancelled = threading.Event()
+
+class HedgedChatClient:
+    """Chat completions with latency-percentile hedging across targets"""
+
+    def __init__(self, targets, hedge_percentile=95, min_samples=20, initial_hedge_delay_ms=2000,
+                 budget_ratio=0.1, timeout=30, max_workers=32):
+        self.targets = targets
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.initial_hedge_delay_ms = initial_hedge_delay_ms
+        self.timeout = timeout
+        self.budget = HedgeBudget(budget_ratio)
+        self.latency = {t["name"]: LatencyHistogram() for t in targets}
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0, "failovers": 0}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def hedge_delay_ms(self, target):
+        """Delay before hedging: learned percentile once enough samples exist"""
+        histogram = self.latency[target["name"]]
+        if histogram.total_count < self.min_samples:
+            return self.initial_hedge_delay_ms
+        return histogram.percentile(self.hedge_percentile)
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _send(self, attempt, payload):
+        """Run one attempt; returns (target, response or None, error or None)"""
+        target = attempt.target
+        url = (f"{target['openai_url']}/openai/deployments/{target['deployment']}"
+               f"/chat/completions?api-version={api_version}")
+        start = time.perf_counter()
+        try:
+            response = guarded_request(
+                "POST",
+                url,
+                session=self._session(),
+                headers={"Content-Type": "application/json", "api-key": target["api_key"]},
+                json=payload,
+                timeout=self.timeout,
+                stream=True,
+            )
+            usable = response.status_code < 500 and response.status_code != 429
+            # The other attempt already won: drop the connection instead of reading the body.
+            # Still record the time to headers (a lower bound): these slow attempts are the ones
+            # that trigger hedges, and leaving them out would bias the learned hedge delay low.
+            if attempt.cancelled.is_set():
+                response.close()
+                if usable:
+                    self.latency[target["name"]].record_ms((time.perf_counter() - start) * 1000)
+                return target, None, "cancelled"
+            response.content  # read the body
+            if usable:
+                self.latency[target["name"]].record_ms((time.perf_counter() - start) * 1000)
+            return target, response, None
+        except requests.exceptions.RequestException as e:
+            # A loser that timed out took at least the timeout: also a (lower-bound) sample
+            if attempt.cancelled.is_set() and isinstance(e, requests.exceptions.Timeout):
+                self.latency[target["name"]].record_ms((time.perf_counter() - start) * 1000)
+            return target, None, str(e)
+
+    @staticmethod
+    def _usable(result):
+        response = result[1]
+        return response is not None and response.status_code < 500 and response.status_code != 429
+
+    def _pick_targets(self):
+        """Round-robin primary; the next target is the hedge"""
+        with self._lock:
+            primary = self._next % len(self.targets)
+            self._next += 1
+        return self.targets[primary], self.targets[(primary + 1) % len(self.targets)]
+
+    def chat(self, messages, **params):
+        """Send a chat completion, hedging to a second target when it is slow"""
+        payload = {"messages": messages, **params}
+        primary, secondary = self._pick_targets()
+        self.budget.on_request()
+        with self._lock:
+            self.stats["requests"] += 1
+
+        attempts = {}
+        first = _Attempt(primary)
+        attempts[self._executor.submit(self._send, first, payload)] = first
+
+        done, _ = concurrent.futures.wait(attempts, timeout=self.hedge_delay_ms(primary) / 1000.0)
+        # A fast failure (e.g. open circuit) fails over right away without spending budget
+        primary_failed = bool(done) and not self._usable(next(iter(done)).result())
+        if (not done or primary_failed) and secondary is not primary:
+            if primary_failed or self.budget.try_spend():
+                hedge = _Attempt(secondary)
+                attempts[self._executor.submit(self._send, hedge, payload)] = hedge
+                with self._lock:
+                    self.stats["failovers" if primary_failed else "hedges"] += 1
+            else:
+                with self._lock:
+                    self.stats["budget_denied"] += 1
+
+        # First usable answer wins; a failed attempt falls back to the other one
+        pending = set(attempts)
+        last = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                target, response, error = last = future.result()
+                if self._usable(last):
+                    for other in pending:
+                        attempts[other].cancelled.set()
+                    if target is not primary and not primary_failed:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return {"target": target["name"], "hedged": len(attempts) > 1, "response": response}
+
+        target, response, error = last
+        return {"target": target["name"], "hedged": len(attempts) > 1, "response": response, "error": error}
+
+    def print_stats(self):
+        print(f"\n🪃 HEDGING")
+        print("-" * 60)
+        requests_sent = self.stats["requests"] or 1
+        print(f"  Requests: {self.stats['requests']} | Hedges: {self.stats['hedges']} "
+              f"({self.stats['hedges'] / requests_sent * 100:.1f}%) | Hedge wins: {self.stats['hedge_wins']} | "
+              f"Budget denied: {self.stats['budget_denied']} | Failovers: {self.stats['failovers']}")
+        for name, histogram in self.latency.items():
+            delay = self.hedge_delay_ms(next(t for t in self.targets if t["name"] == name))
+            print(f"  {name:10} | hedge after {delay:.0f}ms")
+            histogram.print_summary(f"LATENCY - {name}")
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    print("🚀 Azure AI Foundry Hedged Chat Completions")
+    print("=" * 80)
+
+    client = HedgedChatClient(targets_from_resources(resources, deployment))
+    for target in client.targets:
+        print(f"🎯 {target['name']:10} | {target['openai_url']} | {target['deployment']}")
+
+    end_to_end = LatencyHistogram()
+    for i in range(50):
+        start = time.perf_counter()
+        result = client.chat([{"role": "user", "content": f"Hello! Request {i}"}], max_tokens=10)
+        end_to_end.record_ms((time.perf_counter() - start) * 1000)
+        status = result["response"].status_code if result["response"] is not None else result.get("error")
+        print(f"  #{i:3} -> {result['target']:10} | {status} {'(hedged)' if result['hedged'] else ''}")
+
+    end_to_end.print_summary("END-TO-END LATENCY (with hedging)")
+    client.print_stats()
+    client.close()
+    print("=" * 80)
@@ -0,0 +1,241 @@
+"""
+Azure AI Foundry - Latency Scaling Curves (prompt length x max_tokens)
+
+Sweeps a grid of prompt sizes and max_tokens per deployment (cells in random
+order, a few repeats each) with streamed requests, so every sample gives:
+
+• time to first token  -> prefill cost (grows with prompt tokens)
+• generation time      -> decode cost (grows with completion tokens)
+
+and fits linear cost models:
+
+    TTFT       = prefill_base_ms + prefill_ms_per_token x prompt_tokens
+    generation = decode_base_ms  + decode_ms_per_token  x completion_tokens
+
+Curves (per-cell medians + fits) are stored per model in latency_curves.json
+(LATENCY_CURVES) so gpt-4o, gpt-4o-mini, ... can be compared side by side.
+Simulated (--mock) curves go to a separate file next to it (*.mock.json).
+
+USAGE:
+======
+    python latency_curves.py --models gpt-4o,gpt-4o-mini
+    python latency_curves.py --compare              # stored curves only
+    python latency_curves.py --mock                 # two simulated deployments
+    python latency_curves.py --mock --compare       # stored simulated curves only
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+import requests
+
+from trace_replay import synthetic_prompt
+
+# Target resource and the deployments of the recommended chat models
+openai_url = "https://f-codespace.openai.azure.com"
+api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+api_version = "2024-06-01"
+model_deployments = {
+    "gpt-4o": "gpt-4o-deployment",
+    "gpt-4o-mini": "gpt-4o-mini-deployment",
+}
+
+PROMPT_TOKENS = [16, 256, 1024, 4096]
+MAX_TOKENS = [16, 64, 256]
+
+def curves_path(mock=False):
+    path = os.getenv("LATENCY_CURVES", "latency_curves.json")
+    # Simulated curves never land next to (or overwrite) real measurements
+    return os.path.splitext(path)[0] + ".mock.json" if mock else path
+
+def measure(url, key, prompt_tokens, max_tokens, session=None, timeout=120):
+    """One streamed request -> {ttft_ms, total_ms, completion_tokens} or None"""
+    payload = {
+        "messages": [{"role": "user", "content": synthetic_prompt(prompt_tokens)}],
+        "max_tokens": max_tokens,
+        "stream": True,
+    }
+    start = time.perf_counter()
+    try:
+        # No circuit breaker: one slow cell must not turn the rest of the sweep into fast-fails
+        response = (session or requests).post(url, json=payload, timeout=timeout, stream=True,
+                                              headers={"Content-Type": "application/json", "api-key": key})
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        response.close()
+        return None
+
+    ttft_ms, chunks, completion_tokens = None, 0, None
+    try:
+        for line in response.iter_lines():
+            if not line.startswith(b"data: {"):
+                continue
+            data = json.loads(line[6:])
+            if any(choice.get("delta", {}).get("content") for choice in data.get("choices", [])):
+                chunks += 1
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+            if data.get("usage"):
+                completion_tokens = data["usage"].get("completion_tokens")
+    except (requests.exceptions.RequestException, json.JSONDecodeError):
+        # Stream cut short (ChunkedEncodingError, read timeout) or a malformed event
+        response.close()
+        return None
+    total_ms = (time.perf_counter() - start) * 1000
+    if ttft_ms is None:
+        return None
+    # Without usage in the stream, one content chunk is roughly one token
+    return {"prompt_tokens": prompt_tokens, "max_tokens": max_tokens, "ttft_ms": ttft_ms,
+            "total_ms": total_ms, "completion_tokens": completion_tokens or chunks}
+
+def linear_fit(xs, ys):
+    """Least squares y = a + b x -> (a, b, r_squared)"""
+    n = len(xs)
+    if n < 2 or len(set(xs)) < 2:
+        return None
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    ss_total = sum((y - mean_y) ** 2 for y in ys)
+    ss_residual = sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys))
+    return intercept, slope, 1 - ss_residual / ss_total if ss_total else 1.0
+
+def fit_cost_model(samples):
+    """Prefill and decode cost models from raw samples"""
+    fit = {}
+    prefill = linear_fit([s["prompt_tokens"] for s in samples], [s["ttft_ms"] for s in samples])
+    if prefill:
+        fit.update(prefill_base_ms=prefill[0], prefill_ms_per_token=prefill[1], prefill_r2=prefill[2])
+    decode = linear_fit([s["completion_tokens"] for s in samples], [s["total_ms"] - s["ttft_ms"] for s in samples])
+    if decode:
+        fit.update(decode_base_ms=decode[0], decode_ms_per_token=decode[1], decode_r2=decode[2])
+    return fit
+
+def summarise_cells(samples):
+    """Median TTFT / total latency per (prompt_tokens, max_tokens) cell"""
+    cells = {}
+    for s in samples:
+        cells.setdefault((s["prompt_tokens"], s["max_tokens"]), []).append(s)
+    return [{
+        "prompt_tokens": prompt_tokens,
+        "max_tokens": max_tokens,
+        "samples": len(group),
+        "ttft_p50_ms": statistics.median(s["ttft_ms"] for s in group),
+        "total_p50_ms": statistics.median(s["total_ms"] for s in group),
+    } for (prompt_tokens, max_tokens), group in sorted(cells.items())]
+
+def sweep(url, key, prompt_grid, max_tokens_grid, repeats=3, seed=None):
+    """Run every grid cell `repeats` times in random order"""
+    plan = [(p, m) for p in prompt_grid for m in max_tokens_grid] * repeats
+    random.Random(seed).shuffle(plan)
+    session = requests.Session()
+    samples, failed = [], 0
+    for i, (prompt_tokens, max_tokens) in enumerate(plan, 1):
+        sample = measure(url, key, prompt_tokens, max_tokens, session=session)
+        if sample:
+            samples.append(sample)
+        else:
+            failed += 1
+        if i % 10 == 0 or i == len(plan):
+            print(f"    {i}/{len(plan)} requests ({failed} failed)")
+    return samples
+
+def load_curves(path=None):
+    path = path or curves_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_curve(model, deployment_name, samples, path=None):
+    path = path or curves_path()
+    curves = load_curves(path)
+    curves[model] = {
+        "deployment": deployment_name,
+        "measured_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "fit": fit_cost_model(samples),
+        "cells": summarise_cells(samples),
+        "samples": samples,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(curves, f, indent=2)
+    return curves[model]
+
+def predict_ms(fit, prompt_tokens, completion_tokens):
+    return (fit["prefill_base_ms"] + fit["prefill_ms_per_token"] * prompt_tokens
+            + fit["decode_base_ms"] + fit["decode_ms_per_token"] * completion_tokens)
+
+def print_comparison(curves):
+    print(f"\n📐 LATENCY COST MODELS")
+    print("-" * 80)
+    print(f"  {'model':15} | {'prefill ms/token':>16} | {'decode ms/token':>15} | {'r2 (pre/dec)':>12} | measured")
+    for model, curve in sorted(curves.items()):
+        fit = curve["fit"]
+        if "prefill_ms_per_token" not in fit or "decode_ms_per_token" not in fit:
+            print(f"  {model:15} | not enough data")
+            continue
+        print(f"  {model:15} | {fit['prefill_ms_per_token']:16.3f} | {fit['decode_ms_per_token']:15.2f} | "
+              f"{fit['prefill_r2']:.2f}/{fit['decode_r2']:.2f}{'':>3} | {curve['measured_at']}")
+
+    shapes = [(200, 50), (2000, 200), (8000, 500)]
+    print(f"\n  Predicted latency (prompt tokens / completion tokens):")
+    print(f"  {'model':15} | " + " | ".join(f"{p:>5}/{c:<4}" for p, c in shapes))
+    for model, curve in sorted(curves.items()):
+        fit = curve["fit"]
+        if "prefill_ms_per_token" in fit and "decode_ms_per_token" in fit:
+            print(f"  {model:15} | " + " | ".join(f"{predict_ms(fit, p, c):>8.0f}ms" for p, c in shapes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency vs prompt length and max_tokens")
+    parser.add_argument("--models", default=",".join(model_deployments), help="models to sweep")
+    parser.add_argument("--prompts", default=",".join(map(str, PROMPT_TOKENS)))
+    parser.add_argument("--max-tokens", default=",".join(map(str, MAX_TOKENS)))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--compare", action="store_true", help="only print stored curves")
+    parser.add_argument("--mock", action="store_true",
+                        help="sweep two local simulated deployments (stored in a separate *.mock.json)")
+    options = parser.parse_args()
+    path = curves_path(mock=options.mock)
+
+    print("🚀 Azure AI Foundry Latency Scaling Curves")
+    print("=" * 80)
+
+    if not options.compare:
+        prompts = [int(x) for x in options.prompts.split(",")]
+        max_tokens = [int(x) for x in options.max_tokens.split(",")]
+        models = options.models.split(",")
+
+        if options.mock:
+            from mock_deployment import MockDeploymentServer
+
+            # Roughly "bigger model" vs "smaller model"
+            profiles = {"gpt-4o": (0.08, 4.0), "gpt-4o-mini": (0.03, 1.5)}
+            for model in models:
+                prefill, decode = profiles.get(model, (0.05, 2.5))
+                with MockDeploymentServer(prefill_ms_per_token=prefill, decode_ms_per_token=decode) as mock:
+                    deployment_name = model_deployments.get(model, model)
+                    print(f"\n🧪 {model} (simulated: {prefill} ms/input token, {decode} ms/output token)")
+                    url = f"{mock.url}/openai/deployments/{deployment_name}/chat/completions?api-version={api_version}"
+                    save_curve(model, deployment_name, sweep(url, "mock-key", prompts, max_tokens, options.repeats),
+                               path)
+        else:
+            for model in models:
+                deployment_name = model_deployments.get(model, model)
+                print(f"\n🎯 {model} -> {openai_url} | deployment: {deployment_name}")
+                url = f"{openai_url}/openai/deployments/{deployment_name}/chat/completions?api-version={api_version}"
+                samples = sweep(url, api_key, prompts, max_tokens, options.repeats)
+                if samples:
+                    save_curve(model, deployment_name, samples, path)
+                else:
+                    print("  ❌ No successful samples - curve not stored")
+
+    print_comparison(load_curves(path))
+    print(f"\n💾 Curves: {path}")
+    print("=" * 80)
@@ -0,0 +1,203 @@
+"""
+Azure AI Foundry - Fixed-Memory Latency Histogram (HDR-style)
+
+Records latencies into log-bucketed counters with a fixed relative
+precision (2 significant figures by default), so any number of samples
+fits in a few thousand integers. Histograms with the same configuration
+merge by adding counters, which works across threads (record() is
+locked) and across processes/hosts (to_dict()/from_dict() snapshots).
+
+USAGE:
+======
+    latency = LatencyHistogram()
+    latency.record_ms(elapsed_ms)
+    latency.percentile(99)           # -> ms
+    latency.save("run.hist.json")
+
+    # Aggregate snapshots from several runs / processes
+    python latency_histogram.py a.hist.json b.hist.json
+"""
+
+import json
+import math
+import sys
+import threading
+
+class LatencyHistogram:
+    """Log-bucketed latency recorder with constant memory and mergeable counts
+
+    Values are stored in microseconds between `lowest_us` and `highest_us`;
+    larger values are clamped to `highest_us`.
+    """
+
+    def __init__(self, lowest_us=1, highest_us=3_600_000_000, significant_figures=2):
+        self.lowest_us = lowest_us
+        self.highest_us = highest_us
+        self.significant_figures = significant_figures
+
+        self._unit_magnitude = int(math.floor(math.log2(lowest_us)))
+        sub_bucket_count_magnitude = int(math.ceil(math.log2(2 * 10 ** significant_figures)))
+        self._sub_bucket_half_count_magnitude = sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count << self._unit_magnitude
+        while smallest_untrackable <= highest_us:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+
+        self.counts = [0] * ((bucket_count + 1) * self._sub_bucket_half_count)
+        self.total_count = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+        self._lock = threading.Lock()
+
+    def _config(self):
+        return (self.lowest_us, self.highest_us, self.significant_figures)
+
+    def _index_of(self, value):
+        pow2_ceiling = (value | self._sub_bucket_mask).bit_length()
+        bucket_index = pow2_ceiling - self._unit_magnitude - (self._sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = value >> (bucket_index + self._unit_magnitude)
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + \
+            (sub_bucket_index - self._sub_bucket_half_count)
+
+    def _value_range_of(self, index):
+        """Return (lowest, highest) value that maps to a counts index"""
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        shift = bucket_index + self._unit_magnitude
+        low = sub_bucket_index << shift
+        return low, low + (1 << shift) - 1
+
+    def record_us(self, value_us, count=1):
+        """Record a latency in microseconds"""
+        value = min(max(int(value_us), self.lowest_us), self.highest_us)
+        index = self._index_of(value)
+        with self._lock:
+            self.counts[index] += count
+            self.total_count += count
+            self.sum_us += value * count
+            if self.min_us is None or value < self.min_us:
+                self.min_us = value
+            if self.max_us is None or value > self.max_us:
+                self.max_us = value
+
+    def record_ms(self, value_ms, count=1):
+        """Record a latency in milliseconds"""
+        self.record_us(value_ms * 1000, count)
+
+    def percentile(self, p):
+        """Return the p-th percentile in milliseconds (None when empty)"""
+        with self._lock:
+            if not self.total_count:
+                return None
+            target = max(1, int(math.ceil(p / 100.0 * self.total_count)))
+            running = 0
+            for index, count in enumerate(self.counts):
+                running += count
+                if running >= target:
+                    high = self._value_range_of(index)[1]
+                    return min(high, self.max_us) / 1000.0
+            return self.max_us / 1000.0
+
+    def mean(self):
+        """Mean latency in milliseconds (None when empty)"""
+        if not self.total_count:
+            return None
+        return self.sum_us / self.total_count / 1000.0
+
+    def merge(self, other):
+        """Add another histogram's counts into this one"""
+        if other._config() != self._config():
+            raise ValueError("Cannot merge histograms with different configurations")
+        with other._lock:
+            counts = list(other.counts)
+            total, total_sum = other.total_count, other.sum_us
+            low, high = other.min_us, other.max_us
+        with self._lock:
+            for index, count in enumerate(counts):
+                if count:
+                    self.counts[index] += count
+            self.total_count += total
+            self.sum_us += total_sum
+            if low is not None and (self.min_us is None or low < self.min_us):
+                self.min_us = low
+            if high is not None and (self.max_us is None or high > self.max_us):
+                self.max_us = high
+        return self
+
+    def to_dict(self):
+        """Compact, JSON-serialisable snapshot (only non-zero counters)"""
+        with self._lock:
+            return {
+                "lowest_us": self.lowest_us,
+                "highest_us": self.highest_us,
+                "significant_figures": self.significant_figures,
+                "total_count": self.total_count,
+                "sum_us": self.sum_us,
+                "min_us": self.min_us,
+                "max_us": self.max_us,
+                "counts": [[i, c] for i, c in enumerate(self.counts) if c],
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["lowest_us"], data["highest_us"], data["significant_figures"])
+        for index, count in data["counts"]:
+            histogram.counts[index] = count
+        histogram.total_count = data["total_count"]
+        histogram.sum_us = data["sum_us"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def summary(self):
+        """Common percentiles in milliseconds"""
+        return {
+            "count": self.total_count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max_us / 1000.0 if self.max_us is not None else None,
+        }
+
+    def print_summary(self, title="LATENCY"):
+        print(f"\n⏱️  {title}")
+        print("-" * 60)
+        if not self.total_count:
+            print("  No samples recorded")
+            return
+        stats = self.summary()
+        print(f"  Samples: {stats['count']}")
+        print("  " + " | ".join(f"{k}: {v:.1f}ms" for k, v in stats.items() if k != "count"))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python latency_histogram.py <snapshot.json> [snapshot.json ...]")
+        sys.exit(1)
+
+    print("📊 Merging Latency Histogram Snapshots")
+    print("=" * 60)
+    merged = LatencyHistogram.load(sys.argv[1])
+    for path in sys.argv[2:]:
+        merged.merge(LatencyHistogram.load(path))
+    print(f"  Snapshots: {len(sys.argv) - 1}")
+    merged.print_summary("MERGED LATENCY")
@@ -0,0 +1,316 @@
+"""
+Azure AI Foundry - Latency/Health-Aware Client-Side Load Balancer
+
+Spreads chat and embedding traffic across several Foundry resources and
+deployments so no single account hits its TPM ceiling. Each request picks
+two random healthy backends and uses the better one (power of two choices),
+scored by EWMA latency of successful (2xx) calls, in-flight requests, the
+recent error rate and the rate-limit headroom reported by the service
+(x-ratelimit-remaining-tokens / -requests).
+
+HEALTH:
+=======
+• 2xx          -> ok, latency feeds the EWMA
+• 400 and other 4xx -> returned to the caller as is (the request's fault)
+• 429 with Retry-After -> backend cools down for that long, next backend
+• 401/403/404/5xx/timeouts -> backend error, next backend
+• Too many backend errors in the window -> backend is ejected
+  (exponential backoff), then re-admitted only after a probe succeeds
+"""
+
+import collections
+import random
+import threading
+import time
+
+import requests
+
+from circuit_breaker import guarded_request, parse_retry_after
+from compare_foundry_resources import resources
+
+api_version = "2024-06-01"
+
+# Outcomes that count against a backend (a 400 is the caller's problem, not the backend's)
+BACKEND_ERRORS = {"throttled", "unauthorized", "forbidden", "not_found", "error"}
+STATUS_OUTCOMES = {401: "unauthorized", 403: "forbidden", 404: "not_found"}
+RATE_LIMIT_HEADERS = {"tokens": "x-ratelimit-remaining-tokens", "requests": "x-ratelimit-remaining-requests"}
+
+# Deployments to use on every resource
+deployments = {
+    "chat": "gpt-4o-mini-deployment",
+    "embeddings": "embedding-deployment",
+}
+
+class Backend:
+    """One resource + deployment set and its live health statistics"""
+
+    def __init__(self, name, openai_url, api_key, deployment_map, ewma_alpha=0.3):
+        self.name = name
+        self.openai_url = openai_url.rstrip("/")
+        self.api_key = api_key
+        self.deployments = deployment_map
+        self.ewma_alpha = ewma_alpha
+        self.ewma_ms = None
+        self.inflight = 0
+        self.outcomes = collections.deque()  # (timestamp, outcome)
+        self.cooldown_until = 0.0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.totals = collections.Counter()
+        # Latest x-ratelimit-remaining-* values; the largest value seen stands in for the limit
+        self.remaining = {}
+        self.remaining_peak = {}
+        self.remaining_at = 0.0
+
+    def observe_rate_limits(self, headers, now):
+        for kind, header in RATE_LIMIT_HEADERS.items():
+            try:
+                value = float(headers[header])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.remaining[kind] = value
+            self.remaining_peak[kind] = max(self.remaining_peak.get(kind, 0.0), value)
+            self.remaining_at = now
+
+    def headroom(self, now, max_age):
+        """Smallest remaining/limit fraction from recent rate-limit headers (1.0 if unknown)"""
+        if not self.remaining or now - self.remaining_at > max_age:
+            return 1.0
+        return min((self.remaining[k] / self.remaining_peak[k] if self.remaining_peak[k] else 0.0)
+                   for k in self.remaining)
+
+    def available(self, now):
+        return now >= self.cooldown_until and not self.is_ejected()
+
+    def is_ejected(self):
+        """Ejected until a probe succeeds (even after the ejection timer runs out)"""
+        return self.ejected_until > 0
+
+class LoadBalancer:
+    """Power-of-two-choices routing with EWMA latency, in-flight and error penalties"""
+
+    def __init__(self, backends, window_seconds=60, min_requests=5, eject_error_rate=0.5,
+                 base_ejection_seconds=10, max_ejection_seconds=300, error_penalty=4.0,
+                 default_latency_ms=1000, headroom_threshold=0.2, headroom_penalty=10.0, timeout=30):
+        self.backends = backends
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.eject_error_rate = eject_error_rate
+        self.base_ejection_seconds = base_ejection_seconds
+        self.max_ejection_seconds = max_ejection_seconds
+        self.error_penalty = error_penalty
+        self.default_latency_ms = default_latency_ms
+        self.headroom_threshold = headroom_threshold
+        self.headroom_penalty = headroom_penalty
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._prober = threading.Thread(target=self._probe_loop, daemon=True)
+        self._prober.start()
+
+    # --- scoring -------------------------------------------------------
+
+    def _error_rate(self, backend, now):
+        while backend.outcomes and backend.outcomes[0][0] < now - self.window_seconds:
+            backend.outcomes.popleft()
+        if not backend.outcomes:
+            return 0.0
+        bad = sum(1 for _, outcome in backend.outcomes if outcome in BACKEND_ERRORS)
+        return bad / len(backend.outcomes)
+
+    def _pressure(self, backend, now):
+        """0 with headroom above the threshold, rising to 1 as the TPM/RPM budget runs out"""
+        headroom = backend.headroom(now, self.window_seconds)
+        return max(0.0, 1 - headroom / self.headroom_threshold) if self.headroom_threshold else 0.0
+
+    def _score(self, backend, now):
+        latency = backend.ewma_ms
+        if latency is None:
+            # Unmeasured backends look "typical" so they still get traffic to learn from
+            known = [b.ewma_ms for b in self.backends if b.ewma_ms is not None]
+            latency = sum(known) / len(known) if known else self.default_latency_ms
+        return (latency * (backend.inflight + 1) * (1 + self.error_penalty * self._error_rate(backend, now))
+                * (1 + self.headroom_penalty * self._pressure(backend, now)))
+
+    def _choose(self, kind, exclude):
+        """Pick a backend with power of two choices (caller holds the lock)"""
+        now = time.monotonic()
+        candidates = [
+            b for b in self.backends
+            if kind in b.deployments and b not in exclude and b.available(now)
+        ]
+        if not candidates:
+            # Everything is cooling down: fail open to the one that recovers first
+            fallback = [b for b in self.backends if kind in b.deployments and b not in exclude]
+            if not fallback:
+                return None
+            return min(fallback, key=lambda b: max(b.cooldown_until, b.ejected_until))
+        if len(candidates) == 1:
+            return candidates[0]
+        a, b = random.sample(candidates, 2)
+        return a if self._score(a, now) <= self._score(b, now) else b
+
+    # --- outcome bookkeeping ------------------------------------------
+
+    def _record(self, backend, outcome, elapsed_ms=None, retry_after=None, headers=None):
+        now = time.monotonic()
+        with self._lock:
+            backend.inflight -= 1
+            if headers is not None:
+                backend.observe_rate_limits(headers, now)
+            backend.totals[outcome] += 1
+            backend.outcomes.append((now, outcome))
+            if outcome == "ok" and elapsed_ms is not None:
+                if backend.ewma_ms is None:
+                    backend.ewma_ms = elapsed_ms
+                else:
+                    backend.ewma_ms += backend.ewma_alpha * (elapsed_ms - backend.ewma_ms)
+            if outcome == "throttled" and retry_after:
+                backend.cooldown_until = max(backend.cooldown_until, now + retry_after)
+
+            error_rate = self._error_rate(backend, now)
+            if (not backend.is_ejected() and len(backend.outcomes) >= self.min_requests
+                    and error_rate >= self.eject_error_rate):
+                self._eject(backend, now)
+
+    def _eject(self, backend, now):
+        backend.ejections += 1
+        duration = min(self.base_ejection_seconds * 2 ** (backend.ejections - 1), self.max_ejection_seconds)
+        backend.ejected_until = now + duration
+        backend.outcomes.clear()
+        print(f"  🚫 Ejected {backend.name} for {duration:.0f}s")
+
+    # --- re-admission -------------------------------------------------
+
+    def _probe(self, backend):
+        """Cheap health probe: list models on the resource"""
+        try:
+            response = self._session().get(
+                f"{backend.openai_url}/openai/models?api-version={api_version}",
+                headers={"api-key": backend.api_key},
+                timeout=10,
+            )
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _readmit_due(self):
+        """Probe every backend whose ejection timer ran out; re-admit or eject it again"""
+        now = time.monotonic()
+        with self._lock:
+            due = [b for b in self.backends if b.is_ejected() and b.ejected_until <= now]
+        for backend in due:
+            healthy = self._probe(backend)
+            with self._lock:
+                if healthy:
+                    backend.ejected_until = 0.0
+                    backend.ewma_ms = None  # relearn latency after recovery
+                    print(f"  ✅ Re-admitted {backend.name}")
+                else:
+                    self._eject(backend, time.monotonic())
+
+    def _probe_loop(self):
+        while not self._stop.wait(1.0):
+            self._readmit_due()
+
+    # --- requests -----------------------------------------------------
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _request(self, kind, path, payload):
+        tried = []
+        last = None
+        for _ in range(len(self.backends)):
+            with self._lock:
+                backend = self._choose(kind, tried)
+                if backend is None:
+                    break
+                backend.inflight += 1
+            tried.append(backend)
+
+            url = (f"{backend.openai_url}/openai/deployments/{backend.deployments[kind]}"
+                   f"/{path}?api-version={api_version}")
+            start = time.perf_counter()
+            try:
+                response = guarded_request(
+                    "POST",
+                    url,
+                    session=self._session(),
+                    headers={"Content-Type": "application/json", "api-key": backend.api_key},
+                    json=payload,
+                    timeout=self.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                self._record(backend, "error")
+                last = {"backend": backend.name, "response": None, "error": str(e)}
+                continue
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            last = {"backend": backend.name, "response": response}
+            status, headers = response.status_code, response.headers
+            if 200 <= status < 300:
+                self._record(backend, "ok", elapsed_ms, headers=headers)
+                return last
+            if status == 429:
+                self._record(backend, "throttled", retry_after=parse_retry_after(headers.get("Retry-After")),
+                             headers=headers)
+            elif status in STATUS_OUTCOMES or status >= 500:
+                # Missing deployment, bad key, disabled access, server error: try another backend
+                self._record(backend, STATUS_OUTCOMES.get(status, "error"), headers=headers)
+            else:
+                # 400 and other client errors: same answer anywhere, and says nothing about latency
+                self._record(backend, "client_error", headers=headers)
+                return last
+        return last
+
+    def chat(self, messages, **params):
+        """Route a chat completion to the best available backend"""
+        return self._request("chat", "chat/completions", {"messages": messages, **params})
+
+    def embed(self, text):
+        """Route an embeddings request to the best available backend"""
+        return self._request("embeddings", "embeddings", {"input": text})
+
+    def print_stats(self):
+        print(f"\n⚖️  LOAD BALANCER")
+        print("-" * 80)
+        now = time.monotonic()
+        for b in self.backends:
+            state = "ejected" if b.is_ejected() else ("cooldown" if now < b.cooldown_until else "healthy")
+            ewma = f"{b.ewma_ms:.0f}ms" if b.ewma_ms is not None else "-"
+            headroom = b.headroom(now, self.window_seconds)
+            print(f"  {b.name:10} | {state:8} | ewma {ewma:>7} | inflight {b.inflight} | "
+                  f"headroom {headroom * 100:3.0f}% | ok {b.totals['ok']} | 4xx {b.totals['client_error']} | "
+                  f"429 {b.totals['throttled']} | 401/403/404 {b.totals['unauthorized']}/{b.totals['forbidden']}/"
+                  f"{b.totals['not_found']} | err {b.totals['error']}")
+
+    def close(self):
+        self._stop.set()
+
+def backends_from_resources(resource_map, deployment_map):
+    """One backend per resource in compare_foundry_resources.resources"""
+    return [
+        Backend(name, config["openai_url"], config["api_key"], deployment_map)
+        for name, config in resource_map.items()
+    ]
+
+if __name__ == "__main__":
+    print("🚀 Azure AI Foundry Load-Balanced Client")
+    print("=" * 80)
+
+    balancer = LoadBalancer(backends_from_resources(resources, deployments))
+    for backend in balancer.backends:
+        print(f"🎯 {backend.name:10} | {backend.openai_url}")
+
+    for i in range(20):
+        result = balancer.chat([{"role": "user", "content": f"Hello! Request {i}"}], max_tokens=10)
+        status = result["response"].status_code if result and result["response"] is not None else "ERROR"
+        print(f"  #{i:3} -> {result['backend'] if result else '-':10} | {status}")
+
+    balancer.print_stats()
+    balancer.close()
+    print("=" * 80)
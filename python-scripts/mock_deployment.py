@@ -0,0 +1,169 @@
+"""
+Azure AI Foundry - Simulated Chat Deployment (offline benchmarking)
+
+A local stand-in for /openai/deployments/{name}/chat/completions (and
+/embeddings) that behaves like a capacity-limited deployment:
+
+• `concurrency` requests are processed at once; the rest wait in a queue
+  (and get 429 + Retry-After once `max_queue` are waiting)
+• service time = base_ms + prompt tokens x prefill_ms_per_token
+                 + completion tokens x decode_ms_per_token
+• "stream": true returns server-sent events, one chunk per token
+• /embeddings returns deterministic unit vectors (same text, same vector)
+
+Tokens are approximated as whitespace-separated words. Load generators and
+benchmarks (trace_replay.py, capacity_knee.py, ...) run against it with
+--mock so they can be exercised without a deployment or keys.
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def count_tokens(messages):
+    return sum(len(str(m.get("content", "")).split()) for m in messages)
+
+def mock_embedding(text, dim):
+    """Deterministic unit vector for a text"""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+class MockDeploymentServer:
+    """Capacity-limited chat completions endpoint with a prefill/decode cost model"""
+
+    def __init__(self, concurrency=8, max_queue=64, base_ms=20.0, prefill_ms_per_token=0.05,
+                 decode_ms_per_token=5.0, embedding_dim=256, host="127.0.0.1", port=0):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.base_ms = base_ms
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.embedding_dim = embedding_dim
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.waiting = 0
+        self.stats = {"requests": 0, "throttled": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        return False
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, delayed ACKs add ~40ms
+            disable_nagle_algorithm = True
+
+            def _send_json(self, data, status=200, extra_headers=None):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                route = self.path.split("?")[0]
+                if not route.endswith(("/chat/completions", "/embeddings")):
+                    self._send_json({"error": {"code": "NotFound"}}, 404)
+                    return
+
+                with mock.lock:
+                    mock.stats["requests"] += 1
+                    if mock.waiting >= mock.max_queue:
+                        mock.stats["throttled"] += 1
+                        throttled = True
+                    else:
+                        mock.waiting += 1
+                        throttled = False
+                if throttled:
+                    self._send_json({"error": {"code": "429", "message": "Rate limit exceeded"}}, 429,
+                                    {"Retry-After": "1"})
+                    return
+
+                mock.slots.acquire()
+                with mock.lock:
+                    mock.waiting -= 1
+                try:
+                    if route.endswith("/embeddings"):
+                        self._embed(request)
+                    else:
+                        self._complete(request)
+                finally:
+                    mock.slots.release()
+
+            def _embed(self, request):
+                inputs = request.get("input", [])
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                tokens = sum(len(str(text).split()) for text in inputs)
+                time.sleep((mock.base_ms + tokens * mock.prefill_ms_per_token) / 1000.0)
+                self._send_json({
+                    "object": "list",
+                    "data": [{"object": "embedding", "index": i, "embedding": mock_embedding(str(text), mock.embedding_dim)}
+                             for i, text in enumerate(inputs)],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+            def _complete(self, request):
+                prompt_tokens = count_tokens(request.get("messages", []))
+                completion_tokens = int(request.get("max_tokens") or 16)
+                time.sleep((mock.base_ms + prompt_tokens * mock.prefill_ms_per_token) / 1000.0)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+                if not request.get("stream"):
+                    time.sleep(completion_tokens * mock.decode_ms_per_token / 1000.0)
+                    self._send_json({
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "finish_reason": "length",
+                                     "message": {"role": "assistant", "content": "tok " * completion_tokens}}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for _ in range(completion_tokens):
+                    time.sleep(mock.decode_ms_per_token / 1000.0)
+                    self._chunk({"id": completion_id, "object": "chat.completion.chunk",
+                                 "choices": [{"index": 0, "delta": {"content": "tok "}}]})
+                self._chunk({"id": completion_id, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {}, "finish_reason": "length"}], "usage": usage})
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _chunk(self, data):
+                self._write_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+            def _write_chunk(self, payload):
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,318 @@
+"""
+Azure AI Foundry - Content Safety Result Cache
+
+Reuses /contentsafety/text:analyze results for text that was already
+moderated (templates, canned replies, retries).
+
+KEY:
+====
+SHA-256 of the normalised text (Unicode NFKC, whitespace collapsed), the
+resource host (blocklists are per resource), the api-version and the
+request options that change the answer (categories, blocklistNames,
+haltOnBlocklistHit, outputType).
+
+STORE:
+======
+SQLite (MODERATION_CACHE=<file>, in memory when unset). Entries expire
+after `ttl_seconds` and are evicted least-recently-used first once the
+stored results exceed `max_bytes`.
+
+BATCHES:
+========
+analyze_batch() de-duplicates the texts, looks every key up in one query
+and sends only the misses to the service (concurrently), so repeated
+content costs neither latency nor quota.
+
+USAGE:
+======
+    MODERATION_CACHE=moderation.db python moderation_cache.py texts.txt
+    python moderation_cache.py --mock                # simulated service, templated texts
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from circuit_breaker import CircuitOpenError, guarded_request
+
+# Request fields that change the analysis (everything except the text itself)
+KEYED_OPTIONS = ["categories", "blocklistNames", "haltOnBlocklistHit", "outputType"]
+
+def normalise_text(text):
+    """Canonical form of moderated text: NFKC, whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def api_version_of(url):
+    return parse_qs(urlsplit(url).query).get("api-version", [""])[0]
+
+def moderation_key(text, url, options=None):
+    """Key of one analysis: text, resource host and api-version of `url`, keyed options"""
+    kept = {k: (options or {})[k] for k in KEYED_OPTIONS if k in (options or {})}
+    material = json.dumps({"text": normalise_text(text), "host": urlsplit(url).netloc.lower(),
+                           "api_version": api_version_of(url), "options": kept},
+                          sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ModerationCache:
+    """Persistent, size-bounded LRU cache of content safety results"""
+
+    def __init__(self, path=":memory:", max_bytes=64 * 1024 * 1024, ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.metrics = collections.Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, stored_at REAL NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+        self.bytes_used = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_many(self, keys):
+        """{key: result} for the keys that are cached and fresh (one query per 500 keys)"""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found, expired = {}, []
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(f"SELECT key, response, stored_at FROM results WHERE key IN "
+                                        f"({','.join('?' * len(chunk))})", chunk).fetchall()
+                for key, response, stored_at in rows:
+                    if now - stored_at > self.ttl_seconds:
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(response)
+            if found:
+                self._db.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            if expired:
+                self._delete(expired)
+            self._db.commit()
+            self.metrics["hits"] += len(found)
+            self.metrics["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, results):
+        """Store {key: result} and evict LRU entries beyond the byte budget"""
+        now = time.time()
+        rows = []
+        for key, result in results.items():
+            response = json.dumps(result, separators=(",", ":"))
+            if len(response) <= self.max_bytes:
+                rows.append((key, response, len(response), now, now))
+        with self._lock:
+            self._delete([row[0] for row in rows])
+            self._db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?)", rows)
+            self.bytes_used += sum(row[2] for row in rows)
+            while self.bytes_used > self.max_bytes:
+                oldest = [key for key, in self._db.execute(
+                    "SELECT key FROM results ORDER BY last_used LIMIT 100").fetchall()]
+                if not oldest:
+                    # Nothing left to evict: the running total drifted, take the real one
+                    self.bytes_used = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+                    break
+                self.metrics["evictions"] += len(oldest)
+                self._delete(oldest)
+            self._db.commit()
+
+    def _delete(self, keys):
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            freed = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM results WHERE key IN ({placeholders})",
+                                     chunk).fetchone()[0]
+            self._db.execute(f"DELETE FROM results WHERE key IN ({placeholders})", chunk)
+            self.bytes_used -= freed
+
+    def get(self, text, url, options=None):
+        key = moderation_key(text, url, options)
+        return self.get_many([key]).get(key)
+
+    def put(self, text, url, result, options=None):
+        self.put_many({moderation_key(text, url, options): result})
+
+    def hit_rate(self):
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return self.metrics["hits"] / lookups if lookups else 0.0
+
+    def print_metrics(self):
+        print(f"\n🛡️  MODERATION CACHE")
+        print("-" * 60)
+        print(f"  Hits: {self.metrics['hits']} | Misses: {self.metrics['misses']} | "
+              f"Hit rate: {self.hit_rate() * 100:.1f}%")
+        print(f"  Entries: {len(self)} | Bytes: {self.bytes_used:,}/{self.max_bytes:,} | "
+              f"Evictions: {self.metrics['evictions']} | Store: {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def moderation_cache_from_env(var="MODERATION_CACHE", **options):
+    """SQLite-backed cache at the file named by an environment variable (in memory when unset)"""
+    path = os.getenv(var) or ":memory:"
+    cache = ModerationCache(path, **options)
+    if path != ":memory:":
+        print(f"🛡️  Moderation cache: {len(cache)} results in {path}")
+    return cache
+
+def analyze_batch(texts, url, headers, cache, options=None, max_workers=8, timeout=10):
+    """Moderate many texts; only cache misses are sent
+
+    Returns one {"status", "result", "cached"} per input text, in order.
+    """
+    keys = [moderation_key(text, url, options) for text in texts]
+    cached = cache.get_many(keys)
+    # One request per distinct missing key, with the first text that produced it
+    misses = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in misses:
+            misses[key] = text
+
+    local = threading.local()
+
+    def send(text):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        try:
+            response = guarded_request("POST", url, session=local.session, headers=headers,
+                                       json={**(options or {}), "text": text}, timeout=timeout)
+            return response.status_code, response.json() if response.status_code == 200 else None
+        except ValueError:
+            return "INVALID_JSON", None  # 200 with a body that is not JSON (proxy or captive page)
+        except CircuitOpenError:
+            return "CIRCUIT_OPEN", None
+        except requests.exceptions.RequestException as e:
+            return type(e).__name__, None
+
+    fetched = {}
+    if misses:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(misses))) as executor:
+            for key, (status, result) in zip(misses, executor.map(send, misses.values())):
+                fetched[key] = (status, result)
+        cache.put_many({key: result for key, (status, result) in fetched.items() if result is not None})
+
+    outcomes = []
+    for key in keys:
+        if key in cached:
+            outcomes.append({"status": 200, "result": cached[key], "cached": True})
+        else:
+            status, result = fetched[key]
+            outcomes.append({"status": status, "result": result, "cached": False})
+    return outcomes
+
+class MockContentSafetyServer:
+    """Local stand-in for /contentsafety/text:analyze (offline testing)"""
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.08):
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        return False
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with mock.lock:
+                    mock.requests += 1
+                time.sleep(mock.delay)
+                categories = request.get("categories") or ["Hate", "SelfHarm", "Sexual", "Violence"]
+                body = json.dumps({
+                    "blocklistsMatch": [],
+                    "categoriesAnalysis": [{"category": c, "severity": 0} for c in categories],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def templated_texts(count=500, distinct=60, seed=3):
+    """Canned replies with whitespace variations (normalise to `distinct` keys)"""
+    rng = random.Random(seed)
+    templates = [f"Thanks for contacting support about ticket {i}.  We will reply within 24 hours."
+                 for i in range(distinct)]
+    return [rng.choice(templates).replace("  ", rng.choice([" ", "  ", "\n"])) for _ in range(count)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Moderate texts through the content safety cache")
+    parser.add_argument("texts", nargs="?", help="file with one text per line")
+    parser.add_argument("--mock", action="store_true", help="use a local simulated content safety service")
+    parser.add_argument("--workers", type=int, default=8)
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Content Safety Cache")
+    print("=" * 80)
+
+    base_url = "https://f-codespace.services.ai.azure.com"
+    api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+    cache = moderation_cache_from_env()
+
+    def run(url, texts):
+        headers = {"Content-Type": "application/json", "Ocp-Apim-Subscription-Key": api_key}
+        for attempt in ("first pass", "second pass"):
+            start = time.perf_counter()
+            hits_before, misses_before = cache.metrics["hits"], cache.metrics["misses"]
+            outcomes = analyze_batch(texts, url, headers, cache, max_workers=options.workers)
+            statuses = collections.Counter(o["status"] for o in outcomes)
+            print(f"  {attempt:11} | {len(texts)} texts | {cache.metrics['hits'] - hits_before} hits, "
+                  f"{cache.metrics['misses'] - misses_before} sent | statuses {dict(statuses)} | "
+                  f"{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    if options.texts:
+        with open(options.texts, "r", encoding="utf-8") as f:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        texts = templated_texts()
+
+    if options.mock:
+        with MockContentSafetyServer() as mock:
+            print(f"🧪 Simulated content safety service ({mock.delay * 1000:.0f}ms per request)")
+            run(f"{mock.url}/contentsafety/text:analyze?api-version=2023-10-01", texts)
+            print(f"  Requests that reached the service: {mock.requests}")
+    else:
+        run(f"{base_url}/contentsafety/text:analyze?api-version=2023-10-01", texts)
+
+    cache.print_metrics()
+    cache.close()
+    print("=" * 80)
@@ -0,0 +1,236 @@
+"""
+Azure AI Foundry - Columnar Probe and Benchmark Results (Arrow / Parquet)
+
+Persists probe results (compare_foundry_resources) and benchmark samples
+(ab_latency, ...) as Arrow tables so months of runs can be analysed
+without re-parsing JSON.
+
+SCHEMA:
+=======
+run_id, kind, resource, host, path, api_version, method, status
+               dictionary-encoded strings (few distinct values, many rows)
+timestamp      timestamp[ms]
+success        bool
+latency_ms     float64 (null when the request failed)
+response_bytes int64
+error          string
+
+LAYOUT (PROBE_RESULTS, default .probe_results/):
+================================================
+<YYYY-MM>/<YYYYmmddTHHMMSS>-<run_id>.arrow
+    one uncompressed Arrow IPC file per run. The reader memory-maps the
+    files: opening is instant, only the requested columns are touched and
+    runs outside --since/--until are skipped by file name alone.
+
+`export` writes everything (or a slice) to one zstd Parquet file with
+dictionary-encoded columns for sharing or long-term storage.
+
+USAGE:
+======
+    PROBE_RESULTS=.probe_results python compare_foundry_resources.py
+    python probe_results.py summary --since 2026-01-01
+    python probe_results.py export results.parquet --since 2026-01-01
+"""
+
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+_dict = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ("run_id", _dict),
+    ("kind", _dict),
+    ("timestamp", pa.timestamp("ms")),
+    ("resource", _dict),
+    ("host", _dict),
+    ("path", _dict),
+    ("api_version", _dict),
+    ("method", _dict),
+    ("status", _dict),
+    ("success", pa.bool_()),
+    ("latency_ms", pa.float64()),
+    ("response_bytes", pa.int64()),
+    ("error", pa.string()),
+])
+
+DICTIONARY_COLUMNS = [field.name for field in SCHEMA if pa.types.is_dictionary(field.type)]
+
+def new_run_id():
+    return uuid.uuid4().hex[:8]
+
+def _parse_time(value):
+    if value is None:
+        return datetime.now()
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.fromisoformat(str(value))
+
+def probe_row(result, kind="probe"):
+    """One compare_foundry_resources-style result dict -> a schema row"""
+    parts = urlsplit(result.get("url", ""))
+    api_versions = parse_qs(parts.query).get("api-version")
+    status = result.get("status_code")
+    return {
+        "kind": kind,
+        "timestamp": _parse_time(result.get("timestamp")),
+        "resource": result.get("resource"),
+        "host": parts.netloc or None,
+        "path": parts.path or result.get("endpoint"),
+        "api_version": api_versions[0] if api_versions else None,
+        "method": (result.get("method") or "GET").upper(),
+        "status": None if status is None else str(status),
+        "success": bool(result.get("success", False)),
+        "latency_ms": result.get("latency_ms"),
+        "response_bytes": result.get("response_length"),
+        "error": result.get("error"),
+    }
+
+def sample_rows(name, url, latencies_ms, kind, method="GET", failures=0, timestamp=None):
+    """Benchmark samples for one target (successful latencies + failure count) -> rows"""
+    base = probe_row({"resource": name, "url": url, "method": method, "timestamp": timestamp}, kind)
+    rows = [{**base, "status": "200", "success": True, "latency_ms": latency} for latency in latencies_ms]
+    rows += [{**base, "status": "FAILED", "success": False} for _ in range(failures)]
+    return rows
+
+def to_table(rows, run_id=None):
+    """Rows -> Arrow table with dictionary-encoded string columns"""
+    run_id = run_id or new_run_id()
+    columns = {}
+    for field in SCHEMA:
+        if field.name == "run_id":
+            values = [run_id] * len(rows)
+        else:
+            values = [row.get(field.name) for row in rows]
+        if pa.types.is_dictionary(field.type):
+            columns[field.name] = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=SCHEMA)
+
+class ProbeResultStore:
+    """Directory of per-run Arrow IPC files, read back through memory maps"""
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("PROBE_RESULTS", ".probe_results")
+        os.makedirs(self.root, exist_ok=True)
+
+    def append(self, rows, run_id=None, started=None):
+        """Write one run (rows or a table in SCHEMA); returns the file path"""
+        table = rows if isinstance(rows, pa.Table) else to_table(rows, run_id)
+        run_id = table.column("run_id")[0].as_py() if table.num_rows else (run_id or new_run_id())
+        started = _parse_time(started)
+        directory = os.path.join(self.root, started.strftime("%Y-%m"))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{started.strftime('%Y%m%dT%H%M%S')}-{run_id}.arrow")
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        return path
+
+    def files(self, since=None, until=None):
+        """Run files in time order, pruned by the start time in the file name"""
+        since = since and _parse_time(since).strftime("%Y%m%dT%H%M%S")
+        until = until and _parse_time(until).strftime("%Y%m%dT%H%M%S")
+        paths = []
+        for month in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, month)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".arrow"):
+                    continue
+                stamp = name.split("-", 1)[0]
+                if (since and stamp < since) or (until and stamp > until):
+                    continue
+                paths.append(os.path.join(directory, name))
+        return paths
+
+    @staticmethod
+    def read_file(path, columns=None):
+        """One run file, memory-mapped (zero-copy)"""
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.select(columns) if columns else table
+
+    def scan(self, columns=None, since=None, until=None):
+        """Memory-mapped, zero-copy table over the selected runs and columns"""
+        tables = [self.read_file(path, columns) for path in self.files(since, until)]
+        if not tables:
+            schema = pa.schema([SCHEMA.field(name) for name in columns]) if columns else SCHEMA
+            return schema.empty_table()
+        return pa.concat_tables(tables)
+
+    def export_parquet(self, path, columns=None, since=None, until=None):
+        """Compact the selected runs into one Parquet file; returns the row count"""
+        table = self.scan(columns, since, until)
+        pq.write_table(table, path, compression="zstd",
+                       use_dictionary=[name for name in table.column_names if name in DICTIONARY_COLUMNS])
+        return table.num_rows
+
+def read_parquet(path, columns=None):
+    """Read an exported Parquet file (memory-mapped, only the requested columns)"""
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+def results_store_from_env(var="PROBE_RESULTS"):
+    """Store at the directory in an environment variable, or None"""
+    root = os.getenv(var)
+    return ProbeResultStore(root) if root else None
+
+def print_summary(table):
+    """Requests, success rate and median/p95 latency per kind/resource/path"""
+    print(f"\n🗄️  STORED RESULTS ({table.num_rows:,} rows)")
+    print("-" * 80)
+    if not table.num_rows:
+        return
+    table = table.unify_dictionaries()
+    grouped = table.group_by(["kind", "resource", "path"]).aggregate([
+        ("success", "count"),
+        ("success", "sum"),
+        ("latency_ms", "approximate_median"),
+        ("latency_ms", "tdigest", pc.TDigestOptions(q=0.95)),
+    ])
+    for row in sorted(grouped.to_pylist(), key=lambda r: (str(r["kind"]), str(r["resource"]), str(r["path"]))):
+        median, p95 = row["latency_ms_approximate_median"], row["latency_ms_tdigest"]
+        p95 = p95[0] if p95 else None
+        latency = f"p50 {median:8.1f}ms | p95 {p95:8.1f}ms" if median is not None else "no successful samples"
+        print(f"  {row['kind']:10} | {str(row['resource']):12} | {str(row['path'])[:40]:40} | "
+              f"{row['success_sum']:>5}/{row['success_count']:<5} ok | {latency}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and export stored probe/benchmark results")
+    parser.add_argument("--root", default=None, help="store directory (default PROBE_RESULTS or .probe_results)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    summary = subcommands.add_parser("summary", help="per resource/path outcomes and latency")
+    export = subcommands.add_parser("export", help="write the selected runs to one Parquet file")
+    export.add_argument("path")
+    export.add_argument("--columns", default=None, help="comma-separated columns (default all)")
+    for subcommand in (summary, export):
+        subcommand.add_argument("--since", default=None, help="ISO date/time")
+        subcommand.add_argument("--until", default=None, help="ISO date/time")
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Probe Results")
+    print("=" * 80)
+    store = ProbeResultStore(options.root)
+    if options.command == "summary":
+        start = time.perf_counter()
+        table = store.scan(["kind", "resource", "path", "success", "latency_ms"], options.since, options.until)
+        print(f"📂 {len(store.files(options.since, options.until))} runs mapped in "
+              f"{(time.perf_counter() - start) * 1000:.1f}ms")
+        print_summary(table)
+    else:
+        columns = options.columns.split(",") if options.columns else None
+        rows = store.export_parquet(options.path, columns, options.since, options.until)
+        print(f"💾 {rows:,} rows -> {options.path} ({os.path.getsize(options.path):,} bytes)")
+    print("=" * 80)
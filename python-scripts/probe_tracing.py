@@ -0,0 +1,233 @@
+"""
+Azure AI Foundry - Tracing Spans per Probe (OpenTelemetry-compatible)
+
+Every probe made by test_endpoint / test_single_endpoint / test_post_request
+becomes a CLIENT span with host, path, api-version, auth scheme, status,
+request/response bytes and phase timings. A W3C `traceparent` header is sent
+with the request so client spans line up with service-side traces.
+
+Spans are queued (bounded, dropped if full) and exported in batches by a
+background thread, so the request path only pays for a dict and a queue put.
+The wire format is OTLP/JSON (ExportTraceServiceRequest), so the output can
+be fed to any OpenTelemetry collector.
+
+PROBE_TRACES:
+=============
+    PROBE_TRACES=traces.jsonl               -> one OTLP/JSON batch per line
+    PROBE_TRACES=http://localhost:4318      -> POST batches to a local collector
+    (unset)                                 -> spans are not recorded
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from api_version_matrix import path_family
+
+SERVICE_NAME = "foundry-probes"
+
+# OTLP enums
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+def auth_scheme(headers):
+    """Which credential a request carries (never the credential itself)"""
+    names = {name.lower(): value for name, value in (headers or {}).items()}
+    if "authorization" in names:
+        return names["authorization"].split(" ", 1)[0].lower()
+    if "api-key" in names:
+        return "api-key"
+    if "ocp-apim-subscription-key" in names:
+        return "subscription-key"
+    return "none"
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Span:
+    """One probe; attributes are plain dict entries until export"""
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def phase(self, name, milliseconds):
+        """Record a phase timing as probe.phase.<name>_ms"""
+        self.attributes[f"probe.phase.{name}_ms"] = round(milliseconds, 3)
+
+    def record_response(self, response):
+        self.set("http.response.status_code", response.status_code)
+        if response.request is not None and response.request.body:
+            self.set("http.request.body.size", len(response.request.body))
+        self.set("http.response.body.size", len(response.content or b""))
+        if response.elapsed:
+            # requests measures send -> headers parsed
+            self.phase("time_to_headers", response.elapsed.total_seconds() * 1000)
+        if response.status_code >= 500:
+            self.status_code = STATUS_ERROR
+
+    def record_error(self, error):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(error)[:200]
+        self.set("error.type", type(error).__name__)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._on_end(self)
+
+    def to_otlp(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_CLIENT,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+def otlp_request(spans):
+    """ExportTraceServiceRequest (OTLP/JSON) for a batch of spans"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "probe_tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]
+    }
+
+class FileExporter:
+    """Appends one OTLP/JSON export request per line"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(otlp_request(spans), separators=(",", ":")) + "\n")
+
+class CollectorExporter:
+    """POSTs OTLP/JSON to a local collector (http://host:4318/v1/traces)"""
+
+    def __init__(self, endpoint, timeout=5):
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, spans):
+        response = self.session.post(self.url, json=otlp_request(spans), timeout=self.timeout)
+        response.raise_for_status()
+
+class Tracer:
+    """Creates probe spans and exports finished ones in background batches"""
+
+    def __init__(self, exporter=None, max_queue=4096, max_batch=512, schedule_delay=2.0):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.schedule_delay = schedule_delay
+        self.dropped = 0
+        self.exported = 0
+        self.export_errors = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._worker = None
+        if exporter:
+            self._worker = threading.Thread(target=self._export_loop, daemon=True)
+            self._worker.start()
+            atexit.register(self.shutdown)
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def start_probe_span(self, method, url, headers=None):
+        """Span for one HTTP probe with host/path/api-version/auth attributes"""
+        parts = urlsplit(url)
+        attributes = {
+            "http.request.method": method.upper(),
+            "server.address": parts.hostname or "",
+            "url.path": parts.path or "/",
+            "url.scheme": parts.scheme,
+            "azure.api_version": parse_qs(parts.query).get("api-version", [""])[0],
+            "probe.auth_scheme": auth_scheme(headers),
+        }
+        return Span(self, f"{method.upper()} {path_family(parts.path or '/')}", attributes)
+
+    def _on_end(self, span):
+        if not self.exporter:
+            return
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.schedule_delay
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                # Short waits so shutdown() does not sit out a whole schedule_delay
+                batch.append(self._queue.get(timeout=min(max(deadline - time.monotonic(), 0.01), 0.25)))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.max_batch or (batch and time.monotonic() >= deadline):
+                self._export(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.schedule_delay
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch):
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.export_errors += 1
+            if self.export_errors == 1:
+                print(f"⚠️  Span export failed ({e}); further export errors are counted silently")
+
+    def shutdown(self, timeout=5.0):
+        """Flush queued spans and stop the export thread"""
+        if self._worker and self._worker.is_alive():
+            self._stop.set()
+            self._worker.join(timeout)
+
+def tracer_from_env(var="PROBE_TRACES"):
+    """Tracer exporting to the file or collector URL in an environment variable"""
+    target = os.getenv(var)
+    if not target:
+        return Tracer()
+    if target.startswith(("http://", "https://")):
+        return Tracer(CollectorExporter(target))
+    return Tracer(FileExporter(target))
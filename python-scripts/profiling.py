@@ -0,0 +1,247 @@
+"""
+Azure AI Foundry - Profiling Any Script Entry Point
+
+Runs any script in this folder as __main__ (no edits needed) with:
+• CPU profile (cProfile, main thread)   -> cpu.prof (pstats/snakeviz) + cpu.txt
+• Allocation tracking (tracemalloc)     -> memory.txt (peak + top allocation sites)
+• Per-phase time breakdown              -> phases.json + printed summary
+
+PHASES:
+=======
+network         requests.Session.send() and streamed body reads (iter_content)
+json_decode     JSONDecoder.raw_decode() / Response.json()
+json_pretty     json.dumps(..., indent=...)
+json_encode     json.dumps() without indent
+terminal_output writes to stdout/stderr (print)
+other           everything else (wall time minus the phases above)
+
+Phase times are summed across threads, so they can exceed wall time for
+threaded scripts; nested calls of the same phase are counted once.
+
+USAGE:
+======
+    python profiling.py complete_api_test.py
+    python profiling.py --no-memory compare_foundry_resources.py
+    python profiling.py --out profiles/run1 sharded_executor.py local plan.jsonl
+"""
+
+import argparse
+import cProfile
+import collections
+import functools
+import json
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+
+import requests
+
+PHASES = ["network", "json_decode", "json_pretty", "json_encode", "terminal_output"]
+
+class PhaseTimer:
+    """Accumulates wall time per phase; re-entrant calls of a phase count once"""
+
+    def __init__(self):
+        self.totals = collections.Counter()
+        self.counts = collections.Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _active(self):
+        if not hasattr(self._local, "active"):
+            self._local.active = set()
+        return self._local.active
+
+    def call(self, phase, func, *args, **kwargs):
+        active = self._active()
+        if phase in active:
+            return func(*args, **kwargs)
+        active.add(phase)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            active.discard(phase)
+            with self._lock:
+                self.totals[phase] += elapsed
+                self.counts[phase] += 1
+
+    def wrap(self, phase, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            return self.call(phase, func, *args, **kwargs)
+        return timed
+
+class _TimedStream:
+    """stdout/stderr proxy that times every write"""
+
+    def __init__(self, stream, timer):
+        self._stream = stream
+        self._timer = timer
+
+    def write(self, text):
+        return self._timer.call("terminal_output", self._stream.write, text)
+
+    def flush(self):
+        return self._timer.call("terminal_output", self._stream.flush)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class Profiler:
+    """CPU profile + tracemalloc + phase breakdown around a block of code"""
+
+    def __init__(self, cpu=True, memory=True, memory_frames=1):
+        self.cpu = cpu
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.phases = PhaseTimer()
+        self.profile = cProfile.Profile() if cpu else None
+        self.memory_snapshot = None
+        self.peak_bytes = 0
+        self.wall_seconds = 0.0
+        self._patches = []
+
+    def _patch(self, owner, name, replacement):
+        self._patches.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, replacement)
+
+    def _install(self):
+        timer = self.phases
+        self._patch(requests.Session, "send", timer.wrap("network", requests.Session.send))
+
+        original_iter_content = requests.models.Response.iter_content
+
+        @functools.wraps(original_iter_content)
+        def iter_content(response, *args, **kwargs):
+            chunks = original_iter_content(response, *args, **kwargs)
+            while True:
+                try:
+                    chunk = timer.call("network", next, chunks)
+                except StopIteration:
+                    return
+                yield chunk
+
+        self._patch(requests.models.Response, "iter_content", iter_content)
+        self._patch(requests.models.Response, "json", timer.wrap("json_decode", requests.models.Response.json))
+        self._patch(json.JSONDecoder, "raw_decode", timer.wrap("json_decode", json.JSONDecoder.raw_decode))
+
+        original_dumps = json.dumps
+
+        @functools.wraps(original_dumps)
+        def dumps(*args, **kwargs):
+            phase = "json_pretty" if kwargs.get("indent") is not None else "json_encode"
+            return timer.call(phase, original_dumps, *args, **kwargs)
+
+        self._patch(json, "dumps", dumps)
+        self._patch(sys, "stdout", _TimedStream(sys.stdout, timer))
+        self._patch(sys, "stderr", _TimedStream(sys.stderr, timer))
+
+    def _uninstall(self):
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+
+    def start(self):
+        self._install()
+        if self.memory:
+            tracemalloc.start(self.memory_frames)
+        self._start = time.perf_counter()
+        if self.profile:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile:
+            self.profile.disable()
+        self.wall_seconds = time.perf_counter() - self._start
+        if self.memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.memory_snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ])
+            tracemalloc.stop()
+        self._uninstall()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def phase_report(self):
+        phases = {
+            phase: {"seconds": round(self.phases.totals[phase], 6), "calls": self.phases.counts[phase]}
+            for phase in PHASES
+        }
+        accounted = sum(self.phases.totals[phase] for phase in PHASES)
+        phases["other"] = {"seconds": round(max(self.wall_seconds - accounted, 0.0), 6), "calls": None}
+        return {"wall_seconds": round(self.wall_seconds, 6), "peak_memory_bytes": self.peak_bytes, "phases": phases}
+
+    def write_reports(self, out_dir, top=40):
+        """cpu.prof, cpu.txt, memory.txt and phases.json in out_dir"""
+        os.makedirs(out_dir, exist_ok=True)
+        if self.profile:
+            self.profile.dump_stats(os.path.join(out_dir, "cpu.prof"))
+            with open(os.path.join(out_dir, "cpu.txt"), "w", encoding="utf-8") as f:
+                stats = pstats.Stats(self.profile, stream=f)
+                stats.sort_stats("cumulative").print_stats(top)
+                stats.sort_stats("tottime").print_stats(top)
+        if self.memory_snapshot:
+            with open(os.path.join(out_dir, "memory.txt"), "w", encoding="utf-8") as f:
+                f.write(f"Peak traced memory: {self.peak_bytes:,} bytes\n\n")
+                f.write(f"Top {top} allocation sites still alive at exit:\n")
+                for stat in self.memory_snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
+        with open(os.path.join(out_dir, "phases.json"), "w", encoding="utf-8") as f:
+            json.dump(self.phase_report(), f, indent=2)
+
+    def print_summary(self, out_dir=None):
+        report = self.phase_report()
+        wall = report["wall_seconds"] or 1e-9
+        print(f"\n🔬 PROFILE ({report['wall_seconds']:.3f}s wall, peak memory {report['peak_memory_bytes']:,} bytes)")
+        print("-" * 60)
+        for phase, entry in report["phases"].items():
+            calls = f"{entry['calls']:>7} calls" if entry["calls"] is not None else ""
+            print(f"  {phase:16} {entry['seconds'] * 1000:>10.1f}ms  {entry['seconds'] / wall * 100:>5.1f}%  {calls}")
+        if out_dir:
+            print(f"  Reports: {out_dir}")
+
+def profile_script(script, argv, out_dir=None, cpu=True, memory=True):
+    """Run a script as __main__ under the profiler and write its reports"""
+    name = os.path.splitext(os.path.basename(script))[0]
+    out_dir = out_dir or os.path.join(
+        os.getenv("PROFILE_DIR", "profiles"), f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+    )
+    # The script sees its own argv and can import its sibling modules
+    sys.argv = [script] + list(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+    profiler = Profiler(cpu=cpu, memory=memory)
+    try:
+        with profiler:
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        profiler.write_reports(out_dir)
+        profiler.print_summary(out_dir)
+    return profiler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile any script entry point")
+    parser.add_argument("--out", default=None, help="report directory (default profiles/<script>-<time>)")
+    parser.add_argument("--no-cpu", action="store_true", help="skip cProfile")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (much lower overhead)")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    options = parser.parse_args()
+
+    profile_script(options.script, options.args, out_dir=options.out,
+                   cpu=not options.no_cpu, memory=not options.no_memory)
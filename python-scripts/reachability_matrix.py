@@ -0,0 +1,265 @@
+"""
+Azure AI Foundry - Private Endpoint vs Public Path Reachability Matrix
+
+Resolves every host once (cached with a TTL), classifies each resolved
+address as private or public, then probes every host over every network
+path concurrently. The output is a host x network-path matrix with the
+latency of each cell split into DNS, TCP connect, TLS and time-to-first-byte,
+so a slow check can be pinned on DNS, private-link routing or the service.
+
+NETWORK PATHS:
+==============
+public      -> <account>.openai.azure.com (what the scripts normally call)
+privatelink -> <account>.privatelink.openai.azure.com (only resolves inside
+               a VNet linked to the private DNS zone)
+"""
+
+import http.client
+import ipaddress
+import socket
+import ssl
+import threading
+import time
+import concurrent.futures
+
+# Hosts to check (same accounts as compare_foundry_resources.py)
+hosts = [
+    "foundry-codespace-demo.openai.azure.com",
+    "foundry-codespace-demo.services.ai.azure.com",
+    "f-codespace.openai.azure.com",
+    "f-codespace.services.ai.azure.com",
+]
+
+api_key = "YOUR_API_KEY_HERE"  # Replace with your actual API key
+probe_path = "/openai/models?api-version=2024-06-01"
+
+NETWORK_PATHS = ["public", "privatelink"]
+
+class DnsCache:
+    """Resolve each host once and keep the answer for `ttl` seconds"""
+
+    def __init__(self, ttl=300, negative_ttl=30):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._host_locks = {}
+
+    def _host_lock(self, host):
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def resolve(self, host, port=443):
+        """Return {"addresses", "dns_ms", "cached", "error"} for a host"""
+        # One lock per host so concurrent probes share a single lookup
+        with self._host_lock(host):
+            entry = self._entries.get(host)
+            if entry:
+                ttl = self.negative_ttl if entry["error"] else self.ttl
+                if time.monotonic() - entry["resolved_at"] < ttl:
+                    return dict(entry, cached=True)
+
+            start = time.perf_counter()
+            try:
+                infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+                addresses = []
+                for info in infos:
+                    if info[4][0] not in addresses:
+                        addresses.append(info[4][0])
+                error = None
+            except socket.gaierror as e:
+                addresses = []
+                error = str(e)
+
+            entry = {
+                "addresses": addresses,
+                "dns_ms": (time.perf_counter() - start) * 1000,
+                "error": error,
+                "resolved_at": time.monotonic(),
+            }
+            # Failed lookups are only kept briefly so a later VNet connection is picked up
+            self._entries[host] = entry
+            return dict(entry, cached=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+dns_cache = DnsCache()
+
+def classify_address(address):
+    """Classify a resolved IP address as 'private' or 'public'"""
+    ip = ipaddress.ip_address(address)
+    if ip.is_private or ip.is_loopback or ip.is_link_local:
+        return "private"
+    return "public"
+
+def classify_response(status_code, body_text=""):
+    """Turn a status code and body into a reachability verdict"""
+    text = (body_text or "").lower()
+    if status_code == 403 and ("private endpoint" in text or "public access is disabled" in text):
+        return "private-only"
+    if status_code in [200, 201, 202]:
+        return "open"
+    if status_code in [401, 403]:
+        return "reachable (auth)"
+    if status_code == 404:
+        return "reachable (404)"
+    return f"reachable ({status_code})"
+
+def network_path_host(host, path_name):
+    """Return the hostname to use for a given network path"""
+    if path_name == "privatelink":
+        account, _, suffix = host.partition(".")
+        if suffix.startswith("privatelink."):
+            return host
+        return f"{account}.privatelink.{suffix}"
+    return host
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection to a pre-resolved address that records connect/TLS time"""
+
+    def __init__(self, host, address, timeout, context):
+        super().__init__(host, 443, timeout=timeout, context=context)
+        self._address = address
+        self.connect_ms = None
+        self.tls_ms = None
+
+    def connect(self):
+        start = time.perf_counter()
+        sock = socket.create_connection((self._address, self.port), self.timeout)
+        connected = time.perf_counter()
+        self.connect_ms = (connected - start) * 1000
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+        self.tls_ms = (time.perf_counter() - connected) * 1000
+
+def probe_cell(host, path_name, path=probe_path, key=None, timeout=10, cache=None):
+    """Probe one host over one network path and return the timing breakdown"""
+    cache = cache or dns_cache
+    target_host = network_path_host(host, path_name)
+
+    cell = {
+        "host": host,
+        "network_path": path_name,
+        "target_host": target_host,
+    }
+
+    resolved = cache.resolve(target_host)
+    cell.update({
+        "dns_ms": resolved["dns_ms"],
+        "dns_cached": resolved["cached"],
+        "addresses": resolved["addresses"],
+    })
+    if resolved["error"]:
+        cell.update({"verdict": "no DNS", "error": resolved["error"]})
+        return cell
+
+    address = resolved["addresses"][0]
+    cell["address_class"] = classify_address(address)
+
+    headers = {"Host": target_host}
+    if key:
+        headers["api-key"] = key
+
+    conn = _PinnedHTTPSConnection(target_host, address, timeout, ssl.create_default_context())
+    try:
+        start = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        first_byte = time.perf_counter()
+        body = response.read(2048).decode("utf-8", errors="replace")
+
+        handshake_ms = (conn.connect_ms or 0) + (conn.tls_ms or 0)
+        cell.update({
+            "connect_ms": conn.connect_ms,
+            "tls_ms": conn.tls_ms,
+            "ttfb_ms": (first_byte - start) * 1000 - handshake_ms,
+            "status_code": response.status,
+            "verdict": classify_response(response.status, body),
+        })
+    except socket.timeout:
+        cell.update({"verdict": "timeout", "error": "Timeout", "connect_ms": conn.connect_ms})
+    except (ConnectionError, OSError) as e:
+        cell.update({"verdict": "unreachable", "error": str(e), "connect_ms": conn.connect_ms})
+    except http.client.HTTPException as e:
+        # RemoteDisconnected, BadStatusLine, ... from a proxy or private endpoint
+        cell.update({"verdict": "protocol_error", "error": f"{type(e).__name__}: {e}",
+                     "connect_ms": conn.connect_ms})
+    finally:
+        conn.close()
+
+    cell["total_ms"] = sum(cell.get(k) or 0 for k in ["dns_ms", "connect_ms", "tls_ms", "ttfb_ms"])
+    return cell
+
+def build_reachability_matrix(host_list=None, paths=None, key=None, max_workers=8, cache=None):
+    """Probe every host over every network path concurrently"""
+    host_list = host_list or hosts
+    paths = paths or NETWORK_PATHS
+    cache = cache or dns_cache
+
+    # Resolve every distinct target once up front, in parallel
+    targets = {network_path_host(h, p) for h in host_list for p in paths}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(cache.resolve, targets))
+
+        futures = {
+            executor.submit(probe_cell, host, path_name, key=key, cache=cache): (host, path_name)
+            for host in host_list
+            for path_name in paths
+        }
+        matrix = {host: {} for host in host_list}
+        for future in concurrent.futures.as_completed(futures):
+            host, path_name = futures[future]
+            matrix[host][path_name] = future.result()
+
+    return matrix
+
+def print_reachability_matrix(matrix, paths=None):
+    """Print the host x network-path matrix and the per-cell breakdown"""
+    paths = paths or NETWORK_PATHS
+
+    print(f"\n{'='*80}")
+    print("🌐 REACHABILITY MATRIX (host x network path)")
+    print("=" * 80)
+    header = f"{'Host':48}" + "".join(f"| {p:28}" for p in paths)
+    print(header)
+    print("-" * len(header))
+    for host, cells in matrix.items():
+        row = f"{host:48}"
+        for path_name in paths:
+            cell = cells.get(path_name, {})
+            if "status_code" in cell:
+                text = f"{cell['total_ms']:.0f}ms {cell['verdict']}"
+            else:
+                text = cell.get("verdict", "n/a")
+            row += f"| {text:28}"
+        print(row)
+
+    print(f"\n⏱️  LATENCY BREAKDOWN (ms)")
+    print("-" * 80)
+    print(f"{'Host / path':60} {'dns':>6} {'tcp':>6} {'tls':>6} {'ttfb':>6}  addr")
+    for host, cells in matrix.items():
+        for path_name in paths:
+            cell = cells.get(path_name, {})
+            timings = " ".join(
+                f"{cell[k]:6.0f}" if cell.get(k) is not None else f"{'-':>6}"
+                for k in ["dns_ms", "connect_ms", "tls_ms", "ttfb_ms"]
+            )
+            print(f"{cell.get('target_host', host):60} {timings}  {cell.get('address_class', '-')}")
+
+if __name__ == "__main__":
+    print("🚀 Azure AI Foundry Reachability Matrix")
+    print("=" * 80)
+    print(f"🎯 Hosts: {len(hosts)} | Paths: {', '.join(NETWORK_PATHS)}")
+    print(f"🔎 Probe: GET {probe_path}")
+
+    matrix = build_reachability_matrix(key=api_key)
+    print_reachability_matrix(matrix)
+
+    print(f"\n{'='*80}")
+    print("💡 HOW TO READ THIS:")
+    print("• 'private-only' on public + 'no DNS' on privatelink -> run from the VNet")
+    print("• High dns        -> resolver / private DNS zone forwarding is slow")
+    print("• High tcp/tls    -> private-link or network routing is slow")
+    print("• High ttfb       -> the service itself is slow")
+    print("=" * 80)
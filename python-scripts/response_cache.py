@@ -0,0 +1,228 @@
+"""
+Azure AI Foundry - Chat Completion Response Cache
+
+Serves repeated chat completions locally.
+
+EXACT TIER:
+===========
+Key = SHA-256 of the normalised messages (content whitespace collapsed,
+roles lower-cased, every other field such as name/tool_calls/tool_call_id
+kept), the endpoint (resource host, deployment and api-version, see
+endpoint_from_url) and the generation parameters that change the answer or
+its shape (temperature, top_p, max_tokens, n, logprobs, ...).
+
+SIMILARITY TIER (optional):
+===========================
+Pass an `embed` function (text -> vector). Prompts are embedded once and
+the vectors are kept next to the entries; a miss on the exact tier is
+served from the most similar cached prompt with the same model and
+parameters if cosine similarity >= `similarity_threshold`.
+
+Entries are evicted LRU-first when the byte budget is exceeded and expire
+after `ttl_seconds`. hits / semantic_hits / misses / evictions are counted.
+"""
+
+import collections
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+# Parameters that do not change the answer are left out of the key
+IGNORED_PARAMS = ["stream", "user"]
+
+def normalise_messages(messages):
+    """Canonical form of a message list: lower-case roles, collapsed whitespace in content
+
+    Every other field (name, tool_calls, tool_call_id, ...) is kept: it changes the answer.
+    """
+    normalised = []
+    for message in messages:
+        message = dict(message)
+        if isinstance(message.get("content"), str):
+            message["content"] = " ".join(message["content"].split())
+        message["role"] = message.get("role", "").lower()
+        normalised.append(message)
+    return normalised
+
+def _prompt_text(messages):
+    return "\n".join(f"{m['role']}: {m.get('content')}" for m in normalise_messages(messages))
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class ChatResponseCache:
+    """LRU/TTL chat completion cache with an optional embedding-similarity tier"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=24 * 3600, embed=None,
+                 similarity_threshold=0.95):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.entries = collections.OrderedDict()  # key -> entry, oldest first
+        self.bytes_used = 0
+        self.metrics = collections.Counter()
+        self.path = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(model, params):
+        """Model + answer-affecting parameters, in canonical JSON"""
+        kept = {k: v for k, v in sorted((params or {}).items()) if k not in IGNORED_PARAMS and k != "messages"}
+        return json.dumps({"model": model, "params": kept}, sort_keys=True)
+
+    def key(self, messages, model, params=None):
+        material = json.dumps(normalise_messages(messages), sort_keys=True) + self._scope(model, params)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, entry, now):
+        return now - entry["stored_at"] > self.ttl_seconds
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.bytes_used -= entry["size"]
+
+    def get(self, messages, model, params=None):
+        """Return a cached response body or None"""
+        key = self.key(messages, model, params)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry:
+                self.entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return entry["response"]
+
+        if self.embed:
+            match = self._similar(messages, self._scope(model, params), now)
+            if match is not None:
+                return match
+
+        with self._lock:
+            self.metrics["misses"] += 1
+        return None
+
+    def _similar(self, messages, scope, now):
+        """Best cached response by cosine similarity within the same model/params scope"""
+        vector = self.embed(_prompt_text(messages))
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            for key, entry in self.entries.items():
+                if entry["scope"] != scope or entry.get("vector") is None or self._expired(entry, now):
+                    continue
+                score = _cosine(vector, entry["vector"])
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self.entries.move_to_end(best_key)
+            self.metrics["semantic_hits"] += 1
+            return self.entries[best_key]["response"]
+
+    def put(self, messages, model, params, response):
+        """Store a successful response body"""
+        key = self.key(messages, model, params)
+        vector = self.embed(_prompt_text(messages)) if self.embed else None
+        if vector is not None:
+            vector = list(map(float, vector))  # numpy arrays from embed() -> JSON-serialisable floats
+        size = len(json.dumps(response)) + (len(vector) * 8 if vector is not None else 0)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = {
+                "response": response,
+                "scope": self._scope(model, params),
+                "vector": vector,
+                "size": size,
+                "stored_at": time.time(),
+            }
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.metrics["evictions"] += 1
+
+    def save(self, path):
+        """Persist entries (and their embeddings) to a JSON file"""
+        with self._lock:
+            data = {key: dict(entry) for key, entry in self.entries.items()}
+        # Unique temp name: several scripts may save the same CHAT_CACHE at once
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Load entries saved by save(); expired entries are dropped"""
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        now = time.time()
+        with self._lock:
+            for key, entry in data.items():
+                if not self._expired(entry, now) and key not in self.entries:
+                    self.entries[key] = entry
+                    self.bytes_used += entry["size"]
+            while self.bytes_used > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def hit_rate(self):
+        lookups = self.metrics["hits"] + self.metrics["semantic_hits"] + self.metrics["misses"]
+        return (self.metrics["hits"] + self.metrics["semantic_hits"]) / lookups if lookups else 0.0
+
+    def print_metrics(self):
+        print(f"\n🗃️  RESPONSE CACHE")
+        print("-" * 60)
+        print(f"  Hits: {self.metrics['hits']} | Semantic hits: {self.metrics['semantic_hits']} | "
+              f"Misses: {self.metrics['misses']} | Hit rate: {self.hit_rate() * 100:.1f}%")
+        print(f"  Entries: {len(self.entries)} | Bytes: {self.bytes_used:,}/{self.max_bytes:,} | "
+              f"Evictions: {self.metrics['evictions']}")
+
+def model_from_url(url):
+    """Deployment name from a /openai/deployments/{name}/... URL"""
+    parts = url.split("/openai/deployments/", 1)
+    return parts[1].split("/", 1)[0] if len(parts) == 2 else url.split("?", 1)[0]
+
+def endpoint_from_url(url):
+    """Cache scope of a request URL: resource host, deployment name and api-version
+
+    Pass it as `model`: resources that share CHAT_CACHE and a deployment name
+    never serve each other's answers.
+    """
+    parts = urlsplit(url)
+    return {"host": parts.netloc.lower(), "deployment": model_from_url(url),
+            "api_version": parse_qs(parts.query).get("api-version", [""])[0]}
+
+def as_response(url, body):
+    """Wrap a cached body in a requests.Response so callers need no special case"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = json.dumps(body).encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    response.headers["x-local-cache"] = "HIT"
+    return response
+
+def cache_from_env(var="CHAT_CACHE", **options):
+    """In-memory cache, persisted to the file named by an environment variable if set"""
+    cache = ChatResponseCache(**options)
+    path = os.getenv(var)
+    if path:
+        cache.load(path)
+        print(f"🗃️  Response cache: {len(cache.entries)} entries loaded from {path}")
+    cache.path = path
+    return cache
@@ -0,0 +1,247 @@
+"""
+Azure AI Foundry - Incremental Rollups over Stored Probe Results
+
+Keeps pre-aggregated cells per (resource, path, hour) next to the
+columnar result history (probe_results.py):
+
+• request count and successful count
+• status histogram ({"200": 40, "403": 2, "TIMEOUT": 1})
+• latency sketch: a LatencyHistogram (mergeable, fixed memory)
+
+`update` ingests only run files that were not rolled up yet, so the cost
+of keeping rollups current is proportional to the new runs. Each day file
+also lists the runs folded into it, so an update interrupted between the
+day files and the manifest never counts a run twice. Dashboards
+and week-over-week comparisons merge the cells of the days they cover
+and never touch raw history.
+
+LAYOUT (<PROBE_RESULTS>/rollups/):
+==================================
+<YYYY-MM-DD>.json   -> cells of that day and the run files folded into it
+_ingested.json      -> run files already rolled up (skips reading them again)
+
+USAGE:
+======
+    python result_rollups.py update
+    python result_rollups.py dashboard --days 7 --by resource,path
+    python result_rollups.py weekly
+"""
+
+import argparse
+import collections
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from latency_histogram import LatencyHistogram
+
+DIMENSIONS = ("resource", "path", "hour")
+
+class Rollup:
+    """Counts, status histogram and latency sketch for one cell (or a merge of cells)"""
+
+    def __init__(self):
+        self.count = 0
+        self.ok = 0
+        self.statuses = collections.Counter()
+        self.latency = LatencyHistogram()
+
+    def add(self, status, success, latency_ms):
+        self.count += 1
+        self.ok += bool(success)
+        self.statuses[str(status)] += 1
+        if latency_ms is not None:
+            self.latency.record_ms(latency_ms)
+
+    def merge(self, other):
+        self.count += other.count
+        self.ok += other.ok
+        self.statuses.update(other.statuses)
+        self.latency.merge(other.latency)
+        return self
+
+    def success_rate(self):
+        return self.ok / self.count if self.count else None
+
+    def to_dict(self):
+        return {"count": self.count, "ok": self.ok, "statuses": dict(self.statuses),
+                "latency": self.latency.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        rollup = cls()
+        rollup.count, rollup.ok = data["count"], data["ok"]
+        rollup.statuses.update(data["statuses"])
+        rollup.latency = LatencyHistogram.from_dict(data["latency"])
+        return rollup
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+class RollupStore:
+    """Per-day files of (resource, path, hour) rollups plus an ingestion manifest"""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(os.getenv("PROBE_RESULTS", ".probe_results"), "rollups")
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest_path = os.path.join(self.root, "_ingested.json")
+        self.ingested = set()
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                self.ingested = set(json.load(f))
+
+    def _day_path(self, day):
+        return os.path.join(self.root, f"{day}.json")
+
+    def _load_day_file(self, day):
+        """(cells, run files folded in) for one YYYY-MM-DD"""
+        path = self._day_path(day)
+        if not os.path.exists(path):
+            return {}, set()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {"runs": [], "cells": data}  # written before runs were recorded
+        cells = {(c["resource"], c["path"], c["hour"]): Rollup.from_dict(c) for c in data["cells"]}
+        return cells, set(data["runs"])
+
+    def load_day(self, day):
+        """{(resource, path, hour): Rollup} for one YYYY-MM-DD"""
+        return self._load_day_file(day)[0]
+
+    def _save_day(self, day, cells, runs):
+        _write_json(self._day_path(day), {
+            "runs": sorted(runs),
+            "cells": [{"resource": resource, "path": path, "hour": hour, **rollup.to_dict()}
+                      for (resource, path, hour), rollup in sorted(cells.items())],
+        })
+
+    def _fold(self, rows, touched, run=None):
+        """Add rows to the touched days; rows of `run` are skipped in days that already hold it"""
+        days = set()
+        for row in rows:
+            hour = row["timestamp"].strftime("%Y-%m-%dT%H")
+            day = hour[:10]
+            if day not in touched:
+                touched[day] = self._load_day_file(day)
+            cells, runs = touched[day]
+            if run is not None and run in runs:
+                continue
+            days.add(day)
+            key = (str(row["resource"]), str(row["path"]), hour)
+            cells.setdefault(key, Rollup()).add(row["status"], row["success"], row["latency_ms"])
+        if run is not None:
+            for day in days:
+                touched[day][1].add(run)
+
+    def add_rows(self, rows):
+        """Fold rows (resource, path, timestamp, status, success, latency_ms) into the day files"""
+        touched = {}
+        self._fold(rows, touched)
+        for day, (cells, runs) in touched.items():
+            self._save_day(day, cells, runs)
+        return len(touched)
+
+    def update(self, results):
+        """Roll up run files of a ProbeResultStore that were not ingested yet"""
+        new_files = [path for path in results.files() if os.path.relpath(path, results.root) not in self.ingested]
+        touched, rows = {}, 0
+        for path in new_files:
+            table = results.read_file(path, ["resource", "path", "timestamp", "status", "success", "latency_ms"])
+            self._fold(table.to_pylist(), touched, os.path.relpath(path, results.root))
+            rows += table.num_rows
+        # Each touched day is loaded and written once, however many runs land in it
+        for day, (cells, runs) in touched.items():
+            self._save_day(day, cells, runs)
+        if new_files:
+            self.ingested.update(os.path.relpath(path, results.root) for path in new_files)
+            _write_json(self._manifest_path, sorted(self.ingested))
+        return len(new_files), rows
+
+    def days(self):
+        return sorted(name[:-5] for name in os.listdir(self.root) if name.endswith(".json") and name[0] != "_")
+
+    def query(self, since=None, until=None, by=("resource", "path")):
+        """Merge cells in [since, until) into {group tuple: Rollup}; `by` from resource/path/hour/day"""
+        since_hour = since.strftime("%Y-%m-%dT%H") if since else None
+        until_hour = until.strftime("%Y-%m-%dT%H") if until else None
+        groups = {}
+        for day in self.days():
+            if (since_hour and day < since_hour[:10]) or (until_hour and day > until_hour[:10]):
+                continue
+            for (resource, path, hour), rollup in self.load_day(day).items():
+                if (since_hour and hour < since_hour) or (until_hour and hour >= until_hour):
+                    continue
+                values = {"resource": resource, "path": path, "hour": hour, "day": hour[:10]}
+                groups.setdefault(tuple(values[d] for d in by), Rollup()).merge(rollup)
+        return groups
+
+def _latency(rollup, p):
+    value = rollup.latency.percentile(p)
+    return f"{value:8.1f}ms" if value is not None else f"{'-':>10}"
+
+def print_dashboard(groups, title="FLEET DASHBOARD"):
+    print(f"\n📊 {title}")
+    print("-" * 80)
+    if not groups:
+        print("  No rollups in this window")
+        return
+    for key, rollup in sorted(groups.items()):
+        statuses = ", ".join(f"{status}: {n}" for status, n in rollup.statuses.most_common(3))
+        print(f"  {' | '.join(str(k)[:36] for k in key):50} | {rollup.count:>6} req | "
+              f"{rollup.success_rate() * 100:5.1f}% ok | p50 {_latency(rollup, 50)} | p95 {_latency(rollup, 95)} "
+              f"| {statuses}")
+
+def print_weekly(store, now=None, by=("resource", "path")):
+    """This week vs the week before, per group"""
+    # Windows end with the current hour (rollup cells are hourly)
+    now = (now or datetime.now()).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    current = store.query(now - timedelta(days=7), now, by)
+    previous = store.query(now - timedelta(days=14), now - timedelta(days=7), by)
+    print(f"\n📅 WEEK OVER WEEK (to {now:%Y-%m-%d %H:00})")
+    print("-" * 80)
+    for key in sorted(set(current) | set(previous)):
+        this, last = current.get(key, Rollup()), previous.get(key, Rollup())
+        rates = [f"{r.success_rate() * 100:5.1f}%" if r.count else "    -" for r in (last, this)]
+        p95 = [r.latency.percentile(95) for r in (last, this)]
+        change = f"{(p95[1] / p95[0] - 1) * 100:+6.1f}%" if all(p95) else "      -"
+        print(f"  {' | '.join(str(k)[:36] for k in key):50} | req {last.count:>5} -> {this.count:<5} | "
+              f"ok {rates[0]} -> {rates[1]} | p95 {_latency(last, 95)} -> {_latency(this, 95)} ({change})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental rollups over stored probe results")
+    parser.add_argument("--root", default=None, help="result store directory (default PROBE_RESULTS or .probe_results)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("update", help="roll up runs stored since the last update")
+    dashboard = subcommands.add_parser("dashboard", help="per-group counts, statuses and latency")
+    dashboard.add_argument("--days", type=float, default=7)
+    weekly = subcommands.add_parser("weekly", help="this week vs last week")
+    for subcommand in (dashboard, weekly):
+        subcommand.add_argument("--by", default="resource,path", help=f"comma-separated from {DIMENSIONS + ('day',)}")
+    options = parser.parse_args()
+
+    from probe_results import ProbeResultStore
+
+    print("🚀 Azure AI Foundry Result Rollups")
+    print("=" * 80)
+    results = ProbeResultStore(options.root)
+    store = RollupStore(os.path.join(results.root, "rollups"))
+    start = time.perf_counter()
+    files, rows = store.update(results)
+    print(f"🔄 Rolled up {files} new runs ({rows:,} rows) in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    if options.command != "update":
+        by = tuple(options.by.split(","))
+        start = time.perf_counter()
+        if options.command == "dashboard":
+            now = datetime.now()
+            groups = store.query(now - timedelta(days=options.days), None, by)
+            print_dashboard(groups, f"FLEET DASHBOARD (last {options.days:g} days)")
+        else:
+            print_weekly(store, by=by)
+        print(f"\n⚡ Built from rollups in {(time.perf_counter() - start) * 1000:.1f}ms")
+    print("=" * 80)
@@ -0,0 +1,475 @@
+"""
+Azure AI Foundry - Sharded Multi-Process Probe Executor
+
+Splits a probe plan into shards (stable hash of the probe ID) and runs
+them across a process pool on one host, or across several hosts through
+a small local HTTP coordinator. Each shard writes compact JSONL results
+to its own file (no response parsing, no pretty-printing) and a merge
+step combines them. Shard files are SweepJournals, so a re-run skips
+probes a shard already finished. Only HTTP responses are journaled:
+timeouts, connection errors and open circuits go to retry-NNNN.jsonl, are
+counted as retryable by the merge and are retried by the next run.
+
+The coordinator resumes the same way from the shard files already in
+--out, and re-issues a shard (up to `max_attempts` times) while it still
+has retryable probes.
+
+PROBE PLAN (JSONL, one probe per line):
+=======================================
+{"id": "...", "method": "GET", "url": "https://...", "headers": {...}, "payload": null}
+
+USAGE:
+======
+    # One host, all cores
+    python sharded_executor.py local plan.jsonl --shards 8 --out shards/
+
+    # Several hosts: start a coordinator, then point workers at it
+    python sharded_executor.py coordinator plan.jsonl --shards 64 --port 8765 --out shards/
+    python sharded_executor.py worker http://coordinator-host:8765 --processes 8
+
+    # Combine shard files
+    python sharded_executor.py merge shards/ --output merged.jsonl
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from circuit_breaker import CircuitOpenError, guarded_request
+from latency_histogram import LatencyHistogram
+from sweep_checkpoint import SweepJournal
+
+def load_plan(path):
+    """Load a JSONL probe plan"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def shard_of(probe_id, num_shards):
+    """Stable shard assignment (same probe -> same shard on every run)"""
+    return zlib.crc32(probe_id.encode("utf-8")) % num_shards
+
+def split_plan(plan, num_shards):
+    """Split a probe plan into `num_shards` lists"""
+    shards = [[] for _ in range(num_shards)]
+    for probe in plan:
+        shards[shard_of(probe["id"], num_shards)].append(probe)
+    return shards
+
+def shard_path(out_dir, shard_index):
+    return os.path.join(out_dir, f"shard-{shard_index:04d}.jsonl")
+
+def retry_path(out_dir, shard_index):
+    """Transport failures of the shard's latest run (not journaled, retried next time)"""
+    return os.path.join(out_dir, f"retry-{shard_index:04d}.jsonl")
+
+def _parse_records(lines):
+    """Journal records ({"id", "result"}) from JSONL lines; torn or foreign lines are skipped"""
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(entry, dict) and "id" in entry:
+            yield entry
+
+def _read_records(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return list(_parse_records(f))
+
+def _read_text(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def _write_records(path, records, mode="w"):
+    """Write (or append) records; an empty rewrite removes the file"""
+    if mode == "w" and not records:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    # Start on a fresh line if an earlier run left a torn last line
+    prefix = ""
+    if mode == "a" and os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            prefix = "" if f.read(1) == b"\n" else "\n"
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(prefix + "".join(json.dumps(r, default=str) + "\n" for r in records))
+
+_thread_state = threading.local()
+
+def _session():
+    """One requests.Session (connection pool) per worker thread"""
+    if not hasattr(_thread_state, "session"):
+        _thread_state.session = requests.Session()
+    return _thread_state.session
+
+def execute_probe(probe, timeout=15):
+    """Run one probe and return a compact result (status, timing, size)"""
+    start = time.perf_counter()
+    result = {"method": probe.get("method", "GET"), "url": probe["url"]}
+    try:
+        response = guarded_request(
+            probe.get("method", "GET"),
+            probe["url"],
+            session=_session(),
+            headers=probe.get("headers"),
+            json=probe.get("payload"),
+            timeout=timeout,
+        )
+        result.update({
+            "status_code": response.status_code,
+            "bytes": len(response.content),
+        })
+    except CircuitOpenError:
+        result.update({"status_code": "CIRCUIT_OPEN", "error": "Circuit open (failing fast)"})
+    except requests.exceptions.Timeout:
+        result.update({"status_code": "TIMEOUT", "error": "Timeout"})
+    except requests.exceptions.ConnectionError:
+        result.update({"status_code": "CONNECTION_ERROR", "error": "Connection Error"})
+    except Exception as e:
+        result.update({"status_code": "ERROR", "error": str(e)})
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+def run_shard(shard_index, probes, out_dir, threads=16):
+    """Run one shard in the current process; results go to the shard's own file"""
+    os.makedirs(out_dir, exist_ok=True)
+    path = shard_path(out_dir, shard_index)
+    done = 0
+    retryable = []
+
+    with SweepJournal(path, flush_every=200) as journal:
+        todo = [p for p in probes if not journal.is_done(p["id"])]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {executor.submit(execute_probe, p): p["id"] for p in todo}
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                done += 1
+                # Transport failures are not an answer from the service: leave them for a re-run
+                if isinstance(result["status_code"], int):
+                    journal.record(futures[future], result)
+                else:
+                    retryable.append({"id": futures[future], "result": result})
+    _write_records(retry_path(out_dir, shard_index), retryable)
+
+    return {"shard": shard_index, "path": path, "executed": done, "retryable": len(retryable),
+            "skipped": len(probes) - len(todo)}
+
+def run_local(plan, num_shards=None, out_dir="shards", threads=16):
+    """Run a probe plan across a process pool on this host"""
+    num_shards = num_shards or os.cpu_count() or 1
+    shards = split_plan(plan, num_shards)
+
+    print(f"⚙️  {len(plan)} probes -> {num_shards} shards -> {out_dir}/")
+    start = time.perf_counter()
+    summaries = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_shards) as pool:
+        futures = [
+            pool.submit(run_shard, i, probes, out_dir, threads)
+            for i, probes in enumerate(shards) if probes
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            print(f"  ✅ shard {summary['shard']:4} | executed {summary['executed']:6} | "
+                  f"retryable {summary['retryable']:6} | skipped {summary['skipped']:6}")
+
+    elapsed = time.perf_counter() - start
+    executed = sum(s["executed"] for s in summaries)
+    print(f"🏁 {executed} probes in {elapsed:.1f}s ({executed / elapsed * 60 if elapsed else 0:.0f}/min)")
+    return summaries
+
+def merge_shards(out_dir, output_path=None):
+    """Combine every shard file into one JSONL file and return a status/latency summary
+
+    Probes whose latest attempt failed in transport are included with "retryable": true
+    (and counted under their status) unless a shard file already holds an answer for them.
+    """
+    output_path = output_path or os.path.join(out_dir, "merged.jsonl")
+    status_counts = {}
+    total = retryable = 0
+    latency = LatencyHistogram()
+    seen = set()
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        for pattern in ("shard-*.jsonl", "retry-*.jsonl"):
+            for path in sorted(glob.glob(os.path.join(out_dir, pattern))):
+                for entry in _read_records(path):
+                    if entry["id"] in seen:
+                        continue
+                    seen.add(entry["id"])
+                    result = entry.get("result") or {}
+                    if pattern.startswith("retry"):
+                        result = {**result, "retryable": True}
+                        retryable += 1
+                    out.write(json.dumps({"id": entry["id"], **result}) + "\n")
+                    code = result.get("status_code", "ERROR")
+                    status_counts[code] = status_counts.get(code, 0) + 1
+                    if "elapsed_ms" in result and not result.get("retryable"):
+                        latency.record_ms(result["elapsed_ms"])
+                    total += 1
+
+    # Snapshot next to the merged file so runs can be aggregated later
+    latency.save(os.path.splitext(output_path)[0] + ".hist.json")
+    return {"output": output_path, "total": total, "retryable": retryable, "status_counts": status_counts,
+            "latency": latency}
+
+class _Coordinator:
+    """Hands out shards to remote workers and collects their results
+
+    Starts from the shard files already in `out_dir` (only unfinished probes are
+    handed out) and re-issues a shard while it has retryable probes, up to
+    `max_attempts` uploads.
+    """
+
+    def __init__(self, plan, num_shards, out_dir, lease_seconds=600, max_attempts=3):
+        self.shards = split_plan(plan, num_shards)
+        self.out_dir = out_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(out_dir, exist_ok=True)
+        self.done = [{r["id"] for r in _read_records(shard_path(out_dir, i))} for i in range(len(self.shards))]
+        self.resumed = sum(len(ids) for ids in self.done)
+        self.pending = [i for i in range(len(self.shards)) if self.remaining(i)]
+        self.leased = {}  # shard index -> lease expiry
+        self.attempts = collections.Counter()
+        self.completed = set()
+        self.lock = threading.Lock()
+
+    def remaining(self, index):
+        """Probes of a shard without a journaled answer yet"""
+        return [p for p in self.shards[index] if p["id"] not in self.done[index]]
+
+    def claim(self):
+        with self.lock:
+            # Re-issue shards whose worker went away
+            now = time.monotonic()
+            for index, expiry in list(self.leased.items()):
+                if expiry < now:
+                    del self.leased[index]
+                    self.pending.append(index)
+            if not self.pending:
+                return None
+            index = self.pending.pop(0)
+            self.leased[index] = now + self.lease_seconds
+            return index
+
+    def complete(self, index, journal_text, retry_text):
+        """Append a worker's new records; returns how many probes of the shard still need a retry"""
+        with self.lock:
+            # A shard re-issued after a lease expired may come back twice: keep the first answer
+            records = [r for r in _parse_records(journal_text.splitlines()) if r["id"] not in self.done[index]]
+            _write_records(shard_path(self.out_dir, index), records, mode="a")
+            self.done[index].update(r["id"] for r in records)
+            _write_records(retry_path(self.out_dir, index),
+                           [r for r in _parse_records(retry_text.splitlines()) if r["id"] not in self.done[index]])
+
+            self.leased.pop(index, None)
+            self.attempts[index] += 1
+            left = len(self.remaining(index))
+            if left and self.attempts[index] < self.max_attempts:
+                if index not in self.pending:
+                    self.pending.append(index)
+            else:
+                if index in self.pending:
+                    self.pending.remove(index)
+                self.completed.add(index)
+            return left
+
+    def finished(self):
+        with self.lock:
+            return not self.pending and not self.leased
+
+def _make_handler(coordinator):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/claim":
+                self.send_error(404)
+                return
+            index = coordinator.claim()
+            if index is None:
+                # 410: every shard is back, workers can stop; 204: all leased, poll again
+                self.send_response(410 if coordinator.finished() else 204)
+                self.end_headers()
+                return
+            body = json.dumps({"shard": index, "probes": coordinator.remaining(index)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.startswith("/complete/"):
+                self.send_error(404)
+                return
+            index = int(self.path.rsplit("/", 1)[1])
+            upload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            left = coordinator.complete(index, upload["journal"], upload.get("retryable", ""))
+            retry = f" | {left} retryable (attempt {coordinator.attempts[index]}/{coordinator.max_attempts})" \
+                if left else ""
+            print(f"  ✅ shard {index} received from {self.client_address[0]}{retry}")
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass  # keep the console for progress lines
+
+    return Handler
+
+def serve_coordinator(plan, num_shards, out_dir="shards", host="0.0.0.0", port=8765, linger_seconds=10):
+    """Serve shards to remote workers until every shard is back, then merge
+
+    The server stays up `linger_seconds` after the last shard so polling workers get a 410.
+    """
+    coordinator = _Coordinator(plan, num_shards, out_dir)
+    server = ThreadingHTTPServer((host, port), _make_handler(coordinator))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    print(f"📡 Coordinator on http://{host}:{port} | {len(plan)} probes in {len(coordinator.pending)} shards"
+          f" | {coordinator.resumed} already done in {out_dir}/")
+    try:
+        while not coordinator.finished():
+            time.sleep(1)
+        time.sleep(linger_seconds)
+    finally:
+        server.shutdown()
+
+    summary = merge_shards(out_dir)
+    print(f"🧩 Merged {summary['total']} results -> {summary['output']}")
+    return summary
+
+def _run_claimed_shard(coordinator_url, index, probes, threads):
+    """Worker-process entry: run a shard in a scratch dir, upload its records, remove the dir"""
+    scratch = tempfile.mkdtemp(prefix="shard-")
+    try:
+        summary = run_shard(index, probes, scratch, threads)
+        upload = {name: _read_text(path) for name, path in (("journal", summary["path"]),
+                                                            ("retryable", retry_path(scratch, index)))}
+        requests.post(f"{coordinator_url}/complete/{index}", json=upload, timeout=60).raise_for_status()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return summary
+
+def run_worker(coordinator_url, processes=None, threads=16, poll_seconds=5, unreachable_seconds=60):
+    """Claim shards from a coordinator and run them on this host's cores
+
+    Keeps polling while other workers hold leases: a shard whose worker died
+    is re-issued once its lease expires, and someone has to be there to take it.
+    Stops on a 410 (every shard done), or when the coordinator has been
+    unreachable for `unreachable_seconds`.
+    """
+    processes = processes or os.cpu_count() or 1
+    coordinator_url = coordinator_url.rstrip("/")
+    print(f"👷 Worker with {processes} processes -> {coordinator_url}")
+
+    reason = "Coordinator reports every shard done"
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        running = set()
+        finished = False
+        unreachable_since = None
+        while running or not finished:
+            while not finished and len(running) < processes:
+                try:
+                    response = requests.get(f"{coordinator_url}/claim", timeout=30)
+                except requests.exceptions.ConnectionError:
+                    unreachable_since = unreachable_since or time.monotonic()
+                    if time.monotonic() - unreachable_since >= unreachable_seconds:
+                        finished = True
+                        reason = f"Coordinator unreachable for {unreachable_seconds}s"
+                    break
+                unreachable_since = None
+                if response.status_code == 410:
+                    finished = True
+                    break
+                if response.status_code == 204:
+                    break
+                claim = response.json()
+                running.add(pool.submit(_run_claimed_shard, coordinator_url,
+                                        claim["shard"], claim["probes"], threads))
+            if not running:
+                if not finished:
+                    time.sleep(poll_seconds)
+                continue
+            done, running = concurrent.futures.wait(running, timeout=poll_seconds,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    summary = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"  ⚠️  Upload failed ({e}); the shard is re-issued when its lease expires")
+                    continue
+                print(f"  ✅ shard {summary['shard']:4} | executed {summary['executed']:6} | "
+                      f"retryable {summary['retryable']:6}")
+
+    print(f"🏁 {reason}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-process probe executor")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    local = sub.add_parser("local", help="run a plan across a local process pool")
+    local.add_argument("plan")
+    local.add_argument("--shards", type=int, default=None)
+    local.add_argument("--threads", type=int, default=16)
+    local.add_argument("--out", default="shards")
+
+    coord = sub.add_parser("coordinator", help="hand out shards to remote workers")
+    coord.add_argument("plan")
+    coord.add_argument("--shards", type=int, default=64)
+    coord.add_argument("--port", type=int, default=8765)
+    coord.add_argument("--out", default="shards")
+
+    worker = sub.add_parser("worker", help="run shards claimed from a coordinator")
+    worker.add_argument("coordinator_url")
+    worker.add_argument("--processes", type=int, default=None)
+    worker.add_argument("--threads", type=int, default=16)
+
+    merge = sub.add_parser("merge", help="combine shard files")
+    merge.add_argument("out")
+    merge.add_argument("--output", default=None)
+
+    args = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Sharded Probe Executor")
+    print("=" * 80)
+
+    if args.mode == "local":
+        run_local(load_plan(args.plan), args.shards, args.out, args.threads)
+        summary = merge_shards(args.out)
+        print(f"🧩 Merged {summary['total']} results -> {summary['output']}")
+        print(f"📊 Status codes: {summary['status_counts']}")
+        if summary["retryable"]:
+            print(f"🔁 {summary['retryable']} probes failed in transport and are retried by the next run")
+        summary["latency"].print_summary("PROBE LATENCY")
+    elif args.mode == "coordinator":
+        summary = serve_coordinator(load_plan(args.plan), args.shards, args.out, port=args.port)
+        print(f"📊 Status codes: {summary['status_counts']}")
+        if summary["retryable"]:
+            print(f"🔁 {summary['retryable']} probes failed in transport and are retried by the next run")
+        summary["latency"].print_summary("PROBE LATENCY")
+    elif args.mode == "worker":
+        run_worker(args.coordinator_url, args.processes, args.threads)
+    else:
+        summary = merge_shards(args.out, args.output)
+        print(f"🧩 Merged {summary['total']} results -> {summary['output']}")
+        print(f"📊 Status codes: {summary['status_counts']}")
+        if summary["retryable"]:
+            print(f"🔁 {summary['retryable']} probes failed in transport and are retried by the next run")
+        summary["latency"].print_summary("PROBE LATENCY")
@@ -0,0 +1,109 @@
+"""
+Azure AI Foundry - Resumable, Checkpointed Sweeps
+
+Long discovery/comparison sweeps record every finished probe in an
+append-only JSONL journal. Records are buffered and flushed (with fsync)
+every `flush_every` probes or `flush_interval` seconds, whichever comes
+first. Re-running a sweep with the same journal skips the probes already
+in it and continues where the previous run stopped.
+
+USAGE:
+======
+    SWEEP_JOURNAL=discovery.jsonl python test.py
+    SWEEP_JOURNAL=explore.jsonl python explore_api.py
+    SWEEP_JOURNAL=compare.jsonl python compare_foundry_resources.py
+"""
+
+import json
+import os
+import threading
+import time
+
+class SweepJournal:
+    """Append-only journal of completed probe IDs and their results"""
+
+    def __init__(self, path, flush_every=20, flush_interval=5.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._done = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        # Terminate a torn last line so new records start on a fresh line
+        if self._file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def _load(self):
+        """Read finished probes from a previous run (tolerates a torn last line)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partially written line from an interrupted run
+                if not isinstance(entry, dict) or "id" not in entry:
+                    continue  # valid JSON, but not a journal record
+                self._done[entry["id"]] = entry.get("result")
+
+    def __len__(self):
+        return len(self._done)
+
+    def is_done(self, probe_id):
+        return probe_id in self._done
+
+    def result(self, probe_id):
+        """Return the stored result for a finished probe (or None)"""
+        return self._done.get(probe_id)
+
+    def record(self, probe_id, result=None):
+        """Mark a probe as finished; flushes to disk periodically"""
+        with self._lock:
+            self._done[probe_id] = result
+            self._pending.append(json.dumps({"id": probe_id, "result": result}, default=str))
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if len(self._pending) >= self.flush_every or due:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self._file.write("\n".join(self._pending) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Flush even on Ctrl+C / network errors so the finished work is kept
+        self.close()
+        return False
+
+def journal_from_env(var="SWEEP_JOURNAL"):
+    """Open the journal named by an environment variable, or return None"""
+    path = os.getenv(var)
+    if not path:
+        return None
+    journal = SweepJournal(path)
+    if len(journal):
+        print(f"♻️  Resuming sweep: {len(journal)} probes already done ({path})")
+    else:
+        print(f"📒 Checkpointing sweep to {path}")
+    return journal
@@ -1,8 +1,16 @@
 import requests
 import json
 import os
+import time
 from datetime import datetime
 
+from circuit_breaker import CircuitOpenError, guarded_request, print_breaker_states
+from embedding_store import embedding_store_from_env
+from latency_histogram import LatencyHistogram
+from probe_tracing import tracer_from_env
+
+from sweep_checkpoint import journal_from_env
+
 # Azure AI Services endpoint
 base_url = "https://foundry-codespace-demo.services.ai.azure.com"
 
@@ -10,10 +18,16 @@ base_url = "https://foundry-codespace-demo.services.ai.azure.com"
 headers = {
     "Content-Type": "application/json",
     "Ocp-Apim-Subscription-Key": os.getenv("AZURE_AI_API_KEY", "YOUR_API_KEY_HERE"),
-    # Alternative authentication header if using different auth method:
-    # "Authorization": f"Bearer {os.getenv('AZURE_AI_TOKEN', 'YOUR_TOKEN_HERE')}"
+    # Alternative: Entra ID bearer token instead of the key (see entra_auth.py):
+    # **provider_from_env().auth_headers()
 }
 
+# Latency of every test_post_request() call (fixed memory, mergeable)
+latency = LatencyHistogram()
+
+# One span per probe, exported in the background when PROBE_TRACES is set
+tracer = tracer_from_env()
+
 def test_post_request(endpoint_path="/", payload=None, test_name="Basic POST"):
     """
     Test function to send POST requests to the AI services endpoint
@@ -26,34 +40,55 @@ def test_post_request(endpoint_path="/", payload=None, test_name="Basic POST"):
     print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*50}")
     
+    span = tracer.start_probe_span("POST", url, headers)
+    request_headers = {**headers, "traceparent": span.traceparent()} if tracer.enabled else headers
+    
     try:
-        response = requests.post(
+        start = time.perf_counter()
+        response = guarded_request(
+            "POST",
             url, 
-            headers=headers, 
+            headers=request_headers, 
             json=payload,
             timeout=30
         )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        latency.record_ms(elapsed_ms)
+        span.phase("request", elapsed_ms)
+        span.record_response(response)
         
         print(f"Status Code: {response.status_code}")
+        print(f"Latency: {elapsed_ms:.0f}ms")
         print(f"Response Headers: {dict(response.headers)}")
         
         # Try to parse JSON response
         try:
+            decode_start = time.perf_counter()
             response_json = response.json()
+            span.phase("json_decode", (time.perf_counter() - decode_start) * 1000)
             print(f"Response Body (JSON): {json.dumps(response_json, indent=2)}")
         except json.JSONDecodeError:
             print(f"Response Body (Text): {response.text}")
             
         return response
         
-    except requests.exceptions.Timeout:
+    except CircuitOpenError as e:
+        span.record_error(e)
+        print(f"Skipped: {e}")
+    except requests.exceptions.Timeout as e:
+        span.record_error(e)
         print("Error: Request timed out")
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
+        span.record_error(e)
         print("Error: Connection failed")
     except requests.exceptions.RequestException as e:
+        span.record_error(e)
         print(f"Error: {e}")
     except Exception as e:
+        span.record_error(e)
         print(f"Unexpected error: {e}")
+    finally:
+        span.end()
 
 def test_health_check():
     """Test basic health/status endpoint"""
@@ -83,12 +118,27 @@ def test_text_generation():
     return test_post_request("/completions", payload, "Text Generation")
 
 def test_embeddings():
-    """Test embeddings endpoint"""
+    """Test embeddings endpoint
+
+    The endpoint is always called (this is a test of it); with EMBEDDING_STORE
+    set, the returned vector is also kept in the embedding store.
+    """
     payload = {
         "input": "This is a test sentence for embeddings.",
         "model": "text-embedding-ada-002"
     }
-    return test_post_request("/embeddings", payload, "Embeddings")
+    store = embedding_store_from_env(payload["model"])
+    response = test_post_request("/embeddings", payload, "Embeddings")
+    if store is not None and response is not None and response.status_code == 200 \
+            and payload["input"] not in store:
+        try:
+            vector = response.json()["data"][0]["embedding"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            print("Embeddings: unexpected 200 body - vector not stored")
+        else:
+            store.add_many([payload["input"]], [vector])
+            print(f"Embeddings: vector stored ({store.dim} dimensions, {len(store)} stored)")
+    return response
 
 def test_custom_endpoint():
     """Test a custom endpoint - modify as needed"""
@@ -100,8 +150,11 @@ def test_custom_endpoint():
     }
     return test_post_request("/custom", payload, "Custom Endpoint")
 
-def discover_endpoints():
-    """Try to discover available endpoints using GET requests"""
+def discover_endpoints(journal=None):
+    """Try to discover available endpoints using GET requests
+
+    Pass a SweepJournal to checkpoint progress and resume interrupted runs.
+    """
     print(f"\n{'='*50}")
     print("ENDPOINT DISCOVERY")
     print(f"{'='*50}")
@@ -129,24 +182,38 @@ def discover_endpoints():
     
     for path in paths_to_try:
         url = f"{base_url}{path}"
-        print(f"\nTrying GET {path}...")
+        probe_id = f"GET {url}"
         
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            print(f"  Status Code: {response.status_code}")
+        # Skip probes finished by an earlier (interrupted) run
+        if journal and journal.is_done(probe_id):
+            status_code = journal.result(probe_id)["status_code"]
+            print(f"\n⏭️  GET {path} -> {status_code} (checkpointed)")
+        else:
+            print(f"\nTrying GET {path}...")
             
-            if response.status_code in [200, 201, 202]:
-                successful_endpoints.append((path, response.status_code))
-                try:
-                    content = response.json()
-                    print(f"  Response: {json.dumps(content, indent=2)[:200]}...")
-                except:
-                    print(f"  Response: {response.text[:200]}...")
-            elif response.status_code == 405:  # Method not allowed - endpoint exists but needs POST
-                successful_endpoints.append((path, f"{response.status_code} (Method Not Allowed - try POST)"))
+            try:
+                response = guarded_request("GET", url, headers=headers, timeout=10)
+                status_code = response.status_code
+                print(f"  Status Code: {status_code}")
                 
-        except Exception as e:
-            print(f"  Error: {e}")
+                if status_code in [200, 201, 202]:
+                    try:
+                        content = response.json()
+                        print(f"  Response: {json.dumps(content, indent=2)[:200]}...")
+                    except:
+                        print(f"  Response: {response.text[:200]}...")
+                
+                if journal:
+                    journal.record(probe_id, {"status_code": status_code})
+                    
+            except Exception as e:
+                print(f"  Error: {e}")
+                continue
+        
+        if status_code in [200, 201, 202]:
+            successful_endpoints.append((path, status_code))
+        elif status_code == 405:  # Method not allowed - endpoint exists but needs POST
+            successful_endpoints.append((path, f"{status_code} (Method Not Allowed - try POST)"))
     
     print(f"\n{'='*30}")
     print("SUCCESSFUL ENDPOINTS:")
@@ -217,11 +284,19 @@ if __name__ == "__main__":
     
     # First, discover available endpoints
     print("\n🔍 Starting endpoint discovery...")
-    successful_endpoints = discover_endpoints()
+    journal = journal_from_env()
+    try:
+        successful_endpoints = discover_endpoints(journal)
+    finally:
+        if journal:
+            journal.close()
     
     # Test Foundry-specific endpoints
     test_foundry_specific_endpoints()
     
+    latency.print_summary("POST REQUEST LATENCY")
+    print_breaker_states()
+    
     print(f"\n{'='*50}")
     print("RECOMMENDATIONS:")
     print(f"{'='*50}")
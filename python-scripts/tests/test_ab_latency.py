@@ -0,0 +1,48 @@
+import random
+import statistics
+
+import pytest
+
+from ab_latency import MIN_SAMPLES, bootstrap_diff_ci, holm, mann_whitney_u, required_samples
+
+def test_mann_whitney_u_separated_samples():
+    # U = 0, sigma = sqrt(5.25), z = (4.5 - 0.5) / sigma (continuity-corrected normal approximation)
+    u, p = mann_whitney_u([1, 2, 3], [4, 5, 6])
+    assert u == 0
+    assert p == pytest.approx(0.0809, abs=1e-4)
+    assert mann_whitney_u([4, 5, 6], [1, 2, 3]) == (9, p)
+
+def test_mann_whitney_u_ties_and_identical_samples():
+    assert mann_whitney_u([5, 5, 5], [5, 5, 5]) == (4.5, 1.0)
+    u, p = mann_whitney_u([1, 2, 2, 3], [2, 3, 3, 4])
+    assert u == 3.0  # pairs with a > b, ties count half
+    assert 0.05 < p < 1
+
+def test_mann_whitney_u_detects_a_shift():
+    rng = random.Random(1)
+    a = [rng.lognormvariate(3, 0.3) for _ in range(200)]
+    assert mann_whitney_u(a, [x * 1.2 for x in a])[1] < 0.01
+    assert mann_whitney_u(a[:100], a[100:])[1] > 0.05
+
+def test_holm():
+    assert holm([0.01, 0.04, 0.03]) == pytest.approx([0.03, 0.06, 0.06])
+    assert holm([0.5, 0.9]) == [1.0, 1.0]
+    assert holm([]) == []
+
+def test_bootstrap_diff_ci_covers_the_shift():
+    rng = random.Random(2)
+    a = [rng.gauss(100, 10) for _ in range(300)]
+    b = [x + 10 for x in a]
+    low, high = bootstrap_diff_ci(a, b)
+    assert low < 10 < high
+    assert low > 0
+    assert bootstrap_diff_ci(a, b) == (low, high)  # seeded by default
+    low, high = bootstrap_diff_ci(a, a)
+    assert low < 0 < high
+
+def test_required_samples_has_a_floor():
+    pilot = {"a": [100, 100.1, 99.9], "b": [100, 100.2, 99.8]}
+    assert required_samples(pilot, min_effect=0.5) == MIN_SAMPLES
+    noisy = {"a": [50, 100, 200, 400], "b": [60, 120, 240, 480]}
+    assert required_samples(noisy, min_effect=0.05) > MIN_SAMPLES
+    assert required_samples({"a": [1]}) is None
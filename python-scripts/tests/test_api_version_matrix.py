@@ -0,0 +1,30 @@
+import json
+
+from api_version_matrix import SUPPORTED, UNSUPPORTED, CapabilityMatrix
+
+URL = "https://a.openai.azure.com/openai/deployments/gpt-4o/chat/completions?api-version={}"
+
+def test_save_merges_with_entries_saved_by_another_process(tmp_path):
+    path = str(tmp_path / "caps.json")
+    first = CapabilityMatrix(path)
+    second = CapabilityMatrix(path)
+
+    first.observe(URL.format("2024-06-01"), 200)
+    first.observe(URL.format("2025-01-01"), 404)
+    first.save()
+    second.observe(URL.format("2024-10-21"), 200)
+    second.observe(URL.format("2025-01-01"), 200)  # newer observation wins
+    second.save()
+
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    statuses = {key.split("|")[2]: entry["status"] for key, entry in saved.items()}
+    assert statuses == {"2024-06-01": SUPPORTED, "2024-10-21": SUPPORTED, "2025-01-01": SUPPORTED}
+    assert [p.name for p in tmp_path.iterdir()] == ["caps.json"]
+
+    first.observe(URL.format("2024-02-01"), 404)
+    first.save()  # must not roll 2025-01-01 back to the older 404
+    assert CapabilityMatrix(path).status("a.openai.azure.com", "/openai/deployments/*/chat/completions",
+                                         "2025-01-01") == SUPPORTED
+    assert CapabilityMatrix(path).status("a.openai.azure.com", "/openai/deployments/*/chat/completions",
+                                         "2024-02-01") == UNSUPPORTED
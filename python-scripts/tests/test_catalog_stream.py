@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from catalog_stream import iter_array_items
+
+CATALOG = {
+    "data": [
+        {"id": "gpt-4o", "created_at": 1715367049, "capabilities": {"chat_completion": True}},
+        {"id": "text-embedding-3-large", "score": -12.5e-3, "dims": [256, 1024, 3072]},
+        {"id": "o1", "deprecation": None, "ratio": 0.75, "flags": [True, False]},
+        "名前",
+        -42,
+        3.14159,
+        1e10,
+    ],
+    "object": "list",
+    "total": 12345,
+}
+
+def _chunks(body, size):
+    data = body.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 7, 64 * 1024])
+def test_items_survive_any_chunk_boundary(size):
+    body = json.dumps(CATALOG)
+    assert list(iter_array_items(_chunks(body, size))) == CATALOG["data"]
+
+def test_one_byte_at_a_time_with_whitespace():
+    body = json.dumps(CATALOG, indent=2)
+    assert list(iter_array_items(_chunks(body, 1))) == CATALOG["data"]
+
+def test_bare_numbers_split_across_chunks():
+    body = '{"data": [12345, -0.5e+3, 7], "total": 98765}'
+    for size in range(1, 6):
+        assert list(iter_array_items(_chunks(body, size))) == [12345, -500.0, 7]
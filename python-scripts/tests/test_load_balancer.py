@@ -0,0 +1,138 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from circuit_breaker import parse_retry_after
+from load_balancer import Backend, LoadBalancer
+from mock_deployment import MockDeploymentServer
+
+DEPLOYMENTS = {"chat": "chat-deployment"}
+
+@pytest.fixture
+def balancer():
+    backends = [Backend(name, f"http://{name}.invalid", "key", DEPLOYMENTS) for name in ("a", "b", "c")]
+    lb = LoadBalancer(backends, min_requests=5, base_ejection_seconds=10)
+    yield lb
+    lb.close()
+
+def _choose(lb, exclude=()):
+    with lb._lock:
+        return lb._choose("chat", list(exclude))
+
+def test_choose_prefers_the_better_score(balancer):
+    a, b, c = balancer.backends
+    a.ewma_ms, b.ewma_ms, c.ewma_ms = 50, 400, 400
+    random.seed(1)
+    picks = [_choose(balancer).name for _ in range(300)]
+    # a wins every pair it is drawn into (2 of 3 pairs)
+    assert 0.55 < picks.count("a") / len(picks) < 0.8
+    assert _choose(balancer, exclude=[a]).name in ("b", "c")
+
+def test_choose_avoids_exhausted_rate_limit_budget(balancer):
+    a, b, c = balancer.backends
+    now = time.monotonic()
+    for backend in (a, b, c):
+        backend.ewma_ms = 100
+        backend.observe_rate_limits({"x-ratelimit-remaining-tokens": "90000"}, now)
+    a.observe_rate_limits({"x-ratelimit-remaining-tokens": "1000", "x-ratelimit-remaining-requests": "5"}, now)
+    random.seed(2)
+    assert all(_choose(balancer, exclude=[c]).name == "b" for _ in range(50))
+
+def test_choose_skips_cooling_down_and_fails_open(balancer):
+    a, b, c = balancer.backends
+    now = time.monotonic()
+    a.cooldown_until, b.cooldown_until = now + 30, now + 5
+    assert all(_choose(balancer).name == "c" for _ in range(20))
+    c.cooldown_until = now + 60
+    assert _choose(balancer).name == "b"  # everything cooling down: the first to recover
+
+def test_ejection_and_readmission(balancer):
+    a = balancer.backends[0]
+    for _ in range(5):
+        with balancer._lock:
+            a.inflight += 1
+        balancer._record(a, "not_found")
+    assert a.is_ejected() and a.ejections == 1
+    assert _choose(balancer, exclude=balancer.backends[1:]).name == "a"  # fallback only
+
+    # A failed probe ejects again for twice as long
+    a.ejected_until = time.monotonic() - 1
+    balancer._probe = lambda backend: False
+    balancer._readmit_due()
+    assert a.is_ejected() and a.ejections == 2
+    assert a.ejected_until - time.monotonic() > 15
+
+    a.ejected_until = time.monotonic() - 1
+    balancer._probe = lambda backend: True
+    balancer._readmit_due()
+    assert not a.is_ejected() and a.ewma_ms is None
+
+def test_client_errors_do_not_count_against_a_backend(balancer):
+    a = balancer.backends[0]
+    for _ in range(10):
+        with balancer._lock:
+            a.inflight += 1
+        balancer._record(a, "client_error", 5.0)
+    assert not a.is_ejected() and a.ewma_ms is None
+
+class _Fixed:
+    """Local server answering every request with one status"""
+
+    def __init__(self, status):
+        status_code = status
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.dumps({"error": {"code": str(status_code)}}).encode("utf-8")
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+@pytest.mark.parametrize("status", [401, 404])
+def test_fast_failing_backend_never_answers_the_caller(status):
+    broken = _Fixed(status)
+    try:
+        with MockDeploymentServer(base_ms=5) as mock:
+            lb = LoadBalancer([Backend("mock", mock.url, "key", DEPLOYMENTS),
+                               Backend("broken", broken.url, "key", DEPLOYMENTS)])
+            results = [lb.chat([{"role": "user", "content": "hi"}], max_tokens=2) for _ in range(40)]
+            lb.close()
+    finally:
+        broken.close()
+    assert all(r["backend"] == "mock" and r["response"].status_code == 200 for r in results)
+    # After its first failure the error penalty keeps it out of every pair it is drawn into
+    broken_backend = lb.backends[1]
+    assert broken_backend.totals["ok"] == 0 and 1 <= sum(broken_backend.totals.values()) <= 5
+
+def test_bad_request_is_returned_without_retrying():
+    bad = _Fixed(400)
+    try:
+        lb = LoadBalancer([Backend("bad", bad.url, "key", DEPLOYMENTS)])
+        result = lb.chat([{"role": "user", "content": "hi"}])
+        lb.close()
+    finally:
+        bad.close()
+    assert result["response"].status_code == 400
+    assert lb.backends[0].totals == {"client_error": 1} and lb.backends[0].ewma_ms is None
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
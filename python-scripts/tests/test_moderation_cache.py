@@ -0,0 +1,11 @@
+from moderation_cache import ModerationCache
+
+def test_eviction_stops_when_the_byte_count_drifted(tmp_path):
+    path = str(tmp_path / "moderation.sqlite")
+    cache = ModerationCache(path, max_bytes=1000)
+    cache.put("hello", "https://x/contentsafety", {"flagged": False})
+    cache.bytes_used += 2000  # e.g. rows deleted by another process sharing the file
+
+    cache.put("world", "https://x/contentsafety", {"flagged": False})  # used to spin forever
+    real = cache._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    assert cache.bytes_used == real <= cache.max_bytes
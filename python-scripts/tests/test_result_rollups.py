@@ -0,0 +1,30 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from probe_results import ProbeResultStore, sample_rows
+from result_rollups import RollupStore
+
+def totals(store):
+    return {key: (r.count, r.ok) for key, r in store.query(by=("resource", "day")).items()}
+
+def test_update_interrupted_before_the_manifest_does_not_double_count(tmp_path):
+    results = ProbeResultStore(str(tmp_path / "results"))
+    results.append(sample_rows("a", "https://a/x", [10, 20, 30], "probe", failures=1,
+                               timestamp=datetime(2026, 3, 1, 23, 30)))
+    results.append(sample_rows("a", "https://a/x", [40], "probe", timestamp=datetime(2026, 3, 2, 0, 5)))
+    root = str(tmp_path / "rollups")
+
+    assert RollupStore(root).update(results)[0] == 2
+    expected = {("a", "2026-03-01"): (4, 3), ("a", "2026-03-02"): (1, 1)}
+    assert totals(RollupStore(root)) == expected
+
+    # Crash after the day files were replaced but before _ingested.json was
+    os.remove(os.path.join(root, "_ingested.json"))
+    store = RollupStore(root)
+    assert store.update(results)[0] == 2
+    assert totals(store) == expected
+    assert RollupStore(root).update(results) == (0, 0)
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+import threading
+
+from mock_deployment import MockDeploymentServer
+from sharded_executor import (ThreadingHTTPServer, _Coordinator, _make_handler, merge_shards, retry_path,
+                              run_shard, run_worker, shard_path, split_plan)
+
+def _plan(mock_url, ok=12, dead=2):
+    plan = [{"id": f"ok-{i}", "method": "POST", "url": f"{mock_url}/openai/deployments/d/chat/completions",
+             "payload": {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 4}} for i in range(ok)]
+    # Nothing listens on port 1: connection refused, a transport failure
+    return plan + [{"id": f"dead-{i}", "url": f"http://127.0.0.1:1/dead-{i}"} for i in range(dead)]
+
+def test_coordinator_resumes_from_shard_files(tmp_path):
+    plan = [{"id": f"p{i}", "url": "http://127.0.0.1:1/"} for i in range(20)]
+    first = split_plan(plan, 2)[0]
+    with open(shard_path(str(tmp_path), 0), "w", encoding="utf-8") as f:
+        for probe in first:
+            f.write(json.dumps({"id": probe["id"], "result": {"status_code": 200}}) + "\n")
+        f.write('{"id": "torn')
+
+    coordinator = _Coordinator(plan, 2, str(tmp_path))
+    assert coordinator.resumed == len(first)
+    assert coordinator.pending == [1]
+    assert coordinator.remaining(0) == []
+
+def test_local_run_reports_and_retries_transport_failures(tmp_path):
+    out = str(tmp_path)
+    with MockDeploymentServer(base_ms=1.0) as mock:
+        plan = _plan(mock.url)
+        run_shard(0, plan, out, threads=4)
+        summary = merge_shards(out)
+        assert summary["total"] == len(plan)
+        assert summary["retryable"] == 2
+        assert summary["status_counts"][200] == 12
+
+        # Re-running only sends the retryable probes again
+        again = run_shard(0, plan, out, threads=4)
+        assert (again["executed"], again["skipped"]) == (2, 12)
+
+def test_workers_finish_reissue_and_clean_up(tmp_path):
+    out = str(tmp_path / "out")
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    previous, tempfile.tempdir = tempfile.tempdir, str(scratch)
+    try:
+        with MockDeploymentServer(base_ms=1.0) as mock:
+            plan = _plan(mock.url)
+            coordinator = _Coordinator(plan, 3, out, max_attempts=2)
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(coordinator))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                run_worker(f"http://127.0.0.1:{server.server_address[1]}", processes=2, threads=4, poll_seconds=0.2)
+            finally:
+                server.shutdown()
+    finally:
+        tempfile.tempdir = previous
+
+    assert coordinator.finished()
+    # Shards with dead probes were uploaded max_attempts times, the others once
+    dead_shards = {i for i, probes in enumerate(coordinator.shards) if any(p["id"].startswith("dead") for p in probes)}
+    assert all(coordinator.attempts[i] == (2 if i in dead_shards else 1) for i in range(3) if coordinator.shards[i])
+    assert all(os.path.exists(retry_path(out, i)) for i in dead_shards)
+    summary = merge_shards(out)
+    assert (summary["total"], summary["retryable"]) == (14, 2)
+    assert os.listdir(scratch) == []
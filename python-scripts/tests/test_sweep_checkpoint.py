@@ -0,0 +1,12 @@
+from sweep_checkpoint import SweepJournal
+
+def test_resume_skips_torn_and_foreign_lines(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    path.write_text('{"id": "a", "result": {"status_code": 200}}\n'
+                    '[1, 2]\n"text"\n42\n{"result": "no id"}\n'
+                    '{"id": "b", "result": null}\n'
+                    '{"id": "c", "res', encoding="utf-8")
+    with SweepJournal(str(path)) as journal:
+        assert len(journal) == 2
+        assert journal.result("a") == {"status_code": 200}
+        assert journal.is_done("b") and not journal.is_done("c")
@@ -0,0 +1,56 @@
+import gzip
+import json
+
+import requests
+
+from entra_auth import EntraTokenProvider, MockTokenEndpoint
+from traffic_cassette import CASSETTE_VERSION, CassetteRecorder, ReplayRedirect, ReplayServer
+
+SECRET = "s3cret-value-that-must-not-leak"
+
+def test_recorded_cassette_contains_no_secret(tmp_path):
+    path = str(tmp_path / "run.cassette")
+    with MockTokenEndpoint() as endpoint, CassetteRecorder(path) as recorder:
+        provider = EntraTokenProvider("tenant", "client", SECRET, authority=endpoint.url)
+        token = provider.get_token()
+        provider.close()
+        session = requests.Session()
+        # Secrets in a form body, a JSON body and a JSON response, away from the token endpoint
+        session.post(f"{endpoint.url}/other", data={"grant_type": "client_credentials", "client_secret": SECRET})
+        session.post(f"{endpoint.url}/other", json={"refresh_token": SECRET, "nested": [{"assertion": SECRET}]},
+                     headers={"api-key": SECRET, "Authorization": f"Bearer {token}"})
+
+    assert recorder.count == 3
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        recorded = f.read()
+    assert SECRET not in recorded
+    assert token not in recorded
+    assert "mock-" not in recorded  # no access token issued by the mock, from any response
+
+def _write_cassette(path, entries):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"cassette": CASSETTE_VERSION}) + "\n")
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+def _entry(url, body):
+    return {"t": 0, "method": "GET", "url": url, "request_headers": {}, "request_body": "",
+            "request_hash": "e3b0c44298fc1c14", "status": 200,
+            "response_headers": {"Content-Type": "application/json"}, "response_body": json.dumps(body),
+            "ttfb_ms": 0, "total_ms": 0}
+
+def test_replay_matches_the_recorded_host(tmp_path):
+    path = str(tmp_path / "two-hosts.cassette")
+    _write_cassette(path, [
+        _entry("https://original.openai.azure.com/openai/models?api-version=2024-06-01", {"resource": "original"}),
+        _entry("https://f-codespace.openai.azure.com/openai/models?api-version=2024-06-01", {"resource": "f"}),
+    ])
+    with ReplayServer(path, speed=0) as server:
+        with ReplayRedirect(server.url):
+            session = requests.Session()
+            for _ in range(2):
+                for host, expected in (("f-codespace", "f"), ("original", "original")):
+                    response = session.get(f"https://{host}.openai.azure.com/openai/models?api-version=2024-06-01")
+                    assert response.json() == {"resource": expected}
+        # Without X-Cassette-Host (serve mode) any recorded host matches
+        assert requests.get(f"{server.url}/openai/models?api-version=2024-06-01").status_code == 200
@@ -0,0 +1,26 @@
+import os
+
+import numpy as np
+
+from vector_search import IVFIndex, clustered_vectors, default_nprobe
+
+def test_build_into_directory_matches_in_memory_build(tmp_path):
+    vectors = clustered_vectors(4000, 16)
+    directory = str(tmp_path / "ivf")
+    index = IVFIndex.build(vectors, directory=directory)
+    assert isinstance(index.vectors, np.memmap)
+    index.save(directory)
+    assert sorted(os.listdir(directory)) == ["centroids.npy", "ids.npy", "meta.json", "offsets.npy", "vectors.npy"]
+
+    loaded = IVFIndex.load(directory)
+    expected = IVFIndex.build(vectors)
+    assert np.array_equal(np.asarray(loaded.vectors), expected.vectors)
+    assert np.array_equal(np.asarray(loaded.ids), expected.ids)
+    queries = clustered_vectors(8, 16, seed=1)
+    assert np.array_equal(loaded.search(queries)[0], expected.search(queries)[0])
+
+def test_default_nprobe_scans_more_of_small_collections():
+    assert default_nprobe(1000, 1_000_000) == 66  # 65,536 of 1M vectors
+    assert default_nprobe(447, 200_000) == 147
+    assert default_nprobe(10_000, 100_000_000) == 10_000 // 16
+    assert default_nprobe(50, 2000) == 50
@@ -0,0 +1,221 @@
+"""
+Azure AI Foundry - Open-Loop Production Trace Replay
+
+Replays a production request log against a deployment on its original
+arrival schedule (optionally N x faster), instead of a closed loop that
+waits for each answer before sending the next request.
+
+TRACE FORMAT (JSONL or CSV, one request per line):
+==================================================
+timestamp      epoch seconds or ISO 8601
+prompt_tokens  prompt size (a prompt of that many words is generated)
+max_tokens     completion limit
+stream         true/false
+
+COORDINATED OMISSION:
+=====================
+Every request has an intended start time from the trace. Latency is
+measured from that intended time, so time spent waiting for a free client
+worker (because the deployment is slow) counts against the deployment
+instead of silently disappearing. Service time (actual send -> done) and
+schedule lag are reported next to it for comparison.
+
+USAGE:
+======
+    python trace_replay.py prod_requests.jsonl --scale 3
+    python trace_replay.py --mock                   # synthetic bursty trace, local mock
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import json
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from latency_histogram import LatencyHistogram
+
+# Target deployment
+openai_url = "https://f-codespace.openai.azure.com"
+api_key = "YOUR_F_CODESPACE_API_KEY_HERE"  # Replace with your actual F-Codespace API key
+deployment = "gpt-4o-mini-deployment"
+api_version = "2024-06-01"
+
+def _parse_timestamp(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+def _parse_bool(value):
+    return value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes")
+
+def load_trace(path):
+    """Trace entries sorted by arrival, with `offset` seconds from the first one"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    entries = [{
+        "timestamp": _parse_timestamp(row["timestamp"]),
+        "prompt_tokens": int(row.get("prompt_tokens") or 1),
+        "max_tokens": int(row.get("max_tokens") or 16),
+        "stream": _parse_bool(row.get("stream", False)),
+    } for row in rows]
+    entries.sort(key=lambda e: e["timestamp"])
+    for entry in entries:
+        entry["offset"] = entry["timestamp"] - entries[0]["timestamp"]
+    return entries
+
+def synthetic_trace(duration=30.0, base_rps=4.0, burst_rps=40.0, burst_every=10.0, burst_length=2.0, seed=7):
+    """Poisson arrivals with periodic bursts (for demos and mock runs)"""
+    rng = random.Random(seed)
+    entries, t = [], 0.0
+    while t < duration:
+        in_burst = (t % burst_every) < burst_length
+        t += rng.expovariate(burst_rps if in_burst else base_rps)
+        entries.append({
+            "timestamp": t,
+            "offset": t,
+            "prompt_tokens": int(rng.lognormvariate(5, 1)) + 1,
+            "max_tokens": rng.choice([16, 64, 128]),
+            "stream": rng.random() < 0.5,
+        })
+    return entries
+
+def synthetic_prompt(tokens):
+    return " ".join(["hello"] * tokens)
+
+class TraceReplayer:
+    """Open-loop dispatcher with coordinated-omission-corrected latency"""
+
+    def __init__(self, base_url, key, deployment_name, scale=1.0, max_workers=256, timeout=120):
+        self.url = (f"{base_url.rstrip('/')}/openai/deployments/{deployment_name}"
+                    f"/chat/completions?api-version={api_version}")
+        self.key = key
+        self.scale = scale
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.corrected = LatencyHistogram()   # intended start -> done
+        self.service = LatencyHistogram()     # actual send -> done
+        self.ttft = LatencyHistogram()        # intended start -> first streamed chunk
+        self.lag = LatencyHistogram()         # intended start -> actual send
+        self.statuses = collections.Counter()
+        self.tokens = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _send(self, entry, intended):
+        started = time.monotonic()
+        self.lag.record_ms((started - intended) * 1000)
+        payload = {
+            "messages": [{"role": "user", "content": synthetic_prompt(entry["prompt_tokens"])}],
+            "max_tokens": entry["max_tokens"],
+        }
+        if entry["stream"]:
+            payload["stream"] = True
+        tokens = 0
+        try:
+            # No circuit breaker: under overload every request must report its real latency
+            response = self._session().request(
+                "POST",
+                self.url,
+                headers={"Content-Type": "application/json", "api-key": self.key},
+                json=payload,
+                timeout=self.timeout,
+                stream=entry["stream"],
+            )
+            if entry["stream"] and response.status_code == 200:
+                first = True
+                for line in response.iter_lines():
+                    if first and line:
+                        self.ttft.record_ms((time.monotonic() - intended) * 1000)
+                        first = False
+                    if line.startswith(b"data: {") and b'"usage"' in line:
+                        tokens = json.loads(line[6:]).get("usage", {}).get("total_tokens", 0)
+            elif response.status_code == 200:
+                tokens = response.json().get("usage", {}).get("total_tokens", 0)
+            else:
+                response.content
+            outcome = response.status_code
+        except requests.exceptions.RequestException as e:
+            outcome = type(e).__name__
+        done = time.monotonic()
+
+        with self._lock:
+            self.statuses[outcome] += 1
+            self.tokens += tokens
+        if outcome == 200:
+            self.service.record_ms((done - started) * 1000)
+            self.corrected.record_ms((done - intended) * 1000)
+
+    def run(self, trace):
+        """Dispatch every entry at offset / scale seconds from now; returns wall seconds"""
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        start = time.monotonic()
+        futures = []
+        for entry in trace:
+            intended = start + entry["offset"] / self.scale
+            delay = intended - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # Never wait for earlier requests: that is what keeps the loop open
+            futures.append(executor.submit(self._send, entry, intended))
+        concurrent.futures.wait(futures)
+        executor.shutdown()
+        return time.monotonic() - start
+
+    def print_report(self, trace, wall_seconds):
+        span = trace[-1]["offset"] / self.scale if trace else 0
+        print(f"\n📈 OPEN-LOOP REPLAY ({len(trace)} requests, {self.scale}x, "
+              f"offered {len(trace) / span if span else 0:.1f} req/s)")
+        print("-" * 60)
+        ok = self.statuses.get(200, 0)
+        print(f"  Wall: {wall_seconds:.1f}s | Throughput: {ok / wall_seconds:.1f} req/s | "
+              f"{self.tokens / wall_seconds * 60:,.0f} tokens/min")
+        print(f"  Outcomes: {dict(self.statuses)}")
+        self.corrected.print_summary("LATENCY (corrected: from intended start)")
+        self.service.print_summary("SERVICE TIME (uncorrected: from actual send)")
+        self.ttft.print_summary("TIME TO FIRST TOKEN (streamed, corrected)")
+        self.lag.print_summary("SCHEDULE LAG (intended -> actual send)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop production trace replay")
+    parser.add_argument("trace", nargs="?", help="JSONL/CSV request log")
+    parser.add_argument("--scale", type=float, default=1.0, help="replay N x faster (N x the arrival rate)")
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--mock", action="store_true", help="replay against a local simulated deployment")
+    parser.add_argument("--save", default=None, help="save the corrected histogram to this .hist.json")
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Open-Loop Trace Replay")
+    print("=" * 80)
+
+    trace = load_trace(options.trace) if options.trace else synthetic_trace()
+    if options.mock or not options.trace:
+        from mock_deployment import MockDeploymentServer
+
+        print("🧪 Replaying against a local simulated deployment")
+        with MockDeploymentServer(concurrency=8, decode_ms_per_token=2.0) as mock:
+            replayer = TraceReplayer(mock.url, "mock-key", deployment, options.scale, options.workers)
+            wall = replayer.run(trace)
+    else:
+        print(f"🎯 {openai_url} | deployment: {deployment}")
+        replayer = TraceReplayer(openai_url, api_key, deployment, options.scale, options.workers)
+        wall = replayer.run(trace)
+
+    replayer.print_report(trace, wall)
+    if options.save:
+        replayer.corrected.save(options.save)
+    print("=" * 80)
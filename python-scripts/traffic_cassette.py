@@ -0,0 +1,338 @@
+"""
+Azure AI Foundry - Record-and-Replay Traffic Cassettes
+
+RECORD: run any script unchanged; every HTTP request it makes (through
+requests, so every probe helper) is written with its response and timing to
+a gzip JSONL cassette. Credentials are never written: api-key,
+Ocp-Apim-Subscription-Key and Authorization headers are dropped, secret
+fields (client_secret, access_token, refresh_token, assertion, ...) in JSON
+and form bodies are redacted and token-endpoint bodies are not recorded.
+
+REPLAY: a local server answers from the cassette, at the original timing
+(time to headers, then the rest of the body) or time-compressed with
+--speed. Scripts can be replayed unchanged: their requests are redirected to
+the replay server, so runs need no network and no keys and are comparable.
+
+Matching: original host + method + path/query + request body hash;
+repeated identical requests get the recorded responses in order (the last
+one repeats). A request with an unknown body falls back to host + method +
+path/query. Redirected requests carry their original host in
+X-Cassette-Host; requests without it (serve mode) match any host.
+
+USAGE:
+======
+    python traffic_cassette.py record run.cassette complete_api_test_f_codespace.py
+    python traffic_cassette.py replay run.cassette complete_api_test_f_codespace.py --speed 10
+    python traffic_cassette.py serve run.cassette --port 8080 --speed 0
+"""
+
+import argparse
+import collections
+import functools
+import gzip
+import hashlib
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+CASSETTE_VERSION = 1
+
+# Never written to a cassette
+SECRET_HEADERS = {"api-key", "ocp-apim-subscription-key", "authorization", "x-api-key"}
+SECRET_FIELDS = {"client_secret", "client_assertion", "assertion", "access_token", "refresh_token", "id_token"}
+REDACTED = "[REDACTED]"
+
+# Sent by the replay redirect: the host a request was meant for
+HOST_HEADER = "X-Cassette-Host"
+
+# Response headers worth replaying
+KEPT_RESPONSE_HEADERS = {"content-type", "retry-after", "x-ms-region", "apim-request-id", "x-request-id",
+                         "x-ratelimit-remaining-requests", "x-ratelimit-remaining-tokens"}
+
+def _body_bytes(body):
+    if body is None:
+        return b""
+    return body.encode("utf-8") if isinstance(body, str) else bytes(body)
+
+def body_hash(body):
+    return hashlib.sha256(_body_bytes(body)).hexdigest()[:16]
+
+def _path_query(url):
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+def is_token_endpoint(url):
+    """OAuth token endpoints (Entra ID .../oauth2/v2.0/token and friends)"""
+    path = urlsplit(url).path.rstrip("/").lower()
+    return "/oauth2/" in path and path.endswith("/token")
+
+def _redact_json(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k.lower() in SECRET_FIELDS else _redact_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact_json(v) for v in value]
+    return value
+
+def redact_body(body):
+    """Body text with secret fields of a JSON or form-encoded body redacted"""
+    text = _body_bytes(body).decode("utf-8", errors="replace")
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, (dict, list)):
+        redacted = _redact_json(data)
+        return json.dumps(redacted, separators=(",", ":")) if redacted != data else text
+    pairs = parse_qsl(text, keep_blank_values=True)
+    if any(name.lower() in SECRET_FIELDS for name, _ in pairs):
+        return urlencode([(name, REDACTED if name.lower() in SECRET_FIELDS else value) for name, value in pairs])
+    return text
+
+class CassetteRecorder:
+    """Captures every requests.Session.send() call into a cassette"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(json.dumps({"cassette": CASSETTE_VERSION, "recorded_at": time.time()}) + "\n")
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._original_send = None
+
+    def _record(self, request, response, started, total_ms):
+        if is_token_endpoint(request.url):
+            request_body = response_body = ""  # nothing but credentials in either direction
+        else:
+            request_body, response_body = redact_body(request.body), redact_body(response.content)
+        entry = {
+            "t": round(started - self._start, 6),
+            "method": request.method,
+            "url": request.url,
+            "request_headers": {k: v for k, v in request.headers.items() if k.lower() not in SECRET_HEADERS},
+            "request_body": request_body,
+            # Hash of the redacted body: the replay server hashes incoming bodies the same way
+            "request_hash": body_hash(request_body),
+            "status": response.status_code,
+            "response_headers": {k: v for k, v in response.headers.items() if k.lower() in KEPT_RESPONSE_HEADERS},
+            "response_body": response_body,
+            "ttfb_ms": round(response.elapsed.total_seconds() * 1000, 3),
+            "total_ms": round(total_ms, 3),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+    def install(self):
+        original = self._original_send = requests.Session.send
+        recorder = self
+
+        @functools.wraps(original)
+        def send(session, request, **kwargs):
+            started = time.monotonic()
+            response = original(session, request, **kwargs)
+            response.content  # read the body so it can be recorded (and timed)
+            recorder._record(request, response, started, (time.monotonic() - started) * 1000)
+            return response
+
+        requests.Session.send = send
+
+    def close(self):
+        if self._original_send:
+            requests.Session.send = self._original_send
+            self._original_send = None
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def load_cassette(path):
+    """(header, interactions) from a cassette file; tolerates a torn last line"""
+    interactions = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        try:
+            for line in f:
+                try:
+                    interactions.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        except EOFError:
+            pass  # recording was interrupted
+    return header, interactions
+
+class ReplayServer:
+    """Serves a cassette over local HTTP at original or compressed timing
+
+    speed=1 replays original timing, speed=10 ten times faster, speed=0 instantly.
+    """
+
+    def __init__(self, cassette_path, speed=1.0, host="127.0.0.1", port=0):
+        self.speed = speed
+        self.header, interactions = load_cassette(cassette_path)
+        self.by_body = collections.defaultdict(list)
+        self.by_path = collections.defaultdict(list)
+        for entry in interactions:
+            path = _path_query(entry["url"])
+            # Indexed under the recorded host and under None (requests that carry no host)
+            for recorded_host in (urlsplit(entry["url"]).netloc, None):
+                self.by_body[(recorded_host, entry["method"], path, entry["request_hash"])].append(entry)
+                self.by_path[(recorded_host, entry["method"], path)].append(entry)
+        self.served = collections.Counter()  # key -> responses handed out
+        self.stats = collections.Counter()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        return False
+
+    def lookup(self, method, path, body, host=None):
+        """Next recorded interaction for a request to `host` (None: any host), or None"""
+        request_hash = body_hash("" if is_token_endpoint(path) else redact_body(body))
+        for key, table, stat in (((host, method, path, request_hash), self.by_body, "exact"),
+                                 ((host, method, path), self.by_path, "path_only")):
+            entries = table.get(key)
+            if entries:
+                with self.lock:
+                    index = min(self.served[key], len(entries) - 1)
+                    self.served[key] += 1
+                    self.stats[stat] += 1
+                return entries[index]
+        with self.lock:
+            self.stats["missing"] += 1
+        return None
+
+    def _delay(self, milliseconds):
+        if self.speed and milliseconds > 0:
+            time.sleep(milliseconds / 1000.0 / self.speed)
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, delayed ACKs add ~40ms
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                entry = replay.lookup(self.command, self.path, body, self.headers.get(HOST_HEADER))
+                if entry is None:
+                    status, headers, payload, ttfb_ms, total_ms = 404, {"Content-Type": "application/json"}, \
+                        json.dumps({"error": {"code": "NotInCassette", "message": self.path}}), 0, 0
+                else:
+                    status, headers, payload = entry["status"], entry["response_headers"], entry["response_body"]
+                    ttfb_ms, total_ms = entry["ttfb_ms"], entry["total_ms"]
+                data = payload.encode("utf-8")
+
+                replay._delay(ttfb_ms)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("x-cassette", "HIT" if entry else "MISS")
+                self.end_headers()
+                replay._delay(total_ms - ttfb_ms)
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+class ReplayRedirect:
+    """Send every requests call to a replay server instead of its real host"""
+
+    def __init__(self, server_url):
+        self.server = urlsplit(server_url)
+        self._original_send = None
+
+    def __enter__(self):
+        original = self._original_send = requests.Session.send
+        server = self.server
+
+        @functools.wraps(original)
+        def send(session, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = urlunsplit((server.scheme, server.netloc, parts.path, parts.query, ""))
+            request.headers[HOST_HEADER] = parts.netloc
+            kwargs.pop("verify", None)
+            return original(session, request, **kwargs)
+
+        requests.Session.send = send
+        return self
+
+    def __exit__(self, *exc):
+        requests.Session.send = self._original_send
+        return False
+
+def _run_script(script, argv):
+    sys.argv = [script] + list(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    runpy.run_path(script, run_name="__main__")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay HTTP traffic")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    record = sub.add_parser("record", help="run a script and record its traffic")
+    record.add_argument("cassette")
+    record.add_argument("script")
+    record.add_argument("args", nargs=argparse.REMAINDER)
+
+    replay = sub.add_parser("replay", help="run a script against a cassette (no network)")
+    replay.add_argument("cassette")
+    replay.add_argument("--speed", type=float, default=1.0, help="time compression (0 = no delays)")
+    replay.add_argument("script")
+    replay.add_argument("args", nargs=argparse.REMAINDER)
+
+    serve = sub.add_parser("serve", help="serve a cassette on a local port")
+    serve.add_argument("cassette")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--speed", type=float, default=1.0)
+
+    options = parser.parse_args()
+
+    if options.mode == "record":
+        with CassetteRecorder(options.cassette) as recorder:
+            try:
+                _run_script(options.script, options.args)
+            finally:
+                print(f"\n📼 Recorded {recorder.count} interactions -> {options.cassette}")
+    elif options.mode == "replay":
+        with ReplayServer(options.cassette, speed=options.speed) as server:
+            with ReplayRedirect(server.url):
+                try:
+                    _run_script(options.script, options.args)
+                finally:
+                    print(f"\n📼 Replayed from {options.cassette} at {options.speed}x: {dict(server.stats)}")
+    else:
+        server = ReplayServer(options.cassette, speed=options.speed, port=options.port)
+        print(f"📼 Serving {options.cassette} on {server.url} at {options.speed}x (Ctrl+C to stop)")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
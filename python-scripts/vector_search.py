@@ -0,0 +1,346 @@
+"""
+Azure AI Foundry - Local Vector Similarity Search over Stored Embeddings
+
+Finds the nearest stored embeddings (embedding_store.py) for a batch of
+query vectors, on CPU, for the retrieval step in front of a chat call.
+
+EXACT (baseline):
+=================
+brute_force_search() scores every vector with one matrix product per
+chunk of rows (float16 stores are widened chunk by chunk) and keeps a
+running top-k per query, so memory stays bounded for millions of rows.
+
+APPROXIMATE (IVF):
+==================
+IVFIndex clusters the vectors (spherical k-means on a sample) into
+`nlist` inverted lists and stores each list contiguously. A query only
+scores the vectors of its `nprobe` closest lists. Batched queries are
+grouped by list, so each list is read once and scored with one matrix
+product for all queries probing it. Raise nprobe for recall, lower it for
+speed; `bench` prints both against the exact baseline.
+
+The default nprobe is nlist/16, raised on small collections so a query
+scores at least MIN_SCANNED vectors: on the synthetic bench, nlist/16 alone
+gives recall@10 of 0.62 at 200k x 256 but 0.93 at 1M x 256.
+
+Indexes are saved as .npy files and loaded memory-mapped. Building into an
+index directory writes the grouped vectors straight to a memory-mapped file
+there, so the collection is never copied into RAM.
+
+USAGE:
+======
+    python vector_search.py bench --rows 1000000 --dim 256
+    python vector_search.py build --model text-embedding-ada-002
+    python vector_search.py query "how do I enable public access?" --corpus corpus.txt --k 5
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, azure_embedder
+
+# Vectors a query scores at the default nprobe, at least (small collections)
+MIN_SCANNED = 65536
+BUILDING_VECTORS = "vectors.building.npy"
+
+def normalise(vectors):
+    """Row-wise unit vectors (float32); zero rows stay zero"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _merge_top_k(best_scores, best_ids, scores, ids, k):
+    """Keep the k highest of (best, new) per row; ids broadcast when 1-D"""
+    if ids.ndim == 1:
+        ids = np.broadcast_to(ids, scores.shape)
+    scores = np.concatenate([best_scores, scores], axis=1)
+    ids = np.concatenate([best_ids, ids], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        ids = np.take_along_axis(ids, keep, axis=1)
+    return scores, ids
+
+def _sorted(scores, ids):
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+def brute_force_search(vectors, queries, k=10, metric="cosine", chunk_rows=16384):
+    """Exact top-k -> (ids, scores), each (len(queries), k), best first; ids are row numbers"""
+    queries = normalise(queries) if metric == "cosine" else np.asarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.full((len(queries), 0), -1, dtype=np.int64)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        if metric == "cosine":
+            chunk = normalise(chunk)
+        scores = queries @ chunk.T
+        best_scores, best_ids = _merge_top_k(best_scores, best_ids, scores,
+                                             np.arange(start, start + len(chunk), dtype=np.int64), k)
+    return _sorted(best_scores, best_ids)
+
+def kmeans(vectors, k, iterations=10, seed=0, chunk_rows=16384):
+    """Spherical k-means (unit centroids, cosine assignment) -> (k, dim) centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign(vectors, centroids, chunk_rows)
+        counts = np.bincount(assignment, minlength=k)
+        order = np.argsort(assignment, kind="stable")
+        starts = np.cumsum(counts) - counts
+        filled = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(vectors[order], starts[filled])
+        # Empty lists restart from random vectors
+        sums[~filled] = vectors[rng.choice(len(vectors), int((~filled).sum()), replace=False)]
+        centroids = normalise(sums)
+    return centroids
+
+def assign(vectors, centroids, chunk_rows=16384):
+    """Index of the most similar centroid for every (unit) vector"""
+    return np.concatenate([np.argmax(np.asarray(vectors[i:i + chunk_rows], dtype=np.float32) @ centroids.T, axis=1)
+                           for i in range(0, len(vectors), chunk_rows)]) if len(vectors) else np.empty(0, np.int64)
+
+def default_nprobe(nlist, count):
+    """nlist/16 lists, or enough lists to score about MIN_SCANNED of `count` vectors"""
+    share = min(1.0, MIN_SCANNED / count) if count else 1.0
+    return max(1, nlist // 16, math.ceil(nlist * share))
+
+class IVFIndex:
+    """Inverted-file index for cosine similarity with contiguous per-list vectors"""
+
+    def __init__(self, centroids, offsets, ids, vectors, nprobe=None):
+        self.centroids = centroids    # (nlist, dim) unit vectors
+        self.offsets = offsets        # list l = rows offsets[l]:offsets[l + 1]
+        self.ids = ids                # original row number of every stored vector
+        self.vectors = vectors        # unit vectors, grouped by list
+        self.nprobe = nprobe or default_nprobe(len(centroids), len(ids))
+
+    @classmethod
+    def build(cls, vectors, nlist=None, dtype="float32", sample=None, iterations=10, seed=0, chunk_rows=16384,
+              directory=None):
+        """Train on a sample (up to 64 vectors per list) and file every vector under its closest centroid
+
+        With `directory`, the grouped vectors go to a memory-mapped file there
+        instead of RAM; save() to the same directory moves it into place.
+        """
+        count = len(vectors)
+        nlist = nlist or max(1, min(int(math.sqrt(count)), count // 39 or 1))
+        rng = np.random.default_rng(seed)
+        sample = min(sample or 64 * nlist, count)
+        training = normalise(vectors[np.sort(rng.choice(count, sample, replace=False))])
+        centroids = kmeans(training, nlist, iterations, seed, chunk_rows)
+
+        # Scaling a vector does not change its closest unit centroid: no need to normalise here
+        assignment = assign(vectors, centroids, chunk_rows)
+        ids = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))]).astype(np.int64)
+        shape = (count, vectors.shape[1])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            grouped = np.lib.format.open_memmap(os.path.join(directory, BUILDING_VECTORS), mode="w+",
+                                                dtype=dtype, shape=shape)
+        else:
+            grouped = np.empty(shape, dtype=dtype)
+        for start in range(0, count, chunk_rows):
+            rows = ids[start:start + chunk_rows]
+            grouped[start:start + len(rows)] = normalise(vectors[np.sort(rows)])[np.argsort(np.argsort(rows))]
+        if directory:
+            grouped.flush()
+        return cls(centroids, offsets, ids, grouped)
+
+    def search(self, queries, k=10, nprobe=None):
+        """Approximate top-k -> (ids, scores), each (len(queries), k), best first; -1 pads short results"""
+        queries = normalise(queries)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        # (query, list) pairs grouped by list: every list is scored once for all its queries
+        query_of = np.repeat(np.arange(len(queries)), nprobe)
+        lists = probes.ravel()
+        order = np.argsort(lists, kind="stable")
+        lists, query_of = lists[order], query_of[order]
+        boundaries = np.flatnonzero(np.diff(lists)) + 1
+        for group in np.split(np.arange(len(lists)), boundaries):
+            if not len(group):
+                continue
+            list_id = lists[group[0]]
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            members = query_of[group]
+            scores = queries[members] @ np.asarray(self.vectors[start:end], dtype=np.float32).T
+            best_scores[members], best_ids[members] = _merge_top_k(
+                best_scores[members], best_ids[members], scores, np.asarray(self.ids[start:end]), k)
+        return _sorted(best_scores, best_ids)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        building = os.path.join(directory, BUILDING_VECTORS)
+        in_place = getattr(self.vectors, "filename", None) == os.path.abspath(building)
+        for name in ("centroids", "offsets", "ids") + (() if in_place else ("vectors",)):
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(getattr(self, name)))
+        if in_place:
+            # Built into this directory (see build): move the file, do not copy it
+            self.vectors.flush()
+            os.replace(building, os.path.join(directory, "vectors.npy"))
+            self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"nlist": len(self.centroids), "count": len(self.ids), "dim": self.centroids.shape[1],
+                       "dtype": np.dtype(self.vectors.dtype).name, "nprobe": self.nprobe}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-mapped: only the centroids and offsets are read up front"""
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                  for name in ("ids", "vectors")}
+        return cls(np.load(os.path.join(directory, "centroids.npy")), np.load(os.path.join(directory, "offsets.npy")),
+                   arrays["ids"], arrays["vectors"], meta["nprobe"])
+
+def recall_at_k(exact_ids, approx_ids):
+    """Share of the exact top-k found by the approximate search"""
+    hits = sum(len(set(e.tolist()) & set(a.tolist())) for e, a in zip(exact_ids, approx_ids))
+    return hits / exact_ids.size if exact_ids.size else 1.0
+
+def index_path(store):
+    return os.path.join(store.directory, "ivf")
+
+def embed_queries(query_texts, store, embed_fn):
+    """Query vectors: stored ones are reused, new ones are embedded but not added to the searched store"""
+    rows = store.rows(query_texts)
+    missing = [i for i, row in enumerate(rows) if row < 0]
+    fetched = np.asarray(embed_fn([query_texts[i] for i in missing]), dtype=np.float32) if missing else None
+    queries = np.empty((len(query_texts), store.dim or fetched.shape[1]), dtype=np.float32)
+    for j, i in enumerate(missing):
+        queries[i] = fetched[j]
+    found = rows >= 0
+    if found.any():
+        queries[found] = store.vectors[rows[found]]
+    return queries
+
+def retrieve(query_texts, store, embed_fn, k=5, index=None):
+    """Row ids and scores of the stored texts nearest to each query text"""
+    queries = embed_queries(query_texts, store, embed_fn)
+    if index is not None:
+        return index.search(queries, k)
+    return brute_force_search(store.vectors, queries, k)
+
+def clustered_vectors(rows, dim, clusters=1000, spread=1.0, seed=0):
+    """Synthetic embedding-like data: unit vectors around random topic directions"""
+    rng = np.random.default_rng(seed)
+    topics = normalise(rng.standard_normal((clusters, dim)))
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        n = min(65536, rows - start)
+        noise = rng.standard_normal((n, dim)).astype(np.float32) * (spread / math.sqrt(dim))
+        vectors[start:start + n] = normalise(topics[rng.integers(0, clusters, n)] + noise)
+    return vectors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similarity search over stored embeddings")
+    parser.add_argument("--root", default=None, help="embedding store directory (default EMBEDDING_STORE)")
+    parser.add_argument("--model", default="text-embedding-ada-002")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    bench = subcommands.add_parser("bench", help="exact vs IVF on synthetic clustered vectors")
+    bench.add_argument("--rows", type=int, default=200000)
+    bench.add_argument("--dim", type=int, default=256)
+    bench.add_argument("--queries", type=int, default=256)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--float16", action="store_true")
+    build = subcommands.add_parser("build", help="build and save an IVF index over the model's stored vectors")
+    build.add_argument("--nlist", type=int, default=None)
+    build.add_argument("--float16", action="store_true")
+    query = subcommands.add_parser("query", help="nearest stored texts for one or more query texts")
+    query.add_argument("texts", nargs="+")
+    query.add_argument("--corpus", default=None, help="file the store was filled from, to print texts")
+    query.add_argument("--k", type=int, default=5)
+    query.add_argument("--nprobe", type=int, default=None)
+    query.add_argument("--mock", action="store_true", help="embed queries with a local simulated deployment")
+    options = parser.parse_args()
+
+    print("🚀 Azure AI Foundry Vector Search")
+    print("=" * 80)
+
+    if options.command == "bench":
+        dtype = "float16" if options.float16 else "float32"
+        vectors = clustered_vectors(options.rows, options.dim).astype(dtype)
+        queries = clustered_vectors(options.queries, options.dim, seed=1)
+        print(f"🧪 {options.rows:,} x {options.dim} {dtype} vectors, {options.queries} queries, k={options.k}")
+
+        start = time.perf_counter()
+        exact_ids, _ = brute_force_search(vectors, queries, options.k)
+        exact_ms = (time.perf_counter() - start) * 1000
+        print(f"  exact          | {exact_ms:8.1f}ms | {exact_ms / options.queries:7.3f}ms/query | recall 1.000")
+
+        start = time.perf_counter()
+        index = IVFIndex.build(vectors, dtype=dtype)
+        print(f"  IVF build      | {(time.perf_counter() - start) * 1000:8.1f}ms | nlist {len(index.centroids)}")
+        nlist = len(index.centroids)
+        for nprobe in sorted({min(n, nlist) for n in (1, index.nprobe // 2 or 1, index.nprobe, index.nprobe * 2,
+                                                     index.nprobe * 4)}):
+            start = time.perf_counter()
+            ids, _ = index.search(queries, options.k, nprobe)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"  IVF nprobe {nprobe:<4}| {elapsed_ms:8.1f}ms | {elapsed_ms / options.queries:7.3f}ms/query | "
+                  f"recall {recall_at_k(exact_ids, ids):.3f}")
+
+    elif options.command == "build":
+        store = EmbeddingStore(options.model, options.root)
+        if not len(store):
+            print(f"❌ No vectors stored for {options.model} in {store.directory}")
+        else:
+            start = time.perf_counter()
+            index = IVFIndex.build(store.vectors, options.nlist, "float16" if options.float16 else "float32",
+                                   directory=index_path(store))
+            index.save(index_path(store))
+            print(f"✅ IVF index over {len(store):,} vectors ({len(index.centroids)} lists) in "
+                  f"{(time.perf_counter() - start):.1f}s -> {index_path(store)}")
+
+    else:
+        store = EmbeddingStore(options.model, options.root)
+        index = IVFIndex.load(index_path(store)) if os.path.exists(os.path.join(index_path(store), "meta.json")) \
+            else None
+        if index is not None and len(index.ids) != len(store):
+            print(f"⚠️  Index covers {len(index.ids):,} of {len(store):,} vectors - rebuild it to include new ones")
+        texts_by_row = {}
+        if options.corpus:
+            with open(options.corpus, "r", encoding="utf-8") as f:
+                corpus = [line.rstrip("\n") for line in f if line.strip()]
+            texts_by_row = dict(zip(store.rows(corpus).tolist(), corpus))
+
+        def run(embed_fn):
+            start = time.perf_counter()
+            queries = embed_queries(options.texts, store, embed_fn)
+            if index is not None:
+                ids, scores = index.search(queries, options.k, options.nprobe)
+            else:
+                ids, scores = brute_force_search(store.vectors, queries, options.k)
+            print(f"🔎 {'IVF' if index is not None else 'exact'} search over {len(store):,} vectors in "
+                  f"{(time.perf_counter() - start) * 1000:.1f}ms")
+            for text, row_ids, row_scores in zip(options.texts, ids, scores):
+                print(f"\n  ❓ {text}")
+                for row, score in zip(row_ids.tolist(), row_scores.tolist()):
+                    if row >= 0:
+                        print(f"    {score:6.3f} | #{row} {texts_by_row.get(row, '')[:70]}")
+
+        if options.mock:
+            from mock_deployment import MockDeploymentServer
+
+            with MockDeploymentServer(embedding_dim=store.dim or 256) as mock:
+                run(azure_embedder(mock.url, "mock-key", "embedding-deployment"))
+        else:
+            from embedding_store import api_key, deployment, openai_url
+
+            run(azure_embedder(openai_url, api_key, deployment))
+    print("=" * 80)